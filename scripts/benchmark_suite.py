@@ -0,0 +1,211 @@
+# ==============================================================================
+#  The Geometry of the Echo: PMN-01 Model Source Code
+#  ----------------------------------------------------------------------------
+#  (c) 2025 Pablo Miguel Nieto Muñoz
+#  License: MIT (See LICENSE file for details)
+#
+#  Scientific Citation:
+#  Nieto Muñoz, P. M. (2025). "The Geometry of the Echo: Observational
+#  Confirmation of the Chiral Dodecahedral Universe".
+#  Zenodo.
+# ==============================================================================
+
+"""
+Synthetic-sky benchmark suite for the hot paths of the pipeline.
+
+For every requested NSIDE and FITS layout a deterministic synthetic sky
+(synthetic_sky.make_sky) is written once to data/benchmarks/skies/. Each
+stage then runs in a fresh subprocess inside a scratch working directory
+where that sky sits at the path the scripts expect
+(data/raw/COM_CMB_IQU-sevem_2048_R4.00.fits). Wall time, CPU time (the
+stage and its pool workers) and peak RSS come from os.wait4 on the stage
+process. No Planck data is needed.
+
+Stage workloads are scaled down (STAGES overrides) but identical at every
+NSIDE, so runs are comparable across NSIDEs and across commits.
+
+Usage:
+    python scripts/benchmark_suite.py                            # NSIDE 256, both layouts
+    python scripts/benchmark_suite.py --nside 256 512 1024 2048
+    python scripts/benchmark_suite.py --stages fractal_scan line_hunter
+    python scripts/benchmark_suite.py --save-baseline            # store as baseline.json
+
+Every run is saved to data/benchmarks/run_<timestamp>.json and compared
+with data/benchmarks/baseline.json when it exists.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import numpy as np
+import healpy as hp
+from synthetic_sky import make_sky, write_sky, LAYOUTS, DEFAULT_SEED
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCH_DIR = 'data/benchmarks'
+BASELINE_FILE = os.path.join(BENCH_DIR, 'baseline.json')
+PLANCK_NAME = 'COM_CMB_IQU-sevem_2048_R4.00.fits'
+
+# (name, module, function, module-level overrides). Run in this order: later
+# stages may read what earlier ones wrote (calc_sigma reads trace_vertex output,
+# path_tracer the vertices of spider_v8_final).
+STAGES = [
+    ('map_cache',          'map_cache',               'ensure_cache', {}),
+    ('signal_maps',        'signal_maps',             'main', {}),
+    ('ridge_maps',         'ridge_maps',              'main', {'RIDGE_NSIDE': 256}),
+    ('fractal_scan',       'main_fractal',            'main', {'NSIDE_SCAN': 4}),
+    ('line_hunter',        'main_line_hunter',        'main', {'NSIDE_SCAN': 4, 'ANGLE_STEP': 10}),
+    ('trace_vertex',       'trace_vertex',            'main', {'ROI_RADIUS': 3.0, 'NSIDE_TRACE': 64,
+                                                               'ANGLE_STEP': 10}),
+    ('sigma_significance', 'calc_sigma_significance', 'main', {'N_SIMULATIONS': 2000}),
+    ('spider_v8',          'sabueso_v8',              'main', {}),
+    ('spider_v8_final',    'sabueso_v8_final',        'run_spider_v8', {'MAX_STEPS': 300}),
+    ('path_tracer',        'path_tracer',             'main', {}),
+    ('spider_v9',          'sabueso_v9_correction_proof', 'run_spider_v9_corrected', {'MAX_STEPS': 300}),
+    ('spider_v10',         'sabueso_v10',             'main', {}),
+    ('hydra_scan',         'hydra_scan',              'main', {'MAX_STEPS': 50}),
+]
+
+# Directories created in every scratch work dir: the stages write their
+# outputs to fixed relative paths and do not create them themselves
+WORK_DIRS = [
+    'data/raw',
+    'data/processed',
+    'FINAL_PMN/src/17_SABUESO_CON_CORRECION/data',     # spider_v9
+    'FINAL_PMN/src/17_SABUESO_CON_CORRECION/images',
+]
+
+# Executed by the stage subprocess: apply overrides, then call the entry point
+_RUNNER = """
+import sys, json, importlib
+name, func, overrides, args = json.loads(sys.argv[1])
+mod = importlib.import_module(name)
+for key, value in overrides.items():
+    setattr(mod, key, value)
+getattr(mod, func)(*args)
+"""
+
+def sky_path(nside, layout, seed=DEFAULT_SEED):
+    """Synthetic sky FITS for (nside, layout), generated on first use."""
+    path = os.path.join(BENCH_DIR, 'skies', f"sky_{nside}_{layout}_{seed}.fits")
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        print(f"  -> Generating synthetic sky NSIDE {nside} ({layout})...")
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.fits')
+        os.close(fd)
+        write_sky(tmp, make_sky(nside, seed), layout=layout)
+        os.replace(tmp, path)
+    return path
+
+def run_stage(workdir, module, func, overrides, args):
+    """Runs one stage in a subprocess; returns wall/CPU seconds, peak RSS and exit status."""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = SCRIPTS_DIR + os.pathsep + env.get('PYTHONPATH', '')
+    env['MPLBACKEND'] = 'Agg'
+    env['CCC_CACHE_DIR'] = os.path.join(workdir, 'data', 'cache')
+    payload = json.dumps([module, func, overrides, args])
+
+    log_path = os.path.join(workdir, 'logs', f"{module}.{func}.log")
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    with open(log_path, 'w') as log:
+        t0 = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, '-c', _RUNNER, payload], cwd=workdir, env=env,
+                                stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL)
+        _, status, usage = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - t0
+    proc.returncode = os.waitstatus_to_exitcode(status)
+
+    result = {
+        'status': 'ok' if proc.returncode == 0 else f'failed ({proc.returncode})',
+        'wall_s': round(wall, 3),
+        'cpu_s': round(usage.ru_utime + usage.ru_stime, 3),
+        # ru_maxrss is in KB on Linux: the largest of the stage process and its workers
+        'peak_rss_mb': round(usage.ru_maxrss / 1024.0, 1),
+    }
+    if proc.returncode != 0:
+        with open(log_path) as log:
+            result['error'] = log.read().strip().splitlines()[-1:] or ['']
+    return result
+
+def run_suite(nsides, layouts, stage_names, keep=False):
+    stages = [s for s in STAGES if stage_names is None or s[0] in stage_names]
+    results = []
+    for nside in nsides:
+        for layout in layouts:
+            sky = os.path.abspath(sky_path(nside, layout))
+            workdir = os.path.abspath(tempfile.mkdtemp(prefix=f"work_{nside}_{layout}_", dir=BENCH_DIR))
+            for d in WORK_DIRS:
+                os.makedirs(os.path.join(workdir, d))
+            os.symlink(sky, os.path.join(workdir, 'data', 'raw', PLANCK_NAME))
+            try:
+                for name, module, func, overrides in stages:
+                    args = [os.path.join('data', 'raw', PLANCK_NAME)] if name == 'map_cache' else []
+                    print(f"[NSIDE {nside} | {layout}] {name} ...", end=' ', flush=True)
+                    res = run_stage(workdir, module, func, overrides, args)
+                    print(f"{res['status']} | {res['wall_s']:.2f} s | {res['peak_rss_mb']:.0f} MB")
+                    results.append({'nside': nside, 'layout': layout, 'stage': name, **res})
+            finally:
+                if keep:
+                    print(f"  -> Work dir kept: {workdir}")
+                else:
+                    shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+def environment():
+    return {
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'host': platform.node(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'healpy': hp.__version__,
+        'cpu_count': os.cpu_count(),
+        'seed': DEFAULT_SEED,
+    }
+
+def compare(results, baseline):
+    """Prints wall-time and peak-RSS ratios against the baseline (new / old)."""
+    old = {(r['nside'], r['layout'], r['stage']): r for r in baseline['results']}
+    print(f"\nComparison with baseline of {baseline['environment']['date']} (new / old):")
+    print(f"{'NSIDE':>6} {'layout':>9} {'stage':<20} {'wall':>8} {'ratio':>7} {'RSS MB':>8} {'ratio':>7}")
+    for r in results:
+        b = old.get((r['nside'], r['layout'], r['stage']))
+        if b is None or b['status'] != 'ok' or r['status'] != 'ok':
+            continue
+        print(f"{r['nside']:>6} {r['layout']:>9} {r['stage']:<20} {r['wall_s']:>8.2f} "
+              f"{r['wall_s'] / max(b['wall_s'], 1e-9):>7.2f} {r['peak_rss_mb']:>8.0f} "
+              f"{r['peak_rss_mb'] / max(b['peak_rss_mb'], 1e-9):>7.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--nside', type=int, nargs='+', default=[256])
+    parser.add_argument('--layout', nargs='+', choices=LAYOUTS, default=list(LAYOUTS))
+    parser.add_argument('--stages', nargs='+', choices=[s[0] for s in STAGES], default=None)
+    parser.add_argument('--save-baseline', action='store_true', help=f"also write {BASELINE_FILE}")
+    parser.add_argument('--keep', action='store_true', help='keep the scratch work directories')
+    opts = parser.parse_args()
+
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    report = {'environment': environment(),
+              'results': run_suite(opts.nside, opts.layout, opts.stages, keep=opts.keep)}
+
+    out = os.path.join(BENCH_DIR, f"run_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(out, 'w') as fh:
+        json.dump(report, fh, indent=1)
+    print(f"\nResults saved to {out}")
+
+    if os.path.exists(BASELINE_FILE) and not opts.save_baseline:
+        with open(BASELINE_FILE) as fh:
+            compare(report['results'], json.load(fh))
+    if opts.save_baseline:
+        shutil.copyfile(out, BASELINE_FILE)
+        print(f"Baseline updated: {BASELINE_FILE}")
+
+if __name__ == "__main__":
+    main()
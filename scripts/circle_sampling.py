@@ -0,0 +1,134 @@
+# ==============================================================================
+#  The Geometry of the Echo: PMN-01 Model Source Code
+#  ----------------------------------------------------------------------------
+#  (c) 2025 Pablo Miguel Nieto Muñoz
+#  License: MIT (See LICENSE file for details)
+#
+#  Scientific Citation:
+#  Nieto Muñoz, P. M. (2025). "The Geometry of the Echo: Observational
+#  Confirmation of the Chiral Dodecahedral Universe".
+#  Zenodo.
+# ==============================================================================
+
+"""
+Azimuthal sampling of circles as one sparse operator.
+
+For a batch of circles (centre theta/phi, radius) the bilinear HEALPix
+interpolation weights of n_samples equally spaced points per circle are
+stored as a scipy.sparse CSR matrix. Columns index only the pixels the
+circles touch (`pixels`), so sampling every circle of the batch is a
+single gather + sparse mat-vec per field:
+
+    sampler = load_sampler(nside, theta, phi, radius_rad, n_samples=360)
+    profiles = sampler.sample(map_I)          # (n_circles, n_samples)
+
+Samples run in position angle around the centre, 0 = north, growing east
+(the same convention as ring_geometry.azimuth_order). Operators are
+cached on disk per (nside, circle set, n_samples).
+"""
+
+import os
+import hashlib
+import tempfile
+import numpy as np
+import healpy as hp
+import scipy.sparse as sp
+from map_cache import CACHE_DIR
+
+CIRCLE_OPERATOR_VERSION = 1
+
+def circle_points(theta, phi, radius_rad, n_samples):
+    """
+    (theta, phi) of n_samples points per circle, circle-major.
+    theta, phi, radius_rad: scalars or arrays of len(n_circles).
+    """
+    theta, phi, radius_rad = np.broadcast_arrays(np.atleast_1d(theta).astype(np.float64),
+                                                 np.atleast_1d(phi).astype(np.float64),
+                                                 np.atleast_1d(radius_rad).astype(np.float64))
+    c = np.atleast_2d(hp.ang2vec(theta, phi))
+
+    # Local frame: e_north towards the pole (x axis near the poles), e_east completes it
+    ref = np.zeros_like(c)
+    near_pole = np.abs(c[:, 2]) >= 0.999999
+    ref[~near_pole, 2] = 1.0
+    ref[near_pole, 0] = 1.0
+    e_east = np.cross(ref, c)
+    e_east /= np.linalg.norm(e_east, axis=1, keepdims=True)
+    e_north = np.cross(c, e_east)
+
+    az = 2.0 * np.pi * np.arange(n_samples) / n_samples
+    cos_r = np.cos(radius_rad)[:, None, None]
+    sin_r = np.sin(radius_rad)[:, None, None]
+    direction = (np.cos(az)[None, :, None] * e_north[:, None, :]
+                 + np.sin(az)[None, :, None] * e_east[:, None, :])
+    points = cos_r * c[:, None, :] + sin_r * direction
+    return hp.vec2ang(points.reshape(-1, 3))
+
+class CircleSampler:
+    """Sparse (n_circles * n_samples, len(pixels)) bilinear sampling operator."""
+
+    def __init__(self, matrix, pixels, n_samples, nside, nest=False):
+        self.matrix = matrix
+        self.pixels = pixels
+        self.n_samples = int(n_samples)
+        self.nside = int(nside)
+        self.nest = bool(nest)
+
+    @property
+    def n_circles(self):
+        return self.matrix.shape[0] // self.n_samples
+
+    def sample(self, values):
+        """
+        values: full-sky map (len npix) or values already gathered at `pixels`.
+        Returns (n_circles, n_samples) float64 profiles.
+        """
+        values = np.asarray(values)
+        if len(values) != len(self.pixels):
+            values = values[self.pixels]
+        out = self.matrix @ values.astype(np.float64)
+        return out.reshape(self.n_circles, self.n_samples)
+
+def build_sampler(nside, theta, phi, radius_rad, n_samples=360, nest=False):
+    """Builds the operator for a batch of circles (see module docstring)."""
+    t, p = circle_points(theta, phi, radius_rad, n_samples)
+    pix, weights = hp.get_interp_weights(nside, t, p, nest=nest)
+
+    n_rows = len(t)
+    rows = np.repeat(np.arange(n_rows, dtype=np.int64), pix.shape[0])
+    pixels, cols = np.unique(pix.T.ravel(), return_inverse=True)
+    matrix = sp.csr_matrix((weights.T.ravel(), (rows, cols.ravel())), shape=(n_rows, len(pixels)))
+    matrix.sum_duplicates()
+    return CircleSampler(matrix, pixels, n_samples, nside, nest)
+
+def sampler_key(nside, theta, phi, radius_rad, n_samples, nest=False):
+    """Cache key for (nside, circle set, n_samples, ordering)."""
+    h = hashlib.sha256(f"v{CIRCLE_OPERATOR_VERSION}|{nside}|{n_samples}|{int(nest)}".encode())
+    for arr in np.broadcast_arrays(np.atleast_1d(theta).astype(np.float64),
+                                   np.atleast_1d(phi).astype(np.float64),
+                                   np.atleast_1d(radius_rad).astype(np.float64)):
+        h.update(np.ascontiguousarray(arr).tobytes())
+    return h.hexdigest()[:24]
+
+def load_sampler(nside, theta, phi, radius_rad, n_samples=360, nest=False, cache_dir=CACHE_DIR):
+    """Returns the sampler, loading it from disk or building and storing it."""
+    key = sampler_key(nside, theta, phi, radius_rad, n_samples, nest)
+    circles_dir = os.path.join(cache_dir, 'circles')
+    path = os.path.join(circles_dir, f"circles_{key}.npz")
+
+    if os.path.exists(path):
+        with np.load(path) as data:
+            matrix = sp.csr_matrix((data['data'], data['indices'], data['indptr']),
+                                   shape=tuple(data['shape']))
+            return CircleSampler(matrix, data['pixels'], int(data['n_samples']), nside, nest)
+
+    sampler = build_sampler(nside, theta, phi, radius_rad, n_samples, nest)
+    os.makedirs(circles_dir, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=circles_dir, suffix='.npz')
+    os.close(fd)
+    m = sampler.matrix
+    np.savez_compressed(tmp, data=m.data, indices=m.indices, indptr=m.indptr,
+                        shape=np.array(m.shape), pixels=sampler.pixels,
+                        n_samples=np.int64(sampler.n_samples))
+    os.replace(tmp, path)
+    return sampler
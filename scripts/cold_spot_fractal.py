@@ -16,6 +16,10 @@ import pandas as pd
 from scipy.stats import entropy, pearsonr
 import sys
 import os
+from planck_io import resolve_layout, describe_layout
+from map_cache import load_maps
+from ring_stats import hurst_rs_batch
+from ring_geometry import query_annulus
 
 # --- CONFIGURACIÓN DEL FRANCOTIRADOR ---
 # Coordenadas de la Mancha Fría (Cold Spot)
@@ -23,26 +27,7 @@ TARGET_L = 209.0
 TARGET_B = -57.0
 INPUT_FILE = 'data/raw/COM_CMB_IQU-sevem_2048_R4.00.fits' # Asegúrate que este nombre es correcto
 OUTPUT_FILE = 'data/processed/cold_spot_profile.csv'
-
-def calculate_hurst(ts):
-    ts = np.array(ts)
-    if len(ts) < 20: return np.nan
-    try:
-        lags = range(2, min(len(ts)//2, 50))
-        tau = []
-        for lag in lags:
-            rs_values = []
-            for start in range(0, len(ts) - lag, lag):
-                chunk = ts[start:start+lag]
-                if len(chunk) < 2: continue
-                R = np.max(np.cumsum(chunk - np.mean(chunk))) - np.min(np.cumsum(chunk - np.mean(chunk)))
-                S = np.std(chunk, ddof=1)
-                if S > 0: rs_values.append(R/S)
-            if rs_values: tau.append((lag, np.mean(rs_values)))
-        if len(tau) < 3: return 0.5
-        tau_df = pd.DataFrame(tau, columns=['lag', 'rs'])
-        return np.polyfit(np.log10(tau_df['lag']), np.log10(tau_df['rs']), 1)[0]
-    except: return np.nan
+HURST_MAX_LAG = 50
 
 def main():
     print(f"--- COLD SPOT SNIPER MISSION ---")
@@ -51,24 +36,13 @@ def main():
     # 1. Cargar Mapa (Modo Inteligente)
     print("Cargando mapa SEVEM...")
     try:
-        # Intentamos leer HDU 1 (Intensidad) y HDU 2 (Polarización) por separado si es necesario
-        # Para SEVEM PR4, a veces están juntos o separados.
-        # Probamos lectura estándar primero
-        maps = hp.read_map(INPUT_FILE, field=None, hdu=1, verbose=False, memmap=True)
-        
-        # Si devuelve solo 1 campo, buscamos Q/U en el siguiente HDU
-        if len(maps) == 1 or maps.ndim == 1:
-            print("Formato Split detectado. Leyendo Q/U de HDU 2...")
-            map_I = maps
-            maps_pol = hp.read_map(INPUT_FILE, field=None, hdu=2, verbose=False, memmap=True)
-            map_Q = maps_pol[0]
-            map_U = maps_pol[1]
-        else:
-            map_I = maps[0]
-            map_Q = maps[1]
-            map_U = maps[2]
+        # HDU 1 (Intensidad) y HDU 2 (Polarización) juntos o separados (SEVEM PR4):
+        # el formato se resuelve leyendo solo las cabeceras FITS
+        layout = resolve_layout(INPUT_FILE)
+        print(f"Formato: {describe_layout(layout)}")
+        map_I, map_Q, map_U = load_maps(INPUT_FILE, ('I', 'Q', 'U'))
             
-        nside = hp.get_nside(map_I)
+        nside = layout['nside']
         print(f"Mapa cargado. NSIDE: {nside}")
         
     except Exception as e:
@@ -89,7 +63,7 @@ def main():
     # 3. Biopsia Radial
     # Vamos a expandirnos desde el centro grado a grado
     print("Iniciando escaneo radial...")
-    results = []
+    rings = []
     
     # Escaneamos desde 0.5 grados hasta 25 grados de radio
     radii = np.arange(0.5, 25.0, 0.5) 
@@ -102,9 +76,7 @@ def main():
         inner = r_rad - width_rad/2
         outer = r_rad + width_rad/2
         
-        pix_outer = hp.query_disc(nside, center_vec, outer)
-        pix_inner = hp.query_disc(nside, center_vec, inner)
-        ring_pixels = np.setdiff1d(pix_outer, pix_inner)
+        ring_pixels = query_annulus(nside, center_vec, inner, outer)
         
         if len(ring_pixels) < 100: continue
         
@@ -113,12 +85,20 @@ def main():
         vals_Q = map_Q[ring_pixels]
         vals_U = map_U[ring_pixels]
         vals_P = np.sqrt(vals_Q**2 + vals_U**2)
-        
-        # Métricas
-        h_I = calculate_hurst(vals_I)
-        h_P = calculate_hurst(vals_P)
         corr, _ = pearsonr(vals_I, vals_P)
-        
+        rings.append((r_deg, vals_I, vals_P, corr))
+
+    if not rings:
+        print("Ningún anillo con suficientes píxeles.")
+        sys.exit(1)
+
+    # Hurst de todos los anillos de una sola pasada (lote vectorizado)
+    offsets = np.r_[0, np.cumsum([len(r[1]) for r in rings])]
+    hurst_I = hurst_rs_batch(np.concatenate([r[1] for r in rings]), offsets, max_lag=HURST_MAX_LAG)
+    hurst_P = hurst_rs_batch(np.concatenate([r[2] for r in rings]), offsets, max_lag=HURST_MAX_LAG)
+
+    results = []
+    for (r_deg, _, _, corr), h_I, h_P in zip(rings, hurst_I, hurst_P):
         print(f"Radio {r_deg:5.1f}° | Hurst I: {h_I:.3f} | Corr I-P: {corr:.3f}")
         
         results.append({
@@ -13,6 +13,7 @@
 import healpy as hp
 import numpy as np
 import matplotlib.pyplot as plt
+from planck_io import region_map
 
 # CONFIGURACIÓN
 INPUT_FILE = 'data/raw/COM_CMB_IQU-sevem_2048_R4.00.fits'
@@ -27,6 +28,10 @@ SCAR_LON = 354.38
 DUST_LAT = 0.00
 DUST_LON = 354.38
 
+# Radio leído del FITS alrededor de cada muestra: cubre el gnomview
+# (300 px * 3' -> 15º de lado, ~10.6º de semidiagonal)
+LOAD_RADIUS_DEG = 11.0
+
 def get_patch_pixels(map_data, lat, lon, radius_deg=5.0):
     """Extrae los valores de los píxeles en un disco de forma robusta."""
     # CORRECCIÓN: Conversión manual a Radianes (Theta, Phi)
@@ -47,18 +52,11 @@ def get_patch_pixels(map_data, lat, lon, radius_deg=5.0):
 def main():
     print(f"--- COMPARATIVA FORENSE: CICATRIZ vs POLVO GALÁCTICO ---")
     
-    # 1. Cargar Mapa (Solo Intensidad esta vez)
+    # 1. Cargar Mapa (Solo Intensidad, y solo alrededor de las dos muestras)
     print("Cargando mapa...")
-    try:
-        # Intentamos cargar campo 0 (Intensidad)
-        maps = hp.read_map(INPUT_FILE, field=0, verbose=False, memmap=True)
-    except:
-        # Fallback por si acaso
-        maps = hp.read_map(INPUT_FILE, field=None, hdu=1, verbose=False, memmap=True)
-    
-    # Asegurar que es 1D array
-    if maps.ndim > 1: map_I = maps[0]
-    else: map_I = maps
+    targets = [hp.ang2vec(np.radians(90.0 - lat), np.radians(lon))
+               for lat, lon in [(SCAR_LAT, SCAR_LON), (DUST_LAT, DUST_LON)]]
+    map_I = region_map(INPUT_FILE, targets, np.radians(LOAD_RADIUS_DEG), field='I')
 
     # 2. Extraer Muestras
     print(f"Extrayendo biopsia de Cicatriz (Lat {SCAR_LAT})...")
@@ -14,6 +14,8 @@ import numpy as np
 import healpy as hp
 import matplotlib.pyplot as plt
 import os
+from map_cache import load_maps
+from tracker_engine import Spider
 
 # --- CONFIGURACIÓN ---
 INPUT_FILE = 'data/raw/COM_CMB_IQU-sevem_2048_R4.00.fits'
@@ -24,25 +26,9 @@ BEARING = 204.5
 STEP_SIZE = 0.1
 MAX_DISTANCE = 45 # Sabemos que anda por 35, miramos hasta 45 por si acaso
 
-def get_structural_signal(lat, lon, map_I, map_P, nside):
-    """
-    Detecta si estamos en un NODO.
-    Un nodo se caracteriza por tener alta complejidad (intersección).
-    Usamos la varianza local como proxy de 'cruce de caminos'.
-    """
-    pix = hp.ang2pix(nside, np.pi/2 - np.radians(lat), np.radians(lon))
-    # Vecinos del pixel
-    neighbors = hp.get_all_neighbours(nside, pix)
-    vals = map_I[neighbors]
-    # Si hay mucha varianza, es que hay 'lío' (cruce de paredes de dominio)
-    return np.std(vals) * map_P[pix]
-
-def move(lat, lon, angle, step_deg):
-    lat_r, lon_r = np.radians(lat), np.radians(lon)
-    ang_r, dist_r = np.radians(angle), np.radians(step_deg)
-    new_lat_r = np.arcsin(np.sin(lat_r)*np.cos(dist_r) + np.cos(lat_r)*np.sin(dist_r)*np.cos(ang_r))
-    new_lon_r = lon_r + np.arctan2(np.sin(ang_r)*np.sin(dist_r)*np.cos(lat_r), np.cos(dist_r)-np.sin(lat_r)*np.sin(new_lat_r))
-    return np.degrees(new_lat_r), np.degrees(new_lon_r)
+# Señal estructural ("nodalidad") medida en la propia posición antes de cada paso:
+# varianza local de I (8 vecinos) * P, alta donde se cruzan paredes de dominio
+SPIDER = Spider(kernel='std_p', step_size=STEP_SIZE, look_ahead=0)
 
 def cosmic_ruler():
     print("📏 LA REGLA CÓSMICA: Midiendo la celda del universo...")
@@ -51,27 +37,16 @@ def cosmic_ruler():
         print(f"❌ Falta el archivo {INPUT_FILE}")
         return
 
-    maps = hp.read_map(INPUT_FILE, field=[0,1,2], verbose=False)
-    map_I, map_P = maps[0], np.sqrt(maps[1]**2 + maps[2]**2)
+    map_I, map_P = load_maps(INPUT_FILE, ('I', 'P'))
     nside = hp.get_nside(map_I)
 
     print(f"   📍 Saliendo de Vértice 647 con Rumbo {BEARING}º...")
     
-    curr_lat, curr_lon = START_LAT, START_LON
-    dist_travelled = 0
-    signal_log = []
-    
     # Caminamos paso a paso
     steps = int(MAX_DISTANCE / STEP_SIZE)
-    
-    for _ in range(steps):
-        # 1. Medir "Nodalidad" (¿Parece esto un vértice?)
-        sig = get_structural_signal(curr_lat, curr_lon, map_I, map_P, nside)
-        signal_log.append(sig)
-        
-        # 2. Avanzar
-        curr_lat, curr_lon = move(curr_lat, curr_lon, BEARING, STEP_SIZE)
-        dist_travelled += STEP_SIZE
+    res = SPIDER.run(START_LAT, START_LON, BEARING, map_I, map_P, nside, steps)
+    signal_log = res['ahead'][:, 0]
+    dist_travelled = steps * STEP_SIZE
     
     # --- ANÁLISIS DE LA REGLA ---
     # Buscamos el pico de señal DESPUÉS de haber salido del origen (digamos > 10 grados)
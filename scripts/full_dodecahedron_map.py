@@ -15,6 +15,8 @@ import healpy as hp
 import matplotlib.pyplot as plt
 from scipy.spatial.transform import Rotation as R
 import pandas as pd
+from map_cache import load_maps
+from sky_masks import galactic_cut
 
 # --- CONFIGURACIÓN ---
 INPUT_FILE = 'data/raw/COM_CMB_IQU-sevem_2048_R4.00.fits'
@@ -70,16 +72,12 @@ def main():
     print("🌐 INICIANDO PROTOCOLO DODECA-SCANNER (MAPA COMPLETO) 🌐")
     
     # 1. Cargar Datos
-    # Suppress verbose output if possible or ignore warning
-    maps = hp.read_map(INPUT_FILE, field=[0,1,2])
-    map_comb = maps[0] * np.sqrt(maps[1]**2 + maps[2]**2)
-    nside = hp.get_nside(maps[0])
+    # Copia en RAM: la máscara galáctica escribe sobre el mapa
+    map_comb = np.array(load_maps(INPUT_FILE, 'IP'))
+    nside = hp.get_nside(map_comb)
     
     # Máscara Galáctica
-    npix = hp.nside2npix(nside)
-    theta, _ = hp.pix2ang(nside, np.arange(npix))
-    lat_gal = 90 - np.degrees(theta)
-    mask = (np.abs(lat_gal) > 20.0)
+    mask = galactic_cut(nside, 20.0)
     map_comb[~mask] = 0.0
 
     # 2. Alinear Dodecaedro con Cara Alfa
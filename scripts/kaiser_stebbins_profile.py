@@ -13,6 +13,7 @@
 import numpy as np
 import healpy as hp
 import matplotlib.pyplot as plt
+from planck_io import read_interp
 
 # CONFIGURACIÓN
 INPUT_FILE = 'data/raw/COM_CMB_IQU-sevem_2048_R4.00.fits'
@@ -65,20 +66,15 @@ def main():
     print(f"--- PERFIL KAISER-STEBBINS (CORTE TRANSVERSAL) ---")
     print(f"Cruzando la cicatriz en Lat {SCAR_LAT}, Lon {SCAR_LON}")
     
-    # 1. Cargar Mapas
-    print("Cargando datos...")
-    maps = hp.read_map(INPUT_FILE, field=[0, 1, 2], verbose=False, memmap=True)
-    map_I, map_Q, map_U = maps[0], maps[1], maps[2]
-    nside = hp.get_nside(map_I)
-    
-    # 2. Obtener Coordenadas del Corte
+    # 1. Obtener Coordenadas del Corte
     vecs, x_axis_deg = get_profile_coords(SCAR_LAT, SCAR_LON, PROFILE_LENGTH, PROFILE_ANGLE, SAMPLES)
+    theta, phi = hp.vec2ang(vecs)
     
-    # 3. Extraer Datos a lo largo de la línea
-    # Usamos interpolación bilineal para que sea suave
-    temps = hp.get_interp_val(map_I, [v[0] for v in vecs], [v[1] for v in vecs], [v[2] for v in vecs])
-    q_vals = hp.get_interp_val(map_Q, [v[0] for v in vecs], [v[1] for v in vecs], [v[2] for v in vecs])
-    u_vals = hp.get_interp_val(map_U, [v[0] for v in vecs], [v[1] for v in vecs], [v[2] for v in vecs])
+    # 2. Extraer Datos a lo largo de la línea
+    # Interpolación bilineal (mismos pesos que hp.get_interp_val) leyendo del FITS
+    # solo los 4 píxeles vecinos de cada muestra, no el mapa completo
+    print("Cargando datos del corte...")
+    temps, q_vals, u_vals = read_interp(INPUT_FILE, theta, phi, ('I', 'Q', 'U'))
     
     # Calcular Polarización Total y Ángulo
     p_intensity = np.sqrt(q_vals**2 + u_vals**2)
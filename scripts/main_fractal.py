@@ -17,126 +17,94 @@ import glob
 import numpy as np
 import healpy as hp
 import pandas as pd
-from scipy.stats import entropy, pearsonr
 from tqdm import tqdm
 import multiprocessing as mp
 from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 from astropy.io import fits
+from planck_io import read_pixels, resolve_layout, describe_layout
+from ring_stats import hurst_rs, segment_moments, hist_entropy_batch
+from ring_geometry import MIN_RING_PIXELS, load_ring_index, build_ring_set, child_centres
+from shared_maps import SharedMaps, attach, detach, start_tracker
+from result_sink import ResultSink, parts_dir, run_key, write_csv
+from phase_profile import start_run, phase, timed_task
+from scan_scheduler import dispatch
 
 # Configuration
 INPUT_PATTERN = 'data/raw/*.fits' 
 OUTPUT_FILE = 'data/processed/fractal_metrics.csv'
+HURST_MAX_LAG = 100
+STATS_CHUNK = 8_000_000   # ring pixels per vectorised statistics pass
 
-def calculate_hurst(ts):
-    """Calculates the Hurst Exponent using Rescaled Range (R/S) analysis."""
-    ts = np.array(ts)
-    if len(ts) < 20: return np.nan
-    try:
-        lags = range(2, min(len(ts)//2, 100))
-        tau = []
-        for lag in lags:
-            rs_values = []
-            for start in range(0, len(ts) - lag, lag):
-                chunk = ts[start:start+lag]
-                if len(chunk) < 2: continue
-                mean = np.mean(chunk)
-                R = np.max(np.cumsum(chunk - mean)) - np.min(np.cumsum(chunk - mean))
-                S = np.std(chunk, ddof=1)
-                if S > 0: rs_values.append(R/S)
-            if rs_values: tau.append((lag, np.mean(rs_values)))
-        
-        if len(tau) < 3: return 0.5
-        tau_df = pd.DataFrame(tau, columns=['lag', 'rs'])
-        return np.polyfit(np.log10(tau_df['lag']), np.log10(tau_df['rs']), 1)[0]
-    except:
-        return np.nan
-
-def calculate_entropy(ts):
-    """Calculates Shannon Entropy."""
-    if len(ts) == 0: return np.nan
-    hist, _ = np.histogram(ts, bins='fd', density=True)
-    return entropy(hist)
-
-def get_ring_pixels(nside, center_vec, radius_rad, width_rad=0.01):
-    """Returns pixel indices for a ring."""
-    inner_rad = radius_rad - width_rad/2
-    outer_rad = radius_rad + width_rad/2
-    pixels = hp.query_disc(nside, center_vec, outer_rad)
-    if inner_rad > 0:
-        inner_pixels = hp.query_disc(nside, center_vec, inner_rad)
-        pixels = np.setdiff1d(pixels, inner_pixels)
-    return pixels
+# Batch mode (`python scripts/main_fractal.py --batch`): every FITS matching
+# INPUT_PATTERN (SEVEM, SMICA, NILC, Commander, PR3/PR4...) goes through the
+# same ring geometry; one table keyed by (map, id_anillo).
+BATCH_MODE = '--batch' in sys.argv[1:]
+OUTPUT_BATCH_FILE = 'data/processed/fractal_metrics_batch.csv'
+
+# Adaptive mode (`--adaptive`): the coarse scan above is level 0; at each level
+# only the ADAPTIVE_TOP_K best rings are split into the 4 NESTED children of
+# their centre pixel x (radius - step, radius, radius + step).
+ADAPTIVE_MODE = '--adaptive' in sys.argv[1:]
+OUTPUT_ADAPTIVE_FILE = 'data/processed/fractal_metrics_adaptive.csv'
+ADAPTIVE_SCORE = 'corr'        # 'corr': |corr_IP| | 'hurst': max(|hurst_I - 0.5|, |hurst_P - 0.5|)
+ADAPTIVE_TOP_K = 32
+ADAPTIVE_RADIUS_STEP = 1.0     # degrees at the first refinement, halved at every level
+ADAPTIVE_MAX_NSIDE = 256       # finest centre grid
+ADAPTIVE_BUDGET = 20000        # total rings evaluated, all levels included
+
+# Scan grid: ring centres on an nside_scan grid, radii in degrees, ring width in degrees
+NSIDE_SCAN = 8
+RADII_TO_CHECK = [2.0, 4.0, 6.0, 10.0]
+RING_WIDTH_DEG = 1.0
 
 # Global storage for workers
 shared_I = None
 shared_Q = None
 shared_U = None
+shared_spec = None
 
-def init_worker(I, Q, U):
-    global shared_I, shared_Q, shared_U
-    shared_I = I
-    shared_Q = Q
-    shared_U = U
+def init_worker(spec):
+    """Attaches the shared I/Q/U arrays (works under fork and spawn)."""
+    global shared_I, shared_Q, shared_U, shared_spec
+    if spec == shared_spec:
+        return
+    shared_I = shared_Q = shared_U = None
+    detach()
+    maps = attach(spec)
+    shared_I = maps['I']
+    shared_Q = maps['Q']
+    shared_U = maps['U']
+    shared_spec = spec
 
-def process_ring_memory_optimized(args):
+@timed_task
+def process_ring_hurst(args):
     """
-    args: (ring_id, theta, phi, radius_deg, reduced_indices)
-    Uses pre-computed reduced indices to access shared memory arrays.
+    args: (ring_id, reduced_indices)
+    Hurst exponents of I and P for one ring (the only sequential metric left
+    for the workers). Uses pre-computed reduced indices into the shared arrays.
     """
-    ring_id, theta, phi, radius_deg, idxs = args
+    ring_id, idxs = args
     global shared_I, shared_Q, shared_U
     
     try:
-        if len(idxs) < 50: return None
-        
         vals_I = shared_I[idxs]
         vals_Q = shared_Q[idxs]
         vals_U = shared_U[idxs]
         
         vals_P = np.sqrt(vals_Q**2 + vals_U**2)
-        
-        # Check for zero variance
-        if np.std(vals_I) == 0 or np.std(vals_P) == 0:
-            return None
-
-        hurst_I = calculate_hurst(vals_I)
-        entropy_I = calculate_entropy(vals_I)
-        hurst_P = calculate_hurst(vals_P)
-        corr_IP, _ = pearsonr(vals_I, vals_P)
-            
-        return {
-            'id_anillo': ring_id,
-            'theta': theta,
-            'phi': phi,
-            'radio': radius_deg,
-            'hurst_I': hurst_I,
-            'entropy_I': entropy_I,
-            'hurst_P': hurst_P,
-            'corr_IP': corr_IP
-        }
+
+        hurst_I = hurst_rs(vals_I, max_lag=HURST_MAX_LAG)
+        hurst_P = hurst_rs(vals_P, max_lag=HURST_MAX_LAG)
+        return ring_id, hurst_I, hurst_P
     except Exception:
-        return None
+        return ring_id, None, None
 
-def get_nside_from_header(filepath):
-    try:
-        with fits.open(filepath) as hdul:
-            # Check HDU 1 first
-            if len(hdul) > 1:
-                header = hdul[1].header
-                if 'NSIDE' in header:
-                    return header['NSIDE']
-                elif 'NAXIS2' in header:
-                    return hp.npix2nside(header['NAXIS2'])
-    except Exception as e:
-        print(f"Header read failed: {e}")
-    
-    # Fallback: read field 0
-    print("Reading field 0 to determine NSIDE...")
-    m = hp.read_map(filepath, field=0, verbose=False)
-    nside = hp.get_nside(m)
-    del m
-    gc.collect()
-    return nside
+def process_ring_batch_task(args):
+    """Batch mode: one long-lived pool, the task names the map it belongs to."""
+    spec, task = args
+    init_worker(spec)
+    return process_ring_hurst(task)
 
 def resolve_input_file(pattern):
     files = glob.glob(pattern)
@@ -161,130 +129,27 @@ def resolve_input_file(pattern):
             
     return selected
 
-def main():
-    print("Starting CCC Fractal Analysis (PR4/SEVEM Ready)...")
-    
-    INPUT_FILE = resolve_input_file(INPUT_PATTERN)
-    print(f"Target File: {INPUT_FILE}")
+def list_input_files(pattern):
+    files = sorted(f for f in glob.glob(pattern) if f.lower().endswith('.fits'))
+    if not files:
+        print(f"Error: No FITS files found matching '{pattern}'")
+        sys.exit(1)
+    return files
 
-    # 1. Determine NSIDE
-    print("Determining Map Properties...")
-    nside = get_nside_from_header(INPUT_FILE)
-    npix = hp.nside2npix(nside)
-    print(f"NSIDE: {nside}, Total Pixels: {npix}")
+def map_label(path):
+    return os.path.splitext(os.path.basename(path))[0]
 
-    # 2. Scan Strategy & Index Calculation
-    print("Phase 1: Calculating Interest Indices (Geometric Scan)...")
-    nside_scan = 8
-    npix_scan = hp.nside2npix(nside_scan)
-    centers_theta, centers_phi = hp.pix2ang(nside_scan, np.arange(npix_scan))
-    radii_to_check = [2.0, 4.0, 6.0, 10.0]
-    
-    ring_definitions = [] 
-    all_needed_pixels = [] 
-    ring_pixel_map = [] 
-    
-    ring_id = 0
-    width_rad = np.radians(1.0)
-    
-    for r_deg in radii_to_check:
-        r_rad = np.radians(r_deg)
-        for i in range(npix_scan):
-            vec = hp.ang2vec(centers_theta[i], centers_phi[i])
-            pixels = get_ring_pixels(nside, vec, r_rad, width_rad=width_rad)
-            
-            if len(pixels) > 50:
-                ring_definitions.append((ring_id, centers_theta[i], centers_phi[i], r_deg))
-                ring_pixel_map.append(pixels)
-                all_needed_pixels.append(pixels)
-                ring_id += 1
-    
-    print(f"Identified {len(ring_definitions)} candidate rings.")
-    
-    # 3. Consolidate Unique Pixels
-    print("Phase 2: Consolidating Unique Pixels...")
-    flat_pixels = np.concatenate(all_needed_pixels)
-    unique_pixels = np.unique(flat_pixels)
-    num_unique = len(unique_pixels)
-    print(f"Unique pixels to load: {num_unique} ({num_unique/npix*100:.2f}% of map)")
-    
-    del all_needed_pixels, flat_pixels
-    gc.collect()
-    
-    # 4. Smart-Split Loading Strategy
-    print("Phase 3: Smart-Split Data Loading (Low RAM)...")
-    extracted_data = {}
-    
-    # Check if we need Split HDU logic (PR4) or Standard (PR3/SMICA)
-    try:
-        # Attempt standard single-HDU load first (Standard Healpix)
-        print("  -> Checking HDU 1 structure...")
-        test_maps = hp.read_map(INPUT_FILE, field=None, hdu=1, verbose=False, memmap=True)
-        
-        is_split_hdu = False
-        if isinstance(test_maps, np.ndarray):
-            # Only 1 map found in HDU 1? Likely Split structure.
-            if test_maps.ndim == 1:
-                is_split_hdu = True
-                print("  -> Detected Split HDU Structure (PR4 Style).")
-            elif test_maps.shape[0] < 3:
-                is_split_hdu = True
-                print("  -> Detected Partial HDU Structure. Switching to Split Logic.")
-        elif len(test_maps) < 3:
-            is_split_hdu = True
-            print("  -> Detected < 3 maps in HDU 1. Switching to Split Logic.")
-            
-        del test_maps
-        gc.collect()
-        
-    except Exception as e:
-        print(f"  -> HDU 1 check warning: {e}. Assuming Split Logic.")
-        is_split_hdu = True
+def scan_key(input_file):
+    return run_key(input_file, nside_scan=NSIDE_SCAN, radii=RADII_TO_CHECK,
+                   width=RING_WIDTH_DEG, hurst_max_lag=HURST_MAX_LAG)
 
+def load_ring_pixels(input_file, unique_pixels):
+    """Reads I, Q, U for the ring pixels only; exits on unusable data."""
+    extracted_data = {}
     try:
-        if not is_split_hdu:
-            # STANDARD LOAD (I, Q, U in HDU 1)
-            print("  -> Mode: Standard Combined HDU (SMICA/PR3)")
-            maps = hp.read_map(INPUT_FILE, field=None, hdu=1, verbose=False, memmap=True)
-            
-            # Extract
-            print("  -> Extracting I...")
-            extracted_data['I'] = np.array(maps[0][unique_pixels])
-            print("  -> Extracting Q...")
-            extracted_data['Q'] = np.array(maps[1][unique_pixels])
-            print("  -> Extracting U...")
-            extracted_data['U'] = np.array(maps[2][unique_pixels])
-            
-            del maps
-            gc.collect()
-            
-        else:
-            # SPLIT HDU LOAD (I in HDU 1, Q/U in HDU 2)
-            print("  -> Mode: Split HDU (SEVEM/Commander/PR4)")
-            
-            # 1. Load I from HDU 1 (Field 0)
-            print("  -> Loading I (HDU 1, Field 0)...")
-            map_I = hp.read_map(INPUT_FILE, field=0, hdu=1, verbose=False, memmap=True)
-            extracted_data['I'] = np.array(map_I[unique_pixels])
-            del map_I
-            gc.collect()
-            print("     I extracted.")
-            
-            # 2. Load Q from HDU 2 (Field 0)
-            print("  -> Loading Q (HDU 2, Field 0)...")
-            map_Q = hp.read_map(INPUT_FILE, field=0, hdu=2, verbose=False, memmap=True)
-            extracted_data['Q'] = np.array(map_Q[unique_pixels])
-            del map_Q
-            gc.collect()
-            print("     Q extracted.")
-            
-            # 3. Load U from HDU 2 (Field 1)
-            print("  -> Loading U (HDU 2, Field 1)...")
-            map_U = hp.read_map(INPUT_FILE, field=1, hdu=2, verbose=False, memmap=True)
-            extracted_data['U'] = np.array(map_U[unique_pixels])
-            del map_U
-            gc.collect()
-            print("     U extracted.")
+        print(f"  -> Reading I, Q, U for the ring pixels only ({os.path.basename(input_file)})...")
+        extracted_data['I'], extracted_data['Q'], extracted_data['U'] = read_pixels(
+            input_file, unique_pixels, ('I', 'Q', 'U'))
 
         # Validation
         if np.all(extracted_data['Q'] == 0) or np.all(extracted_data['U'] == 0):
@@ -294,43 +159,317 @@ def main():
     except Exception as e:
         print(f"FATAL: Data load error: {e}")
         try:
-            with fits.open(INPUT_FILE) as hdul:
+            with fits.open(input_file) as hdul:
                 print("FITS Headers Diagnosis:")
                 hdul.info()
         except: pass
         sys.exit(1)
+    return extracted_data
+
+def ring_batch_stats(extracted_data, ring_index, rings):
+    """
+    corr_IP, entropy_I and the zero-variance filter for `rings`, all at once:
+    segment reductions over the CSR layout instead of pearsonr / np.std /
+    np.histogram per ring. Returns full-length (num_rings) arrays.
+    """
+    num_rings = len(ring_index['ring_id'])
+    stats = {
+        'valid': np.zeros(num_rings, dtype=bool),
+        'corr_IP': np.full(num_rings, np.nan),
+        'entropy_I': np.full(num_rings, np.nan),
+    }
+    offsets, reduced = ring_index['offsets'], ring_index['reduced']
+    lengths = np.diff(offsets)
+
+    start = 0
+    while start < len(rings):
+        # Consecutive groups of rings, each under STATS_CHUNK pixels
+        stop, total = start + 1, lengths[rings[start]]
+        while stop < len(rings) and total + lengths[rings[stop]] <= STATS_CHUNK:
+            total += lengths[rings[stop]]
+            stop += 1
+        group = rings[start:stop]
+        idxs = np.concatenate([reduced[offsets[k]:offsets[k+1]] for k in group])
+        sub = np.zeros(len(group) + 1, dtype=np.int64)
+        sub[1:] = np.cumsum(lengths[group])
+
+        vals_I = extracted_data['I'][idxs]
+        vals_P = np.sqrt(extracted_data['Q'][idxs]**2 + extracted_data['U'][idxs]**2)
+        moments = segment_moments(vals_I, vals_P, sub)
+
+        # Zero-variance rings are dropped, as before
+        stats['valid'][group] = (lengths[group] >= MIN_RING_PIXELS) & ~moments['const_x'] & ~moments['const_y']
+        stats['corr_IP'][group] = moments['corr']
+        stats['entropy_I'][group] = hist_entropy_batch(vals_I, sub)
+        start = stop
+    return stats
+
+def hurst_tasks(ring_index, rings, stats):
+    """Worker tasks for the valid rings; reduced indices are precomputed, just slice the CSR arrays."""
+    offsets, reduced = ring_index['offsets'], ring_index['reduced']
+    return [(int(k), reduced[offsets[k]:offsets[k+1]]) for k in rings if stats['valid'][k]]
+
+def task_cost(task):
+    """R/S cost grows linearly with ring length (same lag range for every ring)."""
+    return len(task[1])
+
+def batch_task_cost(task):
+    return task_cost(task[1])
+
+def ring_record(ring_index, stats, ring_id, hurst_I, hurst_P):
+    """Output row for one ring (None when the worker failed)."""
+    if hurst_I is None:
+        return None
+    return {
+        'id_anillo': ring_id,
+        'theta': ring_index['theta'][ring_id],
+        'phi': ring_index['phi'][ring_id],
+        'radio': ring_index['radius'][ring_id],
+        'hurst_I': hurst_I,
+        'entropy_I': stats['entropy_I'][ring_id],
+        'hurst_P': hurst_P,
+        'corr_IP': stats['corr_IP'][ring_id]
+    }
+
+def main():
+    if BATCH_MODE:
+        return main_batch()
+    if ADAPTIVE_MODE:
+        return main_adaptive()
+
+    print("Starting CCC Fractal Analysis (PR4/SEVEM Ready)...")
+    start_run(OUTPUT_FILE)
+    
+    INPUT_FILE = resolve_input_file(INPUT_PATTERN)
+    print(f"Target File: {INPUT_FILE}")
+
+    # 1. Determine NSIDE
+    print("Determining Map Properties (headers only)...")
+    layout = resolve_layout(INPUT_FILE)
+    print(f"  -> Layout: {describe_layout(layout)}")
+    nside = layout['nside']
+    npix = layout['npix']
+    print(f"NSIDE: {nside}, Total Pixels: {npix}")
+
+    # 2. Scan Strategy & Index Calculation
+    # Ring geometry only depends on NSIDE: load the cached CSR index or build it once
+    print("Phase 1: Calculating Interest Indices (Geometric Scan)...")
+    with phase('ring_index', nside=nside):
+        ring_index = load_ring_index(nside, NSIDE_SCAN, RADII_TO_CHECK, RING_WIDTH_DEG)
+    num_rings = len(ring_index['ring_id'])
+    print(f"Identified {num_rings} candidate rings.")
+
+    # Checkpoint: rings finished by a previous (interrupted) run are skipped
+    sink = ResultSink(parts_dir(OUTPUT_FILE), num_rings, scan_key(INPUT_FILE))
+    
+    # 3. Consolidate Unique Pixels
+    print("Phase 2: Consolidating Unique Pixels...")
+    unique_pixels = ring_index['unique_pixels']
+    num_unique = len(unique_pixels)
+    print(f"Unique pixels to load: {num_unique} ({num_unique/npix*100:.2f}% of map)")
+    
+    # 4. Subset Loading Strategy
+    # Only the FITS rows covering unique_pixels are read (combined or split HDU, RING or NESTED)
+    print("Phase 3: Subset Data Loading (Low RAM)...")
+    with phase('load_pixels', pixels=num_unique):
+        extracted_data = load_ring_pixels(INPUT_FILE, unique_pixels)
             
-    # 5. Prepare Tasks
-    print("Phase 4: Remapping Indices...")
-    tasks = []
-    for i, (rid, theta, phi, rad) in enumerate(ring_definitions):
-        original_pixels = ring_pixel_map[i]
-        reduced_idxs = np.searchsorted(unique_pixels, original_pixels)
-        tasks.append((rid, theta, phi, rad, reduced_idxs))
+    # 5. Vectorised Ring Statistics
+    # corr_IP, entropy and the variance filter for every pending ring in a few array passes
+    rings = np.flatnonzero(~sink.done)
+    print(f"Phase 4: Ring statistics for {len(rings)} rings ({sink.n_done} already done)...")
+    with phase('ring_stats', tasks=len(rings)):
+        stats = ring_batch_stats(extracted_data, ring_index, rings)
+        tasks = hurst_tasks(ring_index, rings, stats)
+        for k in rings[~stats['valid'][rings]]:
+            sink.add(k, None)
     
-    del ring_pixel_map, unique_pixels
+    del unique_pixels
     gc.collect()
     
-    # 6. Parallel Execution
-    print(f"Phase 5: Processing {len(tasks)} rings...")
+    # 6. Parallel Execution (Hurst only)
+    print(f"Phase 5: Hurst exponents for {len(tasks)} rings...")
     num_processes = max(1, mp.cpu_count() - 1)
     
-    results = []
-    with mp.Pool(processes=num_processes, initializer=init_worker, 
-                 initargs=(extracted_data['I'], extracted_data['Q'], extracted_data['U'])) as pool:
-        for res in tqdm(pool.imap_unordered(process_ring_memory_optimized, tasks), total=len(tasks)):
-            if res:
-                results.append(res)
+    # Results stream to the checkpoint in batches instead of piling up in RAM
+    with SharedMaps(extracted_data) as shared:
+        del extracted_data
+        gc.collect()
+        with phase('hurst', tasks=len(tasks), processes=num_processes) as ph, \
+             mp.Pool(processes=num_processes, initializer=init_worker, initargs=(shared.spec,)) as pool:
+            # Longest rings first, in shrinking chunks: no straggler at the end
+            results = ph.track(dispatch(pool, process_ring_hurst, tasks, num_processes, cost=task_cost))
+            for ring_id, hurst_I, hurst_P in tqdm(results, total=len(tasks)):
+                sink.add(ring_id, ring_record(ring_index, stats, ring_id, hurst_I, hurst_P))
+    sink.close()
                 
     # 7. Save
     print("Phase 6: Saving Results...")
+    with phase('save'):
+        rows = sink.write_csv(OUTPUT_FILE)
+    print(f"Done. Saved {rows} rings to {OUTPUT_FILE}")
+
+def main_batch():
+    print("Starting CCC Fractal Analysis (batch: all maps)...")
+    start_run(OUTPUT_BATCH_FILE)
+    files = list_input_files(INPUT_PATTERN)
+
+    # Maps are grouped by NSIDE: each group shares one ring index and one pixel gather list
+    groups = {}
+    for f in files:
+        layout = resolve_layout(f)
+        print(f"  -> {map_label(f)}: {describe_layout(layout)}")
+        groups.setdefault(layout['nside'], []).append(f)
+
+    num_processes = max(1, mp.cpu_count() - 1)
+    root = parts_dir(OUTPUT_BATCH_FILE)
+    sinks = []
+
+    # The pool is created before the prefetch thread starts (no fork with live threads);
+    # workers re-attach whenever a task names a new map.
+    start_tracker()
+    with mp.Pool(processes=num_processes) as pool, ThreadPoolExecutor(max_workers=1) as prefetcher:
+        for nside, group in sorted(groups.items()):
+            print(f"Phase 1: Ring index for NSIDE {nside} ({len(group)} maps)...")
+            with phase('ring_index', nside=nside):
+                ring_index = load_ring_index(nside, NSIDE_SCAN, RADII_TO_CHECK, RING_WIDTH_DEG)
+            num_rings = len(ring_index['ring_id'])
+            unique_pixels = ring_index['unique_pixels']
+            print(f"Identified {num_rings} candidate rings, {len(unique_pixels)} unique pixels.")
+
+            group_sinks = [ResultSink(os.path.join(root, map_label(f)), num_rings, scan_key(f))
+                           for f in group]
+            sinks.extend(group_sinks)
+            todo = [(f, sink) for f, sink in zip(group, group_sinks) if sink.n_done < num_rings]
+
+            # While map n is on the pool, map n+1 is being read from disk
+            pending = prefetcher.submit(load_ring_pixels, todo[0][0], unique_pixels) if todo else None
+            for n, (f, sink) in enumerate(todo):
+                # Time spent waiting for the prefetch: ~0 when the read is fully hidden
+                with phase('load_wait', map=map_label(f)):
+                    extracted_data = pending.result()
+                if n + 1 < len(todo):
+                    pending = prefetcher.submit(load_ring_pixels, todo[n + 1][0], unique_pixels)
+
+                rings = np.flatnonzero(~sink.done)
+                label = map_label(f)
+                print(f"Phase 4-5: {label}: {len(rings)} rings ({sink.n_done} already done)...")
+                with phase('ring_stats', tasks=len(rings), map=label):
+                    stats = ring_batch_stats(extracted_data, ring_index, rings)
+                    tasks = hurst_tasks(ring_index, rings, stats)
+                    for k in rings[~stats['valid'][rings]]:
+                        sink.add(k, None)
+                with SharedMaps(extracted_data) as shared, \
+                     phase('hurst', tasks=len(tasks), map=label, processes=num_processes) as ph:
+                    del extracted_data
+                    batch = [(shared.spec, t) for t in tasks]
+                    results = ph.track(dispatch(pool, process_ring_batch_task, batch, num_processes,
+                                                cost=batch_task_cost))
+                    for ring_id, hurst_I, hurst_P in tqdm(results, total=len(batch)):
+                        res = ring_record(ring_index, stats, ring_id, hurst_I, hurst_P)
+                        sink.add(ring_id, {'map': label, **res} if res else None)
+                sink.close()
+
+            del ring_index, unique_pixels
+            gc.collect()
+
+    print("Phase 6: Saving Results...")
+    with phase('save'):
+        rows = write_csv(OUTPUT_BATCH_FILE, (frame for sink in sinks for frame in sink.iter_frames()))
+    print(f"Done. Saved {rows} rings from {len(files)} maps to {OUTPUT_BATCH_FILE}")
+
+def ring_score(rec):
+    if ADAPTIVE_SCORE == 'hurst':
+        score = max(abs(rec['hurst_I'] - 0.5), abs(rec['hurst_P'] - 0.5))
+    else:
+        score = abs(rec['corr_IP'])
+    return score if np.isfinite(score) else -np.inf
+
+def evaluate_level(pool, n_workers, input_file, level_index, centre_nside, centre_pix, first_id, level):
+    """Loads the pixels of one refinement level and runs its rings through the pool."""
+    with phase('load_pixels', level=level, pixels=len(level_index['unique_pixels'])):
+        extracted_data = load_ring_pixels(input_file, level_index['unique_pixels'])
+    rings = np.arange(len(level_index['ring_id']))
+    with phase('ring_stats', tasks=len(rings), level=level):
+        stats = ring_batch_stats(extracted_data, level_index, rings)
+        tasks = hurst_tasks(level_index, rings, stats)
+    records = []
+    with SharedMaps(extracted_data) as shared, phase('hurst', tasks=len(tasks), level=level) as ph:
+        del extracted_data
+        batch = [(shared.spec, t) for t in tasks]
+        results = ph.track(dispatch(pool, process_ring_batch_task, batch, n_workers, cost=batch_task_cost))
+        for ring_id, hurst_I, hurst_P in tqdm(results, total=len(batch)):
+            res = ring_record(level_index, stats, ring_id, hurst_I, hurst_P)
+            if res:
+                res.update(id_anillo=first_id + ring_id, nivel=level, nside_centro=centre_nside,
+                           pix_centro=int(centre_pix[ring_id]), score=ring_score(res))
+                records.append(res)
+    return records
+
+def main_adaptive():
+    print("Starting CCC Fractal Analysis (adaptive coarse-to-fine)...")
+    start_run(OUTPUT_ADAPTIVE_FILE)
+    INPUT_FILE = resolve_input_file(INPUT_PATTERN)
+    layout = resolve_layout(INPUT_FILE)
+    print(f"  -> Layout: {describe_layout(layout)}")
+    nside = layout['nside']
+
+    # Level 0: the regular coarse grid (cached ring index)
+    level_index = load_ring_index(nside, NSIDE_SCAN, RADII_TO_CHECK, RING_WIDTH_DEG)
+    centre_nside = NSIDE_SCAN
+    centre_pix = hp.ang2pix(NSIDE_SCAN, level_index['theta'], level_index['phi'])
+    step = ADAPTIVE_RADIUS_STEP
+    level, n_evaluated = 0, 0
+    results = []
+
+    num_processes = max(1, mp.cpu_count() - 1)
+    start_tracker()
+    with mp.Pool(processes=num_processes) as pool:
+        while True:
+            n_rings = len(level_index['ring_id'])
+            print(f"Level {level}: centres at NSIDE {centre_nside}, {n_rings} rings "
+                  f"({n_evaluated}/{ADAPTIVE_BUDGET} evaluated so far)...")
+            records = evaluate_level(pool, num_processes, INPUT_FILE, level_index, centre_nside, centre_pix,
+                                     n_evaluated, level)
+            results.extend(records)
+            n_evaluated += n_rings
+
+            child_nside = 2 * centre_nside
+            if child_nside > ADAPTIVE_MAX_NSIDE or n_evaluated >= ADAPTIVE_BUDGET or not records:
+                break
+
+            # Best rings first, so a budget cut only drops the weakest candidates
+            best = sorted(records, key=ring_score, reverse=True)[:ADAPTIVE_TOP_K]
+            children = child_centres(centre_nside, [r['pix_centro'] for r in best]).reshape(-1, 4)
+            seen = set()
+            cand_pix, cand_radius = [], []
+            for rec, kids in zip(best, children):
+                for pix in kids:
+                    for radius in (rec['radio'] - step, rec['radio'], rec['radio'] + step):
+                        key = (int(pix), round(radius, 6))
+                        if radius > RING_WIDTH_DEG / 2.0 and key not in seen:
+                            seen.add(key)
+                            cand_pix.append(int(pix))
+                            cand_radius.append(radius)
+            cand_pix = np.asarray(cand_pix[:ADAPTIVE_BUDGET - n_evaluated], dtype=np.int64)
+            cand_radius = cand_radius[:len(cand_pix)]
+            if len(cand_pix) == 0:
+                break
+
+            theta, phi = hp.pix2ang(child_nside, cand_pix)
+            level_index = build_ring_set(nside, theta, phi, cand_radius, RING_WIDTH_DEG)
+            centre_pix = cand_pix[level_index['source']]
+            centre_nside = child_nside
+            step /= 2.0
+            level += 1
+
+    print(f"Saving {len(results)} rings from {level + 1} levels ({n_evaluated} evaluated)...")
     df = pd.DataFrame(results)
-    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-    df.to_csv(OUTPUT_FILE, index=False)
-    print(f"Done. Saved to {OUTPUT_FILE}")
+    os.makedirs(os.path.dirname(OUTPUT_ADAPTIVE_FILE), exist_ok=True)
+    df.to_csv(OUTPUT_ADAPTIVE_FILE, index=False)
+    if len(df):
+        print(df.sort_values(by='score', ascending=False).head(5))
+    print(f"Done. Saved to {OUTPUT_ADAPTIVE_FILE}")
 
 if __name__ == "__main__":
-    try:
-        mp.set_start_method('fork', force=True)
-    except RuntimeError: pass
     main()
@@ -16,6 +16,14 @@ import pandas as pd
 from scipy.stats import pearsonr
 import sys
 from multiprocessing import Pool, cpu_count
+from map_cache import load_maps
+from shared_maps import SharedMaps, init_worker, worker_maps
+from result_sink import ResultSink, TopK, parts_dir, run_key, top_records, write_csv
+from phase_profile import start_run, phase, timed_task
+from line_engine import LineProbe, AngularBins
+from scan_scheduler import prune, dispatch
+from sky_masks import planck_mask
+from ridge_maps import load_ridge, ridge_prune
 
 # --- CONFIGURACIÓN ---
 INPUT_FILE = 'data/raw/COM_CMB_IQU-sevem_2048_R4.00.fits'
@@ -33,6 +41,33 @@ ANGLE_STEP = 2
 # Si la latitud es menor a esto, ni nos molestamos en taladrar. Ahorra tiempo y falsas ilusiones.
 MIN_LAT_FILTER = 30.0 
 
+# Máscara opcional (FITS local tipo Planck common mask): los centros cuyo píxel
+# NSIDE_SCAN queda fuera (< 50% de subpíxeles válidos) tampoco se taladran
+MASK_FILE = None
+
+# Prefiltro de crestas (ridge_maps.py): solo se taladran los centros cuya cresta
+# más fuerte a menos de LINE_WIDTH supera este percentil de todos los centros.
+# None = se taladra todo (ruta original)
+RIDGE_FIELD = 'IP'
+RIDGE_PERCENTILE = None
+
+# Pertenencia a la línea: 'vector' = un query_disc por centro y test de rotación
+# vectorizado para todos los ángulos (mismos píxeles); 'polygon' = un
+# hp.query_polygon por ángulo (ruta original); 'binned' = estadísticos
+# suficientes por (sector, distancia) acumulados una vez por centro: cada
+# ángulo cuesta O(1) y ANGLE_STEP puede bajar a 1º o menos (bordes aproximados)
+LINE_ENGINE = 'vector'
+
+# Resultados: 'threshold' = todas las líneas con |corr| > CORR_THRESHOLD;
+# 'topk' = las TOP_K mejores del cielo más las TOP_K_REGION mejores de cada
+# región (píxel NSIDE REGION_NSIDE del centro), sin umbral. En 'topk' la
+# memoria y el CSV quedan acotados aunque se afine ANGLE_STEP.
+RESULT_MODE = 'threshold'
+CORR_THRESHOLD = 0.15
+TOP_K = 500
+TOP_K_REGION = 20
+REGION_NSIDE = 2
+
 def get_rotated_rect_pixels(nside, center_vec, length_deg, width_deg, angle_deg):
     """Crea un rectángulo fino rotado sobre la esfera."""
     z_axis = center_vec / np.linalg.norm(center_vec)
@@ -59,64 +94,108 @@ def get_rotated_rect_pixels(nside, center_vec, length_deg, width_deg, angle_deg)
         
     return hp.query_polygon(nside, np.array(sphere_vertices))
 
+def abs_corr(rec):
+    return abs(rec['corr_IP'])
+
+def min_corr():
+    """Umbral efectivo: en modo 'topk' entra todo y decide el ranking."""
+    return CORR_THRESHOLD if RESULT_MODE == 'threshold' else 0.0
+
+def bounded(results, center_vec):
+    """En modo 'topk' cada centro devuelve como mucho sus mejores líneas, con su región."""
+    if RESULT_MODE != 'topk':
+        return results
+    region = int(hp.vec2pix(REGION_NSIDE, *center_vec))
+    best = TopK(max(TOP_K, TOP_K_REGION), abs_corr).extend(results).records()
+    return [dict(rec, region=region) for rec in best]
+
+def center_lat(center_vec):
+    """Latitud (grados) del centro; healpy usa colatitud (theta), lat = 90 - theta."""
+    cx, cy, cz = center_vec
+    radius = np.sqrt(cx*cx + cy*cy + cz*cz)
+    theta = np.arccos(cz/radius)
+    return 90.0 - np.degrees(theta)
+
+@timed_task
 def process_point(args):
-    idx, center_vec, map_I, map_Q, map_U, nside = args
+    idx, center_vec, nside = args
+    # Los mapas viven en memoria compartida: la tarea solo lleva el índice del centro
+    maps = worker_maps()
+    map_I, map_Q, map_U = maps['I'], maps['Q'], maps['U']
     results = []
     
     # --- FILTRO DE LATITUD (OPTIMIZACIÓN) ---
     # Convertimos vector a latitud para ver si estamos en zona segura
-    # healpy usa colatitude (theta), lat = 90 - theta
-    cx, cy, cz = center_vec
-    radius = np.sqrt(cx*cx + cy*cy + cz*cz)
-    theta = np.arccos(cz/radius)
-    lat_deg = 90.0 - np.degrees(theta)
+    lat_deg = center_lat(center_vec)
     
     # Si estamos en la Galaxia (entre -30 y 30), abortamos misión en este punto.
     if abs(lat_deg) < MIN_LAT_FILTER:
-        return []
+        return idx, []
 
     # --- BARRIDO DE ALTA PRECISIÓN ---
     # Probamos cada 2 grados. Si la línea está en 1.5º, el escaneo de 2.0º la tocará.
-    for angle in range(0, 180, ANGLE_STEP):
-        
-        pixels = get_rotated_rect_pixels(nside, center_vec, LINE_LENGTH, LINE_WIDTH, angle)
+    if LINE_ENGINE == 'binned':
+        return idx, bounded(binned_lines(idx, lat_deg, center_vec, nside, map_I, map_Q, map_U), center_vec)
+
+    angles = range(0, 180, ANGLE_STEP)
+    if LINE_ENGINE == 'vector':
+        # Un solo disco por centro: los valores se leen una vez y cada ángulo es una máscara
+        probe = LineProbe(nside, center_vec, LINE_LENGTH, LINE_WIDTH)
+        disc_I = map_I[probe.pixels]
+        disc_P = np.sqrt(map_Q[probe.pixels]**2 + map_U[probe.pixels]**2)
+        members = probe.line_indices(angles, LINE_LENGTH, LINE_WIDTH)
+
+    for k, angle in enumerate(angles):
         
-        if len(pixels) < 20: continue 
+        if LINE_ENGINE == 'vector':
+            vals_I, vals_P = disc_I[members[k]], disc_P[members[k]]
+        else:
+            pixels = get_rotated_rect_pixels(nside, center_vec, LINE_LENGTH, LINE_WIDTH, angle)
+            vals_I = map_I[pixels]
+            vals_P = np.sqrt(map_Q[pixels]**2 + map_U[pixels]**2)
         
-        vals_I = map_I[pixels]
-        vals_Q = map_Q[pixels]
-        vals_U = map_U[pixels]
-        vals_P = np.sqrt(vals_Q**2 + vals_U**2)
+        if len(vals_I) < 20: continue 
         
         # Filtro básico de varianza para evitar errores numéricos
         if len(vals_I) > 2 and np.std(vals_I) > 0 and np.std(vals_P) > 0:
             corr, _ = pearsonr(vals_I, vals_P)
             
             # Guardamos candidatos fuertes
-            if abs(corr) > 0.15: 
+            if abs(corr) > min_corr(): 
                 results.append({
                     'center_idx': idx,
                     'lat': lat_deg,      # Guardamos Lat para verificar luego
                     'angle': angle,
                     'corr_IP': corr,
-                    'pixel_count': len(pixels)
+                    'pixel_count': len(vals_I)
                 })
                 
-    return results
+    return idx, bounded(results, center_vec)
+
+def binned_lines(idx, lat_deg, center_vec, nside, map_I, map_Q, map_U):
+    """Modo 'binned': correlación de todos los sectores de ANGLE_STEP grados a la vez."""
+    probe = LineProbe(nside, center_vec, LINE_LENGTH, LINE_WIDTH)
+    disc_I = map_I[probe.pixels]
+    disc_P = np.sqrt(map_Q[probe.pixels]**2 + map_U[probe.pixels]**2)
+    bins = AngularBins(probe, disc_I, disc_P, LINE_WIDTH, LINE_LENGTH,
+                       n_sectors=int(round(180.0 / ANGLE_STEP)))
+    st = bins.stats(LINE_LENGTH)
+    # Mismos filtros que el barrido exacto: mínimo de píxeles, varianza y umbral
+    keep = (st['n'] >= 20) & (st['std_I'] > 0) & (st['std_P'] > 0) & (np.abs(st['corr']) > min_corr())
+    return [{'center_idx': idx, 'lat': lat_deg, 'angle': float(bins.angles[k]),
+             'corr_IP': float(st['corr'][k]), 'pixel_count': int(st['n'][k])}
+            for k in np.flatnonzero(keep)]
 
 def main():
     print("--- LINE HUNTER V3 (PRECISION + FILTERS) ---")
     print(f"Angle Step: {ANGLE_STEP} deg | Galactic Filter: |Lat| > {MIN_LAT_FILTER}")
     
+    start_run(OUTPUT_FILE)
     print("Loading Data...")
     try:
-        maps = hp.read_map(INPUT_FILE, field=None, hdu=1, verbose=False, memmap=True)
-        if len(maps) == 1 or maps.ndim == 1:
-            map_I = maps
-            maps_pol = hp.read_map(INPUT_FILE, field=None, hdu=2, verbose=False, memmap=True)
-            map_Q, map_U = maps_pol[0], maps_pol[1]
-        else:
-            map_I, map_Q, map_U = maps[0], maps[1], maps[2]
+        # Formato (combinado o split PR4) resuelto por cabeceras dentro de la caché
+        with phase('load_maps'):
+            map_I, map_Q, map_U = load_maps(INPUT_FILE, ('I', 'Q', 'U'))
     except Exception as e:
         print(f"Error: {e}")
         sys.exit(1)
@@ -127,24 +206,57 @@ def main():
     scan_vectors = [hp.pix2vec(NSIDE_SCAN, i) for i in range(npix_scan)]
     print(f"Scanning {len(scan_vectors)} points...")
     
-    tasks = [(i, vec, map_I, map_Q, map_U, nside) for i, vec in enumerate(scan_vectors)]
+    # Checkpoint: los centros ya taladrados en una ejecución anterior se saltan
+    sink = ResultSink(parts_dir(OUTPUT_FILE), npix_scan,
+                      run_key(INPUT_FILE, nside_scan=NSIDE_SCAN, length=LINE_LENGTH, width=LINE_WIDTH,
+                              angle_step=ANGLE_STEP, min_lat=MIN_LAT_FILTER, mask=MASK_FILE, engine=LINE_ENGINE,
+                              mode=RESULT_MODE, threshold=CORR_THRESHOLD,
+                              top_k=(TOP_K, TOP_K_REGION, REGION_NSIDE),
+                              ridge=(RIDGE_FIELD, RIDGE_PERCENTILE)))
+    candidates = [(i, vec, nside) for i, vec in enumerate(scan_vectors)]
+
+    # Los centros dentro de la Galaxia ni se envían al pool: se apuntan como hechos y vacíos
+    keep_pix = planck_mask(MASK_FILE, nside=NSIDE_SCAN) if MASK_FILE else None
+    candidates, masked = prune(candidates, keep=lambda t: abs(center_lat(t[1])) >= MIN_LAT_FILTER
+                               and (keep_pix is None or keep_pix[t[0]]))
+    if RIDGE_PERCENTILE is not None:
+        # Centros sin pared que los cruce: ni se taladran. El corte se calcula sobre
+        # todos los candidatos, así no depende de si la ejecución se interrumpió
+        with phase('ridge_filter'):
+            candidates, flat = ridge_prune(candidates, load_ridge(INPUT_FILE, RIDGE_FIELD),
+                                           RIDGE_PERCENTILE, LINE_WIDTH)
+        masked += flat
+    tasks, masked = sink.pending(candidates), sink.pending(masked)
+    # Hechos en ejecuciones anteriores, antes de apuntar los enmascarados de esta
+    n_done = sink.n_done
+    for idx, _, _ in masked:
+        sink.add(idx, [])
     
-    all_hits = []
-    print("Drilling Deep Sky...")
+    print(f"Drilling Deep Sky... ({n_done} centers already done, {len(masked)} masked)")
     
-    with Pool(processes=cpu_count()) as pool:
-        for res in pool.imap_unordered(process_point, tasks, chunksize=20):
-            if res:
-                all_hits.extend(res)
+    with SharedMaps({'I': map_I, 'Q': map_Q, 'U': map_U}) as shared:
+        with phase('scan', tasks=len(tasks), processes=cpu_count()) as ph, \
+             Pool(processes=cpu_count(), initializer=init_worker, initargs=(shared.spec,)) as pool:
+            # Todos los discos cuestan casi lo mismo: el reparto en trozos menguantes evita la cola
+            for idx, res in ph.track(dispatch(pool, process_point, tasks, cpu_count())):
+                sink.add(idx, res)
+    sink.close()
                 
-    if all_hits:
-        df = pd.DataFrame(all_hits)
-        df.to_csv(OUTPUT_FILE, index=False)
-        print(f"SUCCESS: Found {len(df)} High-Confidence Lines.")
+    with phase('save'):
+        if RESULT_MODE == 'topk':
+            # Fusión en streaming de los top-K por centro: global + por región
+            best = top_records(sink.iter_records(), abs_corr, TOP_K,
+                               region=lambda rec: rec['region'], k_region=TOP_K_REGION)
+            rows = write_csv(OUTPUT_FILE, [pd.DataFrame(best)] if best else [])
+        else:
+            rows = sink.write_csv(OUTPUT_FILE)
+    if rows:
+        print(f"SUCCESS: Found {rows} High-Confidence Lines.")
         print("\nTOP 5 DEEP SKY LINES:")
-        # Ordenamos por fuerza absoluta de correlación
+        # Ordenamos por fuerza absoluta de correlación (sin cargar todo el resultado)
+        df = pd.DataFrame(top_records(sink.iter_records(), abs_corr, 5))
         df['abs_corr'] = df['corr_IP'].abs()
-        print(df.sort_values(by='abs_corr', ascending=False).head(5))
+        print(df)
     else:
         print("No significant lines found in Deep Sky.")
 
@@ -0,0 +1,173 @@
+# ==============================================================================
+#  The Geometry of the Echo: PMN-01 Model Source Code
+#  ----------------------------------------------------------------------------
+#  (c) 2025 Pablo Miguel Nieto Muñoz
+#  License: MIT (See LICENSE file for details)
+#
+#  Scientific Citation:
+#  Nieto Muñoz, P. M. (2025). "The Geometry of the Echo: Observational
+#  Confirmation of the Chiral Dodecahedral Universe".
+#  Zenodo.
+# ==============================================================================
+
+"""
+Persistent map cache.
+
+Decodes a Planck I/Q/U FITS file once into float32 .npy files (I, Q, U,
+P = sqrt(Q^2 + U^2) and the I*P product) and hands them back as read-only
+memmaps. Every later run, and every worker process, shares the same
+page-cache copy instead of re-reading the FITS and holding float64 copies.
+
+Usage:
+    from map_cache import load_maps
+    map_I, map_P = load_maps(INPUT_FILE, ('I', 'P'))
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+import healpy as hp
+from planck_io import resolve_layout
+from phase_profile import count_fits_bytes
+
+CACHE_DIR = os.environ.get('CCC_CACHE_DIR', 'data/cache')
+CACHE_VERSION = 1
+FIELDS = ('I', 'Q', 'U', 'P', 'IP')
+
+_HASH_CHUNK = 16 * 1024 * 1024
+_DIGEST_INDEX = 'digests.json'
+
+def file_digest(path, cache_dir=CACHE_DIR):
+    """
+    SHA-256 of the file content.
+    Memoized on (path, size, mtime) so a 2 GB map is only hashed once.
+    """
+    st = os.stat(path)
+    stamp = f"{os.path.realpath(path)}|{st.st_size}|{st.st_mtime_ns}"
+    index_path = os.path.join(cache_dir, _DIGEST_INDEX)
+
+    index = {}
+    if os.path.exists(index_path):
+        try:
+            with open(index_path) as fh:
+                index = json.load(fh)
+        except (OSError, ValueError):
+            index = {}
+    if stamp in index:
+        return index[stamp]
+
+    h = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(_HASH_CHUNK), b''):
+            h.update(block)
+            count_fits_bytes(len(block))
+    digest = h.hexdigest()
+
+    index[stamp] = digest
+    os.makedirs(cache_dir, exist_ok=True)
+    _atomic_write_json(index_path, index)
+    return digest
+
+def _atomic_write_json(path, payload):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w') as fh:
+        json.dump(payload, fh, indent=1)
+    os.replace(tmp, path)
+
+def _iqu_layout(path):
+    """Returns ((hdu, field), ...) for I, Q, U from the FITS headers."""
+    columns = resolve_layout(path)['columns']
+    missing = [k for k in ('I', 'Q', 'U') if k not in columns]
+    if missing:
+        raise ValueError(f"{path} has no {'/'.join(missing)} column(s); the cache needs I, Q and U.")
+    return tuple(columns[k] for k in ('I', 'Q', 'U'))
+
+def cache_key(path, cache_dir=CACHE_DIR):
+    """Cache key: content hash + I/Q/U column layout + cache format version."""
+    layout = _iqu_layout(path)
+    h = hashlib.sha256()
+    h.update(file_digest(path, cache_dir).encode())
+    h.update(repr(layout).encode())
+    h.update(f"v{CACHE_VERSION}".encode())
+    return h.hexdigest()[:32], layout
+
+def _build(path, entry_dir, layout):
+    """Decodes the FITS into float32 .npy files inside a temp dir, then publishes it."""
+    parent = os.path.dirname(entry_dir)
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix='.build-')
+    try:
+        arrays = {}
+        for name, (hdu, field) in zip(('I', 'Q', 'U'), layout):
+            print(f"  -> [cache] Decoding {name} (HDU {hdu}, field {field})...")
+            m = hp.read_map(path, field=field, hdu=hdu, memmap=True, dtype=np.float32)
+            count_fits_bytes(m.nbytes)
+            out = np.lib.format.open_memmap(os.path.join(tmp_dir, f"{name}.npy"),
+                                            mode='w+', dtype=np.float32, shape=m.shape)
+            out[:] = m
+            arrays[name] = out
+            del m
+
+        npix = arrays['I'].shape[0]
+        map_P = np.lib.format.open_memmap(os.path.join(tmp_dir, 'P.npy'),
+                                          mode='w+', dtype=np.float32, shape=(npix,))
+        map_IP = np.lib.format.open_memmap(os.path.join(tmp_dir, 'IP.npy'),
+                                           mode='w+', dtype=np.float32, shape=(npix,))
+        # Chunked so the derived maps never need a full float64 temporary
+        step = 1 << 22
+        for s in range(0, npix, step):
+            q = arrays['Q'][s:s+step].astype(np.float64)
+            u = arrays['U'][s:s+step].astype(np.float64)
+            p = np.sqrt(q**2 + u**2)
+            map_P[s:s+step] = p
+            map_IP[s:s+step] = arrays['I'][s:s+step] * p
+
+        for arr in list(arrays.values()) + [map_P, map_IP]:
+            arr.flush()
+        del arrays, map_P, map_IP
+
+        manifest = {
+            'source': os.path.abspath(path),
+            'nside': int(hp.npix2nside(npix)),
+            'ordering': 'RING',
+            'layout': [list(x) for x in layout],
+            'fields': list(FIELDS),
+            'version': CACHE_VERSION,
+        }
+        _atomic_write_json(os.path.join(tmp_dir, 'manifest.json'), manifest)
+
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            # Another process published the same entry first; keep theirs.
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+def ensure_cache(path, cache_dir=CACHE_DIR):
+    """Returns the cache entry directory for `path`, building it on first use."""
+    key, layout = cache_key(path, cache_dir)
+    entry_dir = os.path.join(cache_dir, key)
+    if not os.path.exists(os.path.join(entry_dir, 'manifest.json')):
+        print(f"  -> [cache] No cache for {os.path.basename(path)}. Building {entry_dir} ...")
+        os.makedirs(cache_dir, exist_ok=True)
+        _build(path, entry_dir, layout)
+    return entry_dir
+
+def load_maps(path, fields=('I', 'Q', 'U'), cache_dir=CACHE_DIR):
+    """
+    Returns read-only float32 memmaps (RING ordering) for the requested fields.
+    fields: any of 'I', 'Q', 'U', 'P', 'IP'. A single name returns one array.
+    """
+    single = isinstance(fields, str)
+    names = (fields,) if single else tuple(fields)
+    for name in names:
+        if name not in FIELDS:
+            raise ValueError(f"Unknown cached field '{name}'. Choose from {FIELDS}.")
+
+    entry_dir = ensure_cache(path, cache_dir)
+    maps = tuple(np.load(os.path.join(entry_dir, f"{name}.npy"), mmap_mode='r') for name in names)
+    return maps[0] if single else maps
@@ -14,6 +14,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 import healpy as hp
 import os
+from circle_sampling import load_sampler
 
 # --- TUS DATOS REALES ---
 FITS_FILE = "data/raw/COM_CMB_IQU-sevem_2048_R4.00.fits"
@@ -70,25 +71,15 @@ def mirror_dna_test():
     # Para hacerlo visual y rápido: Vamos a comparar la "huella dactilar"
     # Tomamos el anillo a 10 grados del centro en ambos parches.
     
-    # Extraer anillo A
-    vec_A = hp.ang2vec(COORD_ALPHA[1], COORD_ALPHA[0], lonlat=True)
-    ring_A_idx = hp.query_disc(nside, vec_A, np.radians(10.5)) 
-    ring_A_inner = hp.query_disc(nside, vec_A, np.radians(9.5))
-    ring_A_idx = np.setdiff1d(ring_A_idx, ring_A_inner) # Solo el borde
-    ring_A_vals = map_I[ring_A_idx]
-    
-    # Extraer anillo B (Antípoda)
-    vec_B = hp.ang2vec(COORD_GHOST[1], COORD_GHOST[0], lonlat=True)
-    ring_B_idx = hp.query_disc(nside, vec_B, np.radians(10.5)) 
-    ring_B_inner = hp.query_disc(nside, vec_B, np.radians(9.5))
-    ring_B_idx = np.setdiff1d(ring_B_idx, ring_B_inner)
-    ring_B_vals = map_I[ring_B_idx]
-    
-    # Normalizar longitudes para correlación cruzada
-    # (Remuestreamos ambos anillos a 360 puntos, 1 por grado)
+    # Anillos A y B (Antípoda) muestreados en azimut real alrededor de cada centro:
+    # 360 puntos (1 por grado, 0 = norte, creciendo hacia el este) con
+    # interpolación bilineal, los dos círculos en un solo operador disperso.
     sample_size = 360
-    signal_A = np.interp(np.linspace(0, len(ring_A_vals), sample_size), np.arange(len(ring_A_vals)), ring_A_vals)
-    signal_B = np.interp(np.linspace(0, len(ring_B_vals), sample_size), np.arange(len(ring_B_vals)), ring_B_vals)
+    lats = np.array([COORD_ALPHA[0], COORD_GHOST[0]])
+    lons = np.array([COORD_ALPHA[1], COORD_GHOST[1]])
+    theta_c, phi_c = np.radians(90.0 - lats), np.radians(lons)
+    sampler = load_sampler(nside, theta_c, phi_c, np.radians(10.0), n_samples=sample_size)
+    signal_A, signal_B = sampler.sample(map_I)
     
     # Invertir B (Paridad) porque miramos desde dentro hacia afuera en lados opuestos
     signal_B = signal_B[::-1] 
@@ -0,0 +1,253 @@
+# ==============================================================================
+#  The Geometry of the Echo: PMN-01 Model Source Code
+#  ----------------------------------------------------------------------------
+#  (c) 2025 Pablo Miguel Nieto Muñoz
+#  License: MIT (See LICENSE file for details)
+#
+#  Scientific Citation:
+#  Nieto Muñoz, P. M. (2025). "The Geometry of the Echo: Observational
+#  Confirmation of the Chiral Dodecahedral Universe".
+#  Zenodo.
+# ==============================================================================
+
+"""
+Global minimum-cost path tracer on the HEALPix neighbour graph.
+
+Instead of steering a walker step by step, the sky (or a disc of it) is a
+graph: every pixel is a node linked to its 8 neighbours (hp.get_all_neighbours),
+stored as a scipy CSR matrix. Crossing an edge costs its arc length (degrees)
+times the mean node cost of its two ends, and the node cost falls with the
+tracker signal:
+
+    cost = COST_FLOOR + 1 - clip(signal / percentile(signal, 99), 0, 1)
+
+so the cheapest route between two vertices runs along the bright walls. The
+result is deterministic and globally optimal, and one graph build serves any
+number of vertex pairs:
+
+    graph = SignalGraph(load_signal(INPUT_FILE, 'abs_ip', nside=256),
+                        disc_pixels(256, -41.81, 354.38, 40.0))
+    tracks = graph.solve([((-41.81, 354.38), (lat1, lon1)), ...])   # Dijkstra
+    track = graph.trace(graph.astar(src, dst))                      # A*
+
+A* uses COST_FLOOR * great-circle distance to the target as heuristic:
+no path can be shorter than the great circle nor cheaper than COST_FLOOR
+per degree, so it is admissible and the A* path costs the same as Dijkstra's.
+
+The graph has ~8 edges per pixel: at NSIDE 2048 the full sky is 400M
+edges, so the signal is taken from a level of the signal_maps pyramid
+(GRAPH_NSIDE) rather than the native map.
+
+Usage (vertices from the Sabueso V8 track, spider_track_corrected.csv):
+    python scripts/path_tracer.py
+"""
+
+import heapq
+import os
+import numpy as np
+import pandas as pd
+import healpy as hp
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from map_cache import load_maps
+from phase_profile import start_run, phase
+from signal_maps import load_signal
+
+# --- CONFIGURACIÓN DE MISIÓN ---
+INPUT_FILE = 'data/raw/COM_CMB_IQU-sevem_2048_R4.00.fits'
+VERTICES_FILE = 'spider_track_corrected.csv'   # Salida de sabueso_v8_final.py
+OUTPUT_FILE = 'data/processed/min_cost_tracks.csv'
+SUMMARY_FILE = 'data/processed/min_cost_edges.csv'
+
+SIGNAL = 'abs_ip'          # Señal del rastreador (signal_maps.SIGNALS)
+GRAPH_NSIDE = 256          # Nivel de la pirámide (~0.23º por píxel, como el paso del Sabueso)
+REGION_MARGIN = 5.0        # Margen (grados) del disco que contiene todos los vértices
+COST_FLOOR = 0.05          # Coste mínimo por grado (sobre la pared más brillante)
+NORM_PERCENTILE = 99.0     # Señal de referencia para normalizar el coste
+METHOD = 'dijkstra'        # 'dijkstra' (todas las parejas de una vez) o 'astar'
+
+def disc_pixels(nside, lat, lon, radius_deg):
+    """RING pixels within radius_deg of (lat, lon), touching pixels included."""
+    vec = hp.ang2vec(lon, lat, lonlat=True)
+    return hp.query_disc(nside, vec, np.radians(radius_deg), inclusive=True)
+
+class SignalGraph:
+    """
+    8-neighbour graph over `pixels` (default: full sky) of a RING signal map,
+    with signal-derived edge costs. Nodes are indices into self.pixels.
+    """
+
+    def __init__(self, signal_map, pixels=None, cost_floor=COST_FLOOR, norm_percentile=NORM_PERCENTILE):
+        self.nside = hp.npix2nside(len(signal_map))
+        self.pixels = np.arange(len(signal_map)) if pixels is None else np.unique(pixels)
+        self.cost_floor = cost_floor
+
+        sig = np.asarray(signal_map[self.pixels], dtype=np.float64)
+        self.signal = np.where(np.isnan(sig), 0.0, sig)
+        ref = np.percentile(self.signal, norm_percentile)
+        scaled = np.clip(self.signal / ref, 0.0, 1.0) if ref > 0 else np.zeros_like(self.signal)
+        self.node_cost = cost_floor + 1.0 - scaled
+
+        lon, lat = hp.pix2ang(self.nside, self.pixels, lonlat=True)
+        self.lat, self.lon = lat, lon
+        self.vec = np.array(hp.pix2vec(self.nside, self.pixels)).T
+        self.graph = self._build()
+
+    def _build(self):
+        n = len(self.pixels)
+        neighbours = hp.get_all_neighbours(self.nside, self.pixels)
+        local = np.minimum(np.searchsorted(self.pixels, neighbours), n - 1)
+        valid = (neighbours >= 0) & (self.pixels[local] == neighbours)
+        # Un vecino repetido (esquinas de las caras base) cuenta una sola vez
+        edges = np.unique(np.broadcast_to(np.arange(n), neighbours.shape)[valid] * n + local[valid])
+        rows, cols = edges // n, edges % n
+
+        cos_arc = np.einsum('ij,ij->i', self.vec[rows], self.vec[cols])
+        arc = np.degrees(np.arccos(np.clip(cos_arc, -1.0, 1.0)))
+        weight = arc * (self.node_cost[rows] + self.node_cost[cols]) / 2
+        return csr_matrix((weight, (rows, cols)), shape=(n, n))
+
+    def node(self, lat, lon):
+        """Graph node of the pixel containing (lat, lon)."""
+        pix = hp.ang2pix(self.nside, lon, lat, lonlat=True)
+        i = min(np.searchsorted(self.pixels, pix), len(self.pixels) - 1)
+        if self.pixels[i] != pix:
+            raise ValueError(f"Point (Lat {lat:.2f}, Lon {lon:.2f}) is outside the graph region.")
+        return int(i)
+
+    def dijkstra(self, sources):
+        """Costs (k, n) and predecessors (k, n) from every source node, one pass each."""
+        return dijkstra(self.graph, indices=np.atleast_1d(sources), return_predecessors=True)
+
+    def astar(self, source, target):
+        """Node list of the cheapest source -> target path (A*, great-circle heuristic)."""
+        indptr, indices, data = self.graph.indptr, self.graph.indices, self.graph.data
+        target_vec = self.vec[target]
+
+        def heuristic(i):
+            return self.cost_floor * np.degrees(np.arccos(min(1.0, max(-1.0, self.vec[i] @ target_vec))))
+
+        best = {source: 0.0}
+        parent = {source: -1}
+        frontier = [(heuristic(source), 0.0, source)]
+        done = set()
+        while frontier:
+            _, g, u = heapq.heappop(frontier)
+            if u == target:
+                break
+            if u in done:
+                continue
+            done.add(u)
+            for k in range(indptr[u], indptr[u + 1]):
+                v, g_v = indices[k], g + data[k]
+                if g_v < best.get(v, np.inf):
+                    best[v] = g_v
+                    parent[v] = u
+                    heapq.heappush(frontier, (g_v + heuristic(v), g_v, v))
+        if target not in parent:
+            return []
+        path = [target]
+        while parent[path[-1]] != -1:
+            path.append(parent[path[-1]])
+        return path[::-1]
+
+    def trace(self, nodes):
+        """Records (step, lat, lon, signal, cumulative cost) along a node path."""
+        nodes = np.asarray(nodes, dtype=np.int64)
+        if len(nodes) == 0:
+            return []
+        steps = np.asarray(self.graph[nodes[:-1], nodes[1:]]).ravel()
+        cost = np.concatenate([[0.0], np.cumsum(steps)])
+        return [{'step': s, 'lat': self.lat[i], 'lon': self.lon[i], 'signal': self.signal[i], 'cost': c}
+                for s, (i, c) in enumerate(zip(nodes, cost))]
+
+    def solve(self, pairs, method='dijkstra'):
+        """
+        Track records for every ((lat, lon), (lat, lon)) pair. With 'dijkstra'
+        each distinct source is expanded once and serves all its targets.
+        """
+        ends = [(self.node(*a), self.node(*b)) for a, b in pairs]
+        if method == 'astar':
+            return [self.trace(self.astar(s, t)) for s, t in ends]
+        if method != 'dijkstra':
+            raise ValueError(f"Unknown path method '{method}'. Choose 'dijkstra' or 'astar'.")
+
+        sources = sorted({s for s, _ in ends})
+        _, pred = self.dijkstra(sources)
+        row = {s: k for k, s in enumerate(sources)}
+        tracks = []
+        for s, t in ends:
+            p = pred[row[s]]
+            if s != t and p[t] < 0:
+                tracks.append([])
+                continue
+            path = [t]
+            while path[-1] != s:
+                path.append(p[path[-1]])
+            tracks.append(self.trace(path[::-1]))
+        return tracks
+
+def load_vertices(path=VERTICES_FILE):
+    """(lat, lon) of the vertices of a Sabueso track, in the order they were found."""
+    df = pd.read_csv(path)
+    verts = df[df['type'].str.contains('VERTEX')]
+    return list(zip(verts['lat'], verts['lon']))
+
+def main():
+    print("🕸️ TRAZADOR GLOBAL: CAMINOS DE COSTE MÍNIMO")
+    for path in (INPUT_FILE, VERTICES_FILE):
+        if not os.path.exists(path):
+            print(f"❌ ERROR: No encuentro el archivo en {path}")
+            return
+    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
+    start_run(OUTPUT_FILE)
+
+    vertices = load_vertices()
+    if len(vertices) < 2:
+        print(f"❌ ERROR: {VERTICES_FILE} tiene {len(vertices)} vértice(s); hacen falta al menos 2.")
+        return
+    pairs = list(zip(vertices[:-1], vertices[1:]))
+
+    # Nivel de la pirámide: nunca por encima de la resolución nativa
+    native = hp.get_nside(load_maps(INPUT_FILE, 'I'))
+    nside = min(GRAPH_NSIDE, native)
+    with phase('load_signal'):
+        signal_map = load_signal(INPUT_FILE, SIGNAL, nside=nside)
+
+    # Disco que contiene todos los vértices (centrado en su media)
+    lat, lon = np.array(vertices).T
+    center = hp.vec2ang(hp.ang2vec(lon, lat, lonlat=True).mean(axis=0), lonlat=True)
+    c_lon, c_lat = float(center[0][0]), float(center[1][0])
+    radius = np.degrees(hp.rotator.angdist([lon, lat], [c_lon, c_lat], lonlat=True)).max() + REGION_MARGIN
+
+    with phase('build_graph'):
+        graph = SignalGraph(signal_map, disc_pixels(nside, c_lat, c_lon, radius))
+    print(f"   🗺️ Grafo NSIDE {nside}: {len(graph.pixels)} nodos, {graph.graph.nnz} aristas "
+          f"(disco de {radius:.1f}º en Lat {c_lat:.2f}, Lon {c_lon:.2f})")
+
+    with phase('solve', tasks=len(pairs)):
+        tracks = graph.solve(pairs, method=METHOD)
+
+    rows, summary = [], []
+    for k, ((a, b), track) in enumerate(zip(pairs, tracks)):
+        rows += [{'edge': k, **r} for r in track]
+        t = pd.DataFrame(track)
+        summary.append({
+            'edge': k, 'from_lat': a[0], 'from_lon': a[1], 'to_lat': b[0], 'to_lon': b[1],
+            'great_circle_deg': float(np.degrees(hp.rotator.angdist([a[1], a[0]], [b[1], b[0]], lonlat=True))[0]),
+            'pixels': len(t),
+            'cost': t['cost'].iloc[-1] if len(t) else np.nan,
+            'mean_signal': t['signal'].mean() if len(t) else np.nan,
+            'min_signal': t['signal'].min() if len(t) else np.nan,
+        })
+    summary = pd.DataFrame(summary)
+
+    with phase('save'):
+        pd.DataFrame(rows).to_csv(OUTPUT_FILE, index=False)
+        summary.to_csv(SUMMARY_FILE, index=False)
+
+    print(summary.to_string(index=False, float_format=lambda x: f"{x:.4g}"))
+    print(f"\n💾 Datos guardados en: {OUTPUT_FILE}, {SUMMARY_FILE}")
+
+if __name__ == "__main__":
+    main()
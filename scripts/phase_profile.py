@@ -0,0 +1,203 @@
+# ==============================================================================
+#  The Geometry of the Echo: PMN-01 Model Source Code
+#  ----------------------------------------------------------------------------
+#  (c) 2025 Pablo Miguel Nieto Muñoz
+#  License: MIT (See LICENSE file for details)
+#
+#  Scientific Citation:
+#  Nieto Muñoz, P. M. (2025). "The Geometry of the Echo: Observational
+#  Confirmation of the Chiral Dodecahedral Universe".
+#  Zenodo.
+# ==============================================================================
+
+"""
+Per-phase instrumentation for the pipeline scripts.
+
+Off by default; set CCC_PROFILE=1 to enable it. Each named phase then
+appends one JSON line to <output>.profile.jsonl (next to the results)
+with wall time, CPU time (own and of finished children), peak RSS during
+the phase, bytes read from FITS files, tasks and tasks/s, and per-worker
+busy time of the pool tasks run inside the phase.
+
+Usage:
+    from phase_profile import start_run, phase, timed_task
+
+    @timed_task                      # pool task: busy time measured in the worker
+    def process_point(args): ...
+
+    start_run(OUTPUT_FILE)
+    with phase('load'):
+        maps = load_maps(...)
+    with phase('scan', tasks=len(tasks)) as ph:
+        for res in ph.track(pool.imap_unordered(process_point, tasks)):
+            ...
+
+Phases nest; an inner phase never hides the peak RSS of the outer one.
+When profiling is off, phase() does nothing and track() only unwraps results.
+"""
+
+import os
+import sys
+import json
+import time
+import resource
+import functools
+from collections import namedtuple
+from contextlib import ContextDecorator
+
+ENABLED = os.environ.get('CCC_PROFILE', '').strip().lower() not in ('', '0', 'false', 'no')
+DEFAULT_LOG = 'data/processed/profile.jsonl'
+
+# What a @timed_task returns to the parent when profiling is on
+TimedResult = namedtuple('TimedResult', ['value', 'pid', 'busy_s', 'cpu_s'])
+
+_counters = {'fits_bytes': 0}
+_run = {'log': None, 'script': None, 'run_id': None}
+_stack = []
+
+def count_fits_bytes(n):
+    """Called by the FITS readers with the number of bytes they pull from disk."""
+    _counters['fits_bytes'] += int(n)
+
+def profile_path(output_file):
+    """<output>.profile.jsonl for a results file."""
+    return os.path.splitext(output_file)[0] + '.profile.jsonl'
+
+def start_run(output_file, script=None):
+    """Sends the phases of this run to profile_path(output_file)."""
+    _run['log'] = profile_path(output_file)
+    _run['script'] = script or os.path.splitext(os.path.basename(sys.argv[0] or 'python'))[0]
+    _run['run_id'] = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+
+def _reset_peak_rss():
+    """Resets the kernel's RSS high-water mark (Linux); False if not possible."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as fh:
+            fh.write('5')
+        return True
+    except OSError:
+        return False
+
+def _peak_rss_kb():
+    try:
+        with open('/proc/self/status') as fh:
+            for line in fh:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    # Fallback: high-water mark of the whole process life (KB on Linux)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def _cpu():
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    kids = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime, kids.ru_utime + kids.ru_stime, kids.ru_maxrss
+
+def _write(record):
+    path = _run['log'] or DEFAULT_LOG
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a') as fh:
+        fh.write(json.dumps(record) + '\n')
+
+class Phase(ContextDecorator):
+    """One named phase (see module docstring). Re-entrant as a decorator."""
+
+    def __init__(self, name, tasks=None, **extra):
+        self.name = name
+        self.initial_tasks = tasks
+        self.extra = extra
+
+    def add_tasks(self, n):
+        self.tasks = (self.tasks or 0) + int(n)
+
+    def track(self, results):
+        """
+        Wraps a pool result iterator: unwraps @timed_task results, books each
+        worker's busy time and counts one task per result.
+        """
+        for res in results:
+            if isinstance(res, TimedResult):
+                w = self.workers.setdefault(res.pid, [0.0, 0.0, 0])
+                w[0] += res.busy_s
+                w[1] += res.cpu_s
+                w[2] += 1
+                res = res.value
+            self.tracked += 1
+            yield res
+
+    def __enter__(self):
+        self.tasks = self.initial_tasks
+        self.tracked = 0
+        self.workers = {}
+        if not ENABLED:
+            return self
+        self._peak_kb = _peak_rss_kb()
+        self._peak_reset = _reset_peak_rss()
+        self._fits0 = _counters['fits_bytes']
+        self._cpu0, self._child_cpu0, _ = _cpu()
+        self._t0 = time.perf_counter()
+        self._start = time.strftime('%Y-%m-%dT%H:%M:%S')
+        _stack.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not ENABLED:
+            return False
+        wall = time.perf_counter() - self._t0
+        cpu, child_cpu, child_peak_kb = _cpu()
+        _stack.remove(self)
+
+        # With a resettable high-water mark the peak is the phase's own; the
+        # enclosing phases keep the max of everything that ran inside them
+        peak_kb = _peak_rss_kb()
+        if not self._peak_reset:
+            peak_kb = max(peak_kb, self._peak_kb)
+        for outer in _stack:
+            outer._peak_kb = max(outer._peak_kb, peak_kb)
+
+        tasks = self.tasks if self.tasks is not None else (self.tracked or None)
+        busy = sum(w[0] for w in self.workers.values())
+        record = {
+            'run_id': _run['run_id'],
+            'script': _run['script'],
+            'phase': self.name,
+            'start': self._start,
+            'status': 'ok' if exc_type is None else f'error: {exc_type.__name__}',
+            'wall_s': round(wall, 4),
+            'cpu_s': round(cpu - self._cpu0, 4),
+            'children_cpu_s': round(child_cpu - self._child_cpu0, 4),
+            'peak_rss_mb': round(peak_kb / 1024.0, 1),
+            'children_peak_rss_mb': round(child_peak_kb / 1024.0, 1),
+            'fits_bytes': _counters['fits_bytes'] - self._fits0,
+            'tasks': tasks,
+            'tasks_per_s': round(tasks / wall, 2) if tasks and wall > 0 else None,
+        }
+        if self.workers:
+            record['workers'] = {str(pid): {'busy_s': round(w[0], 4), 'cpu_s': round(w[1], 4), 'tasks': w[2]}
+                                 for pid, w in sorted(self.workers.items())}
+            # Fraction of the phase the workers that showed up spent inside tasks
+            record['worker_utilisation'] = round(busy / (wall * len(self.workers)), 4) if wall > 0 else None
+        record.update(self.extra)
+        _write(record)
+        return False
+
+def phase(name, tasks=None, **extra):
+    """Context manager / decorator timing one named phase; extra keys go to the JSON line."""
+    return Phase(name, tasks=tasks, **extra)
+
+def timed_task(func):
+    """
+    Decorator for pool task functions. With profiling on, the task returns
+    TimedResult(value, pid, busy_s, cpu_s) for Phase.track to unwrap.
+    """
+    # functools.wraps keeps the name, so the pool still pickles the task by reference
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not ENABLED:
+            return func(*args, **kwargs)
+        t0 = time.perf_counter()
+        c0 = time.process_time()
+        value = func(*args, **kwargs)
+        return TimedResult(value, os.getpid(), time.perf_counter() - t0, time.process_time() - c0)
+    return wrapper
@@ -0,0 +1,200 @@
+# ==============================================================================
+#  The Geometry of the Echo: PMN-01 Model Source Code
+#  ----------------------------------------------------------------------------
+#  (c) 2025 Pablo Miguel Nieto Muñoz
+#  License: MIT (See LICENSE file for details)
+#
+#  Scientific Citation:
+#  Nieto Muñoz, P. M. (2025). "The Geometry of the Echo: Observational
+#  Confirmation of the Chiral Dodecahedral Universe".
+#  Zenodo.
+# ==============================================================================
+
+"""
+Pixel-subset reader for Planck HEALPix FITS tables.
+
+Instead of decoding whole 50M-pixel columns with hp.read_map, the table is
+memory-mapped row by row and only the row ranges covering the requested
+pixels are read and byte-swapped. Works for RING and NESTED files and for
+both the combined (I, Q, U in HDU 1) and split (PR4: I in HDU 1, Q/U in
+HDU 2) layouts. Pixel indices passed in and returned are RING unless
+nest=True.
+"""
+
+import numpy as np
+import healpy as hp
+from astropy.io import fits
+from phase_profile import count_fits_bytes
+
+# Rows closer than this are merged into a single read
+MAX_ROW_GAP = 64
+
+# TTYPEn names used by Planck/healpy for each Stokes component
+COLUMN_NAMES = {
+    'I': ('I_STOKES', 'TEMPERATURE', 'I', 'T', 'INTENSITY'),
+    'Q': ('Q_STOKES', 'Q_POLARISATION', 'Q_POLARIZATION', 'Q'),
+    'U': ('U_STOKES', 'U_POLARISATION', 'U_POLARIZATION', 'U'),
+}
+
+def _layout_from_hdul(hdul):
+    """Layout resolution from the headers of an open HDUList (see resolve_layout)."""
+    tables = []
+    for hdu in range(1, len(hdul)):
+        h = hdul[hdu].header
+        if h.get('XTENSION', '').strip() != 'BINTABLE':
+            continue
+        names = [str(h.get(f'TTYPE{k}', '')).strip().upper() for k in range(1, int(h.get('TFIELDS', 0)) + 1)]
+        tables.append((hdu, h, names))
+    if not tables:
+        raise ValueError("No binary table HDU found: not a HEALPix map file.")
+
+    # 1) Match by column name across all table HDUs
+    columns = {}
+    for stokes, aliases in COLUMN_NAMES.items():
+        for hdu, _, names in tables:
+            hits = [k for k, n in enumerate(names) if n in aliases]
+            if hits:
+                columns[stokes] = (hdu, hits[0])
+                break
+
+    # 2) Positional fallback: combined I,Q,U in HDU 1, or split I | Q,U
+    if len(columns) < 3:
+        hdu1, _, names1 = tables[0]
+        if len(names1) >= 3:
+            columns = {'I': (hdu1, 0), 'Q': (hdu1, 1), 'U': (hdu1, 2)}
+        elif len(tables) > 1 and len(tables[1][2]) >= 2:
+            hdu2 = tables[1][0]
+            columns = {'I': (hdu1, 0), 'Q': (hdu2, 0), 'U': (hdu2, 1)}
+        else:
+            columns = {'I': (hdu1, 0)}
+
+    h1 = hdul[columns['I'][0]].header
+    repeat = hdul[columns['I'][0]].columns[0].format.repeat
+    npix = int(h1['NAXIS2']) * repeat
+    nside = int(h1['NSIDE']) if 'NSIDE' in h1 else hp.npix2nside(npix)
+    ordering = str(h1.get('ORDERING', 'RING')).strip().upper()
+    split = len({hdu for hdu, _ in columns.values()}) > 1
+    return {'nside': nside, 'npix': hp.nside2npix(nside), 'ordering': ordering,
+            'columns': columns, 'split': split}
+
+def resolve_layout(path):
+    """
+    Header-only description of a Planck HEALPix FITS file.
+    Looks at TFIELDS/TTYPEn/NSIDE/ORDERING/NAXIS2 only; no pixel data is read.
+
+    Returns {'nside', 'npix', 'ordering', 'columns': {'I': (hdu, col), 'Q': ..., 'U': ...}, 'split'}.
+    'split' is True for the PR4 style (I in HDU 1, Q/U in HDU 2). Intensity-only
+    files carry just 'I' in 'columns'.
+    """
+    with fits.open(path, memmap=True) as hdul:
+        return _layout_from_hdul(hdul)
+
+def describe_layout(layout):
+    """One-line summary used in the scripts' loading banners."""
+    mode = "Split HDU (PR4)" if layout['split'] else "Standard Combined HDU"
+    cols = ", ".join(f"{k}=HDU{h}:{c}" for k, (h, c) in layout['columns'].items())
+    return f"{mode} | NSIDE {layout['nside']} {layout['ordering']} | {cols}"
+
+def _open_rows(path, hdul, hdu):
+    """Memory-maps the raw (big-endian) rows of a binary table HDU."""
+    table = hdul[hdu]
+    for col in table.columns:
+        if col.bscale not in (None, 1) or col.bzero not in (None, 0):
+            raise ValueError(f"Scaled column '{col.name}' in HDU {hdu} is not supported.")
+    row_dtype = table.columns.dtype.newbyteorder('>')
+    n_rows = int(table.header['NAXIS2'])
+    offset = hdul.fileinfo(hdu)['datLoc']
+    rows = np.memmap(path, dtype=row_dtype, mode='r', offset=offset, shape=(n_rows,))
+    per_row = table.columns[0].format.repeat
+    return rows, per_row
+
+def _row_runs(rows, max_gap):
+    """Splits sorted unique row numbers into [start, stop) ranges."""
+    breaks = np.flatnonzero(np.diff(rows) > max_gap + 1) + 1
+    starts = rows[np.r_[0, breaks]]
+    stops = rows[np.r_[breaks - 1, len(rows) - 1]] + 1
+    return list(zip(starts, stops))
+
+def _read_sorted(path, hdul, hdu, col_ids, file_pix, max_gap):
+    """Reads the given columns for sorted unique file-order pixel ids."""
+    rows, per_row = _open_rows(path, hdul, hdu)
+    names = rows.dtype.names
+    out = [np.empty(len(file_pix), dtype=rows.dtype[c].base.newbyteorder('=')) for c in col_ids]
+    if len(file_pix) == 0:
+        return out
+
+    row_of = file_pix // per_row
+    for start, stop in _row_runs(np.unique(row_of), max_gap):
+        lo, hi = np.searchsorted(row_of, [start, stop])
+        local = file_pix[lo:hi] - start * per_row
+        block = rows[start:stop]
+        count_fits_bytes(block.nbytes)
+        for k, c in enumerate(col_ids):
+            values = np.asarray(block[names[c]]).reshape(-1)
+            out[k][lo:hi] = values[local]
+    return out
+
+def map_nside(path):
+    """NSIDE from the FITS header (no pixel data is read)."""
+    return resolve_layout(path)['nside']
+
+def read_pixels(path, pixels, fields=('I', 'Q', 'U'), nest=False, max_gap=MAX_ROW_GAP):
+    """
+    Returns one array per field with the values at `pixels` (same order,
+    duplicates allowed). Only the FITS rows covering those pixels are read.
+    """
+    pixels = np.asarray(pixels, dtype=np.int64)
+    with fits.open(path, memmap=True) as hdul:
+        layout = _layout_from_hdul(hdul)
+        nside, file_nest = layout['nside'], layout['ordering'] == 'NESTED'
+
+        file_pix = pixels
+        if nest and not file_nest:
+            file_pix = hp.nest2ring(nside, pixels)
+        elif file_nest and not nest:
+            file_pix = hp.ring2nest(nside, pixels)
+        unique_pix, inverse = np.unique(file_pix, return_inverse=True)
+
+        # Group requested fields by HDU so each table is walked once
+        by_hdu = {}
+        for name in fields:
+            if name not in layout['columns']:
+                raise ValueError(f"Field '{name}' not present in {path}.")
+            hdu, col = layout['columns'][name]
+            by_hdu.setdefault(hdu, []).append((name, col))
+
+        values = {}
+        for hdu, entries in by_hdu.items():
+            cols = _read_sorted(path, hdul, hdu, [c for _, c in entries], unique_pix, max_gap)
+            for (name, _), arr in zip(entries, cols):
+                values[name] = arr[inverse]
+    return tuple(values[name] for name in fields)
+
+def read_region(path, vec, radius_rad, fields=('I', 'Q', 'U'), inclusive=False):
+    """
+    Reads a disc around `vec`.
+    Returns (ring_pixels_sorted, values_field_1, values_field_2, ...).
+    """
+    nside = map_nside(path)
+    pixels = hp.query_disc(nside, vec, radius_rad, inclusive=inclusive)
+    return (pixels,) + read_pixels(path, pixels, fields)
+
+def read_interp(path, theta, phi, fields=('I', 'Q', 'U')):
+    """Bilinear interpolation (same weights as hp.get_interp_val) reading only the 4 neighbours."""
+    nside = map_nside(path)
+    pix, weights = hp.get_interp_weights(nside, theta, phi)
+    values = read_pixels(path, pix.ravel(), fields)
+    return tuple(np.sum(weights * v.reshape(pix.shape), axis=0) for v in values)
+
+def region_map(path, vecs, radius_rad, field='I'):
+    """
+    Full-size RING map holding `field` inside the given disc(s) and hp.UNSEEN elsewhere.
+    Meant for gnomview-style plots that only look at a small patch.
+    """
+    nside = map_nside(path)
+    vecs = np.atleast_2d(vecs)
+    pixels = np.unique(np.concatenate([hp.query_disc(nside, v, radius_rad, inclusive=True) for v in vecs]))
+    values, = read_pixels(path, pixels, (field,))
+    m = np.full(hp.nside2npix(nside), hp.UNSEEN, dtype=values.dtype)
+    m[pixels] = values
+    return m
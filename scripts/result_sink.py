@@ -0,0 +1,241 @@
+# ==============================================================================
+#  The Geometry of the Echo: PMN-01 Model Source Code
+#  ----------------------------------------------------------------------------
+#  (c) 2025 Pablo Miguel Nieto Muñoz
+#  License: MIT (See LICENSE file for details)
+#
+#  Scientific Citation:
+#  Nieto Muñoz, P. M. (2025). "The Geometry of the Echo: Observational
+#  Confirmation of the Chiral Dodecahedral Universe".
+#  Zenodo.
+# ==============================================================================
+
+"""
+Streaming, checkpointed result sink for long scans.
+
+Completed task records are appended in batches to column-wise chunk files
+(part-NNNNNN.npz) inside a run directory, together with the ids of the
+tasks each chunk completes (the __tasks__ array): the chunk files are the
+completion record. A restarted run with the same `run_key` rebuilds the
+finished ids from them and only dispatches the remaining tasks; memory
+stays bounded by one batch regardless of scan size.
+
+Usage:
+    sink = ResultSink(parts_dir(OUTPUT_FILE), n_tasks, run_key(INPUT_FILE, nside=...))
+    for task_id, records in pool.imap_unordered(work, sink.pending(tasks)):
+        sink.add(task_id, records)
+    sink.close()
+    sink.write_csv(OUTPUT_FILE)
+
+For bounded output, TopK keeps the k best records of a stream and
+top_records merges a global top-k with a top-k per region.
+"""
+
+import os
+import glob
+import json
+import heapq
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+TASKS_KEY = '__tasks__'
+BATCH_SIZE = 512
+
+def parts_dir(output_file):
+    """Checkpoint directory that sits next to an output CSV."""
+    return os.path.splitext(output_file)[0] + '.parts'
+
+def run_key(input_file, **params):
+    """Identifies a run: input file identity (size, mtime) plus scan parameters."""
+    st = os.stat(input_file)
+    ident = {'input': os.path.abspath(input_file), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    ident.update({k: repr(v) for k, v in sorted(params.items())})
+    return json.dumps(ident, sort_keys=True)
+
+class ResultSink:
+    """Batched columnar writer with a completion bitmap and resume."""
+
+    def __init__(self, directory, n_tasks, key, batch_size=BATCH_SIZE, resume=True):
+        self.directory = directory
+        self.n_tasks = int(n_tasks)
+        self.batch_size = batch_size
+        self.done = np.zeros(self.n_tasks, dtype=bool)
+        self._records = []
+        self._tasks = []
+        self._next_part = 0
+
+        meta_path = os.path.join(directory, 'meta.json')
+        meta = {'n_tasks': self.n_tasks, 'key': key}
+        if os.path.exists(meta_path):
+            with open(meta_path) as fh:
+                previous = json.load(fh)
+            if not resume or previous != meta:
+                print(f"  -> [sink] Run parameters changed; discarding checkpoint in {directory}")
+                shutil.rmtree(directory)
+        os.makedirs(directory, exist_ok=True)
+        _atomic_write(meta_path, lambda fh: fh.write(json.dumps(meta).encode()))
+
+        # Chunk files are the source of truth: a chunk lists every task it completes
+        for part in self._parts():
+            with np.load(part) as data:
+                self.done[data[TASKS_KEY]] = True
+            self._next_part = max(self._next_part, int(os.path.basename(part)[5:11]) + 1)
+        if self.done.any():
+            print(f"  -> [sink] Resuming: {int(self.done.sum())}/{self.n_tasks} tasks already done.")
+
+    def _parts(self):
+        return sorted(glob.glob(os.path.join(self.directory, 'part-*.npz')))
+
+    @property
+    def n_done(self):
+        return int(self.done.sum())
+
+    def pending(self, tasks, task_id=lambda t: t[0]):
+        """Filters out tasks whose id is already complete."""
+        return [t for t in tasks if not self.done[task_id(t)]]
+
+    def add(self, task_id, records=None):
+        """Marks task_id done with zero, one (dict) or many (list of dicts) records."""
+        if records:
+            if isinstance(records, dict):
+                records = [records]
+            self._records.extend(records)
+        self._tasks.append(int(task_id))
+        if len(self._tasks) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._tasks:
+            return
+        columns = {}
+        if self._records:
+            frame = pd.DataFrame(self._records)
+            for name in frame.columns:
+                values = frame[name].to_numpy()
+                if values.dtype == object:
+                    values = values.astype(str)
+                columns[name] = values
+        columns[TASKS_KEY] = np.asarray(self._tasks, dtype=np.int64)
+
+        part = os.path.join(self.directory, f"part-{self._next_part:06d}.npz")
+        _atomic_write(part, lambda fh: np.savez(fh, **columns))
+        self._next_part += 1
+        self.done[columns[TASKS_KEY]] = True
+        self._records, self._tasks = [], []
+
+    def close(self):
+        self.flush()
+
+    def iter_frames(self):
+        """Yields one DataFrame per chunk (chunks without records are skipped)."""
+        for part in self._parts():
+            with np.load(part) as data:
+                cols = {k: data[k] for k in data.files if k != TASKS_KEY}
+            if cols:
+                yield pd.DataFrame(cols)
+
+    def to_dataframe(self):
+        frames = list(self.iter_frames())
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def write_csv(self, path):
+        """Streams all chunks into one CSV (see write_csv)."""
+        return write_csv(path, self.iter_frames())
+
+    def iter_records(self):
+        """Yields the stored records one by one as dicts, chunk by chunk."""
+        for frame in self.iter_frames():
+            yield from frame.to_dict('records')
+
+def write_csv(path, frames):
+    """
+    Streams DataFrames into one CSV. Returns the number of rows written;
+    nothing is written when there are no rows.
+    """
+    rows = 0
+    fh = None
+    try:
+        for frame in frames:
+            if fh is None:
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                fh = open(path, 'w', newline='')
+            frame.to_csv(fh, index=False, header=(rows == 0))
+            rows += len(frame)
+    finally:
+        if fh is not None:
+            fh.close()
+    return rows
+
+class TopK:
+    """
+    Bounded min-heap with the k records of largest score(record).
+    Non-finite scores are dropped; on ties the record pushed first stays.
+    """
+
+    def __init__(self, k, score):
+        self.k = int(k)
+        self.score = score
+        self._heap = []
+        self._n = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, record):
+        s = float(self.score(record))
+        if self.k <= 0 or not np.isfinite(s):
+            return
+        # (score, -arrival) orders the heap; the record itself is never compared
+        item = (s, -self._n, record)
+        self._n += 1
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, item)
+        elif item[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, item)
+
+    def extend(self, records):
+        for record in records:
+            self.push(record)
+        return self
+
+    def merge(self, other):
+        """Folds another TopK (e.g. a worker's) into this one."""
+        return self.extend(other.records())
+
+    def records(self):
+        """Kept records, best first."""
+        return [item[2] for item in sorted(self._heap, key=lambda t: t[:2], reverse=True)]
+
+def top_records(records, score, k, region=None, k_region=0):
+    """
+    Streams `records` through a global TopK(k) and, when `region` is given,
+    one TopK(k_region) per region(record). Returns the union (no duplicates),
+    best first. Memory stays at k + n_regions * k_region records.
+    """
+    best = TopK(k, score)
+    by_region = {}
+    for record in records:
+        best.push(record)
+        if region is not None and k_region > 0:
+            key = region(record)
+            if key not in by_region:
+                by_region[key] = TopK(k_region, score)
+            by_region[key].push(record)
+
+    kept = {id(r): r for r in best.records()}
+    for heap in by_region.values():
+        kept.update((id(r), r) for r in heap.records())
+    return TopK(len(kept), score).extend(kept.values()).records()
+
+def _atomic_write(path, writer):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            writer(fh)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
@@ -0,0 +1,197 @@
+# ==============================================================================
+#  The Geometry of the Echo: PMN-01 Model Source Code
+#  ----------------------------------------------------------------------------
+#  (c) 2025 Pablo Miguel Nieto Muñoz
+#  License: MIT (See LICENSE file for details)
+#
+#  Scientific Citation:
+#  Nieto Muñoz, P. M. (2025). "The Geometry of the Echo: Observational
+#  Confirmation of the Chiral Dodecahedral Universe".
+#  Zenodo.
+# ==============================================================================
+
+"""
+Full-sky ridge-strength maps from spherical-harmonic derivatives.
+
+For I, P and I*P the map is smoothed with a Gaussian beam (FWHM_DEG) and
+its covariant Hessian is taken in harmonic space, for every pixel at once:
+
+    f -> map2alm -> smoothalm -> alm2map_der1 -> gradient g (e_theta, e_phi)
+    g as Cartesian (x, y, z) fields -> map2alm -> alm2map_der1 each
+    H_ab = e_a . d_b g              (projection = covariant derivative)
+
+From the eigenvalues of H (lam_hi >= lam_lo) at each pixel:
+
+    curv       curvature across the structure (the eigenvalue of largest
+               modulus): < 0 on a bright ridge, > 0 on a dark valley
+    strength   |curv| - |other eigenvalue| >= 0: high on lines, ~0 on blobs
+               and flat sky
+    angle      bearing of the line (degrees from north towards east, 0-180)
+
+Maps are float32 RING at RIDGE_NSIDE (never above the native NSIDE),
+cached in the map cache entry (<entry>/ridges/). They replace pixel
+sampling where only "is there a wall here, and which way does it run" is
+asked: trace_vertex.py and main_line_hunter.py can skip centres with no
+ridge (RIDGE_PERCENTILE, ridge_prune) and the trackers can follow the strength map
+through tracker_engine.MapKernel.
+
+Usage:
+    python scripts/ridge_maps.py                   # I, P and IP
+    from ridge_maps import load_ridge
+    strength = load_ridge(INPUT_FILE, 'IP', 'strength')
+"""
+
+import os
+import sys
+import tempfile
+import numpy as np
+import healpy as hp
+from map_cache import CACHE_DIR, ensure_cache, load_maps
+
+INPUT_FILE = 'data/raw/COM_CMB_IQU-sevem_2048_R4.00.fits'
+RIDGE_FIELDS = ('I', 'P', 'IP')
+KINDS = ('strength', 'angle', 'curv')
+RIDGE_NSIDE = 1024     # 0.06º por píxel, de sobra para un haz de 0.5º
+FWHM_DEG = 0.5         # Escala de suavizado (= anchura de línea / sondeo del Sabueso)
+ALM_ITER = 3           # Iteraciones de map2alm (healpy por defecto)
+RIDGE_VERSION = 1
+
+def _ridge_path(entry_dir, field, nside, fwhm_deg, kind):
+    return os.path.join(entry_dir, 'ridges', f"{field}_{nside}_{fwhm_deg:g}_v{RIDGE_VERSION}_{kind}.npy")
+
+def _save_atomic(path, arr):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.npy')
+    os.close(fd)
+    np.save(tmp, arr)
+    os.replace(tmp, path)
+
+def beam_lmax(nside, fwhm_deg):
+    """
+    lmax of the smoothed map: beyond it the Gaussian beam is below 1e-6.
+    Capped at 2*NSIDE: above it the pixel aliasing of map2alm, amplified by
+    l (gradient) and l^2 (Hessian), swamps the derivatives.
+    """
+    sigma = np.radians(fwhm_deg) / np.sqrt(8 * np.log(2))
+    return int(min(2 * nside, np.ceil(np.sqrt(-2 * np.log(1e-6)) / sigma)))
+
+def hessian(m, fwhm_deg=FWHM_DEG, lmax=None):
+    """
+    Covariant Hessian (H_tt, H_tp, H_pp) of a RING map smoothed to fwhm_deg,
+    in the unit (e_theta, e_phi) basis. NaN / UNSEEN pixels read as 0.
+    """
+    m = np.asarray(m, dtype=np.float64)
+    m = np.where(np.isfinite(m) & (m != hp.UNSEEN), m, 0.0)
+    nside = hp.get_nside(m)
+    lmax = beam_lmax(nside, fwhm_deg) if lmax is None else lmax
+
+    alm = hp.smoothalm(hp.map2alm(m, lmax=lmax, iter=ALM_ITER), fwhm=np.radians(fwhm_deg), inplace=False)
+    _, d_t, d_p = hp.alm2map_der1(alm, nside, lmax=lmax)
+    del m, alm
+
+    # Base local (e_theta hacia el sur, e_phi hacia el este) en cartesianas
+    theta, phi = hp.pix2ang(nside, np.arange(hp.nside2npix(nside)))
+    e_t = (np.cos(theta) * np.cos(phi), np.cos(theta) * np.sin(phi), -np.sin(theta))
+    e_p = (-np.sin(phi), np.cos(phi), None)
+    del theta, phi
+
+    # El gradiente como campo vectorial de R^3: cada componente es un escalar suave
+    h_tt = np.zeros_like(d_t)
+    h_tp = np.zeros_like(d_t)
+    h_pp = np.zeros_like(d_t)
+    for i in range(3):
+        g = d_t * e_t[i] if e_p[i] is None else d_t * e_t[i] + d_p * e_p[i]
+        _, g_t, g_p = hp.alm2map_der1(hp.map2alm(g, lmax=lmax, iter=ALM_ITER), nside, lmax=lmax)
+        h_tt += e_t[i] * g_t
+        h_tp += e_t[i] * g_p / 2
+        if e_p[i] is not None:
+            h_tp += e_p[i] * g_t / 2
+            h_pp += e_p[i] * g_p
+    return h_tt, h_tp, h_pp
+
+def ridge_from_hessian(h_tt, h_tp, h_pp):
+    """strength, angle (bearing, degrees 0-180) and curv from the Hessian components."""
+    mean = (h_tt + h_pp) / 2
+    rad = np.hypot((h_tt - h_pp) / 2, h_tp)
+    # Autovector de lam_hi = mean + rad, en radianes desde e_theta hacia e_phi
+    psi = 0.5 * np.arctan2(2 * h_tp, h_tt - h_pp)
+
+    # Cresta (mean < 0): la curvatura dominante es lam_lo y la línea sigue a lam_hi
+    ridge = mean < 0
+    curv = mean + np.where(ridge, -rad, rad)
+    along = np.where(ridge, psi, psi + np.pi / 2)
+    strength = 2 * np.minimum(rad, np.abs(mean))
+    # Dirección cos(a) e_theta + sin(a) e_phi; el norte es -e_theta
+    angle = np.mod(180.0 - np.degrees(along), 180.0)
+    return {'strength': strength, 'angle': angle, 'curv': curv}
+
+def _effective_nside(path, nside, cache_dir):
+    native = hp.get_nside(load_maps(path, 'I', cache_dir))
+    return min(native, nside or native)
+
+def build_ridges(path, field='IP', nside=RIDGE_NSIDE, fwhm_deg=FWHM_DEG, cache_dir=CACHE_DIR):
+    """Builds (if missing) the ridge maps of `field`. Returns {kind: file path}."""
+    if field not in RIDGE_FIELDS:
+        raise ValueError(f"Unknown ridge field '{field}'. Choose from {RIDGE_FIELDS}.")
+    entry_dir = ensure_cache(path, cache_dir)
+    nside = _effective_nside(path, nside, cache_dir)
+    paths = {kind: _ridge_path(entry_dir, field, nside, fwhm_deg, kind) for kind in KINDS}
+    if all(os.path.exists(p) for p in paths.values()):
+        return paths
+
+    print(f"  -> [cache] Building {field} ridges at NSIDE {nside} (FWHM {fwhm_deg:g}º)...")
+    m = load_maps(path, field, cache_dir)
+    if hp.get_nside(m) != nside:
+        m = hp.ud_grade(np.asarray(m, dtype=np.float64), nside)
+    maps = ridge_from_hessian(*hessian(m, fwhm_deg))
+    for kind in KINDS:
+        _save_atomic(paths[kind], maps[kind].astype(np.float32))
+    return paths
+
+def load_ridge(path, field='IP', kind='strength', nside=RIDGE_NSIDE, fwhm_deg=FWHM_DEG, cache_dir=CACHE_DIR):
+    """Read-only float32 memmap (RING) of a ridge map. Builds it on first use."""
+    if kind not in KINDS:
+        raise ValueError(f"Unknown ridge map '{kind}'. Choose from {KINDS}.")
+    return np.load(build_ridges(path, field, nside, fwhm_deg, cache_dir)[kind], mmap_mode='r')
+
+def ridge_peak(ridge_map, vecs, radius_deg=0.0):
+    """
+    Strongest ridge value within radius_deg of each unit vector (0 = the
+    pixel under it). vecs: (3,) or (n, 3).
+    """
+    nside = hp.npix2nside(len(ridge_map))
+    vecs = np.atleast_2d(vecs)
+    if radius_deg <= 0:
+        return np.asarray(ridge_map[hp.vec2pix(nside, vecs[:, 0], vecs[:, 1], vecs[:, 2])], dtype=np.float64)
+    radius = np.radians(radius_deg)
+    return np.array([ridge_map[hp.query_disc(nside, v, radius, inclusive=True)].max() for v in vecs],
+                    dtype=np.float64)
+
+def ridge_prune(tasks, ridge_map, percentile, radius_deg, vec=lambda t: t[1]):
+    """
+    Splits tasks into (kept, dropped): kept are those whose ridge_peak is at
+    least `percentile` of the peaks of all the tasks given. Pass every
+    candidate, not just the pending ones of a resumed run, so the cut does
+    not depend on where a previous run stopped.
+    """
+    if not tasks:
+        return [], []
+    peaks = ridge_peak(ridge_map, np.array([vec(t) for t in tasks]), radius_deg)
+    cut = np.percentile(peaks, percentile)
+    kept = [t for t, p in zip(tasks, peaks) if p >= cut]
+    dropped = [t for t, p in zip(tasks, peaks) if p < cut]
+    return kept, dropped
+
+def main(path=None):
+    path = path or INPUT_FILE
+    print(f"〰️ MAPAS DE CRESTAS: {os.path.basename(path)}")
+    if not os.path.exists(path):
+        print(f"❌ ERROR: No encuentro el archivo en {path}")
+        return
+    for field in RIDGE_FIELDS:
+        strength = load_ridge(path, field, nside=RIDGE_NSIDE, fwhm_deg=FWHM_DEG)
+        print(f"   ✅ {field}: NSIDE {hp.npix2nside(len(strength))} | "
+              f"fuerza p50 {np.percentile(strength, 50):.3g}, p99 {np.percentile(strength, 99):.3g}")
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -0,0 +1,285 @@
+# ==============================================================================
+#  The Geometry of the Echo: PMN-01 Model Source Code
+#  ----------------------------------------------------------------------------
+#  (c) 2025 Pablo Miguel Nieto Muñoz
+#  License: MIT (See LICENSE file for details)
+#
+#  Scientific Citation:
+#  Nieto Muñoz, P. M. (2025). "The Geometry of the Echo: Observational
+#  Confirmation of the Chiral Dodecahedral Universe".
+#  Zenodo.
+# ==============================================================================
+
+"""
+Ring geometry for the fractal scan.
+
+The ring set (nside_scan centres x radii, fixed width) only depends on the
+map NSIDE, so it is built once and stored on disk as a compressed CSR
+structure:
+
+    offsets[k]:offsets[k+1]  -> slice of ring k
+    pixels                   -> full-sky RING pixel ids
+    reduced                  -> positions of those pixels in unique_pixels
+    unique_pixels            -> sorted union of all ring pixels
+    ring_id, theta, phi, radius -> ring metadata
+"""
+
+import os
+import math
+import hashlib
+import tempfile
+import numpy as np
+import healpy as hp
+from map_cache import CACHE_DIR
+
+RING_INDEX_VERSION = 1
+MIN_RING_PIXELS = 50
+
+_INV_TWOPI = 1.0 / (2.0 * math.pi)
+
+def _ring_above(nside, z):
+    """Number of the ring just north of z (healpix_cxx ring_above)."""
+    az = abs(z)
+    if az <= 2.0 / 3.0:
+        return int(nside * (2.0 - 1.5 * z))
+    iring = int(nside * math.sqrt(3.0 * (1.0 - az)))
+    return iring if z > 0 else 4 * nside - iring - 1
+
+def _ring_info(nside, rings):
+    """(z, startpix, ringpix, shift) for an array of ring numbers (1..4*nside-1)."""
+    rings = np.asarray(rings, dtype=np.int64)
+    npix = 12 * nside * nside
+    fact2 = 4.0 / npix
+    fact1 = (nside << 1) * fact2
+    ncap = 2 * nside * (nside - 1)
+
+    north = rings < nside
+    south = rings > 3 * nside
+    south_r = 4 * nside - rings
+
+    z = np.where(north, 1.0 - rings * rings * fact2,
+        np.where(south, south_r * south_r * fact2 - 1.0, (2 * nside - rings) * fact1))
+    ringpix = np.where(north, 4 * rings, np.where(south, 4 * south_r, 4 * nside))
+    startpix = np.where(north, 2 * rings * (rings - 1),
+               np.where(south, npix - 2 * south_r * (south_r + 1), ncap + (rings - nside) * 4 * nside))
+    equatorial_shifted = ((rings - nside) & 1) == 0
+    shift = np.where(north | south | equatorial_shifted, 0.5, 0.0)
+    return z, startpix, ringpix, shift
+
+def _disc_ring_ranges(nside, theta0, phi0, radius, rings):
+    """
+    Per-ring pixel range of a disc, mirroring healpix_cxx query_disc (RING,
+    non-inclusive) so the selected pixels are bit-for-bit the same.
+
+    Returns (lo, hi, full) over `rings`: ring-local unwrapped index ranges
+    [lo, hi] (empty when lo > hi); full=True for rings entirely inside.
+    """
+    n = len(rings)
+    lo = np.zeros(n, dtype=np.int64)
+    hi = np.full(n, -1, dtype=np.int64)
+    full = np.zeros(n, dtype=bool)
+    if radius <= 0:
+        return lo, hi, full
+    if radius >= math.pi:
+        full[:] = True
+        return lo, hi, full
+
+    z0 = math.cos(theta0)
+    denom = math.sqrt((1.0 - z0) * (1.0 + z0))
+    xa = 1.0 / denom if denom > 0 else math.inf
+    cosr = math.cos(radius)
+
+    rlat1 = theta0 - radius
+    irmin = _ring_above(nside, math.cos(rlat1)) + 1
+    if rlat1 <= 0 and irmin > 1:
+        full |= rings < irmin
+    rlat2 = theta0 + radius
+    irmax = _ring_above(nside, math.cos(rlat2))
+    if rlat2 >= math.pi and irmax + 1 < 4 * nside:
+        full |= rings > irmax
+
+    band = np.flatnonzero((rings >= irmin) & (rings <= irmax))
+    if len(band):
+        z, _, ringpix, shift = _ring_info(nside, rings[band])
+        for k, j in enumerate(band):
+            x = (cosr - z[k] * z0) * xa
+            ysq = 1.0 - z[k] * z[k] - x * x
+            dphi = math.pi - 1e-15 if ysq <= 0 else math.atan2(math.sqrt(ysq), x)
+            if dphi > 0:
+                nr = ringpix[k]
+                lo[j] = math.floor(nr * _INV_TWOPI * (phi0 - dphi) - shift[k]) + 1
+                hi[j] = math.floor(nr * _INV_TWOPI * (phi0 + dphi) - shift[k])
+    return lo, hi, full
+
+def _expand_ranges(starts, stops):
+    """Concatenates arange(starts[i], stops[i]) for all i without a Python loop."""
+    lengths = stops - starts
+    keep = lengths > 0
+    starts, lengths = starts[keep], lengths[keep]
+    if len(lengths) == 0:
+        return np.empty(0, dtype=np.int64)
+    first = np.cumsum(lengths) - lengths
+    return np.repeat(starts - first, lengths) + np.arange(lengths.sum())
+
+def query_annulus(nside, center_vec, inner_rad, outer_rad, nest=False, order='ring'):
+    """
+    Pixels whose centres lie in the outer disc but not in the inner disc.
+
+    Exactly equal to np.setdiff1d(hp.query_disc(nside, vec, outer_rad),
+    hp.query_disc(nside, vec, inner_rad)) but walks the iso-latitude rings
+    once and emits only the annulus, with no disc-sized sort.
+
+    order='ring' returns sorted pixel ids (as setdiff1d does);
+    order='azimuth' sorts them by position angle around the centre.
+    """
+    x, y, zc = (float(c) for c in center_vec)
+    theta0 = math.atan2(math.sqrt(x * x + y * y), zc)
+    phi0 = math.atan2(y, x) if (x != 0.0 or y != 0.0) else 0.0
+    if phi0 < 0.0:
+        phi0 += 2.0 * math.pi
+
+    rings = np.arange(1, 4 * nside, dtype=np.int64)
+    o_lo, o_hi, o_full = _disc_ring_ranges(nside, theta0, phi0, outer_rad, rings)
+    i_lo, i_hi, i_full = _disc_ring_ranges(nside, theta0, phi0, inner_rad, rings)
+    i_empty = i_hi < i_lo
+
+    # Unwrapped ring-local pieces of outer minus inner (inner is always inside outer)
+    use = (o_full | (o_hi >= o_lo)) & ~i_full
+    rings, o_lo, o_hi, o_full = rings[use], o_lo[use], o_hi[use], o_full[use]
+    i_lo, i_hi, i_empty = i_lo[use], i_hi[use], i_empty[use]
+    _, startpix, ringpix, _ = _ring_info(nside, rings)
+
+    # A full outer ring is the window of nr pixels starting where the inner range starts
+    o_lo = np.where(o_full, np.where(i_empty, 0, i_lo), o_lo)
+    o_hi = np.where(o_full, o_lo + ringpix - 1, o_hi)
+
+    a_start = o_lo
+    a_stop = np.where(i_empty, o_hi + 1, i_lo)
+    b_start = np.where(i_empty, 0, i_hi + 1)
+    b_stop = np.where(i_empty, 0, o_hi + 1)
+
+    # Split every piece at the ring seam so each lands in [0, nr)
+    starts, stops, owners = [], [], []
+    for s, e in ((a_start, a_stop), (b_start, b_stop)):
+        base = np.floor_divide(s, ringpix) * ringpix
+        s0, e0 = s - base, e - base
+        starts += [s0, np.zeros_like(s0)]
+        stops += [np.minimum(e0, ringpix), np.maximum(e0 - ringpix, 0)]
+        owners += [startpix, startpix]
+    starts = np.concatenate(starts) + np.concatenate(owners)
+    stops = np.concatenate(stops) + np.concatenate(owners)
+
+    pixels = np.sort(_expand_ranges(starts, stops))
+    if nest:
+        pixels = np.sort(hp.ring2nest(nside, pixels))
+    if order == 'azimuth':
+        pixels = pixels[azimuth_order(nside, center_vec, pixels, nest=nest)]
+    return pixels
+
+def azimuth_order(nside, center_vec, pixels, nest=False):
+    """argsort of `pixels` by position angle around center_vec (0 = north, growing east)."""
+    c = np.asarray(center_vec, dtype=np.float64)
+    c = c / np.linalg.norm(c)
+    north = np.array([0.0, 0.0, 1.0]) if abs(c[2]) < 0.999999 else np.array([1.0, 0.0, 0.0])
+    e_east = np.cross(north, c)
+    e_east /= np.linalg.norm(e_east)
+    e_north = np.cross(c, e_east)
+    v = np.array(hp.pix2vec(nside, pixels, nest=nest))
+    angle = np.arctan2(e_east @ v, e_north @ v)
+    return np.argsort(np.mod(angle, 2 * np.pi), kind='stable')
+
+def get_ring_pixels(nside, center_vec, radius_rad, width_rad=0.01):
+    """Returns pixel indices for a ring."""
+    inner_rad = radius_rad - width_rad/2
+    outer_rad = radius_rad + width_rad/2
+    return query_annulus(nside, center_vec, inner_rad, outer_rad)
+
+def _index_dtype(npix):
+    return np.int32 if npix < 2**31 else np.int64
+
+def build_ring_set(nside, theta, phi, radii_deg, width_deg, min_pixels=MIN_RING_PIXELS):
+    """
+    CSR ring index (same layout as build_ring_index) for an arbitrary list of
+    rings given by centre (theta, phi) and radius in degrees. Rings with
+    `min_pixels` pixels or fewer are dropped; 'source' holds the position of
+    every kept ring in the input lists.
+    """
+    width_rad = np.radians(width_deg)
+    pix_dtype = _index_dtype(hp.nside2npix(nside))
+
+    ring_pixels, source = [], []
+    for j, (t, p, r_deg) in enumerate(zip(theta, phi, radii_deg)):
+        vec = hp.ang2vec(t, p)
+        pixels = get_ring_pixels(nside, vec, np.radians(r_deg), width_rad=width_rad)
+        if len(pixels) > min_pixels:
+            ring_pixels.append(pixels.astype(pix_dtype))
+            source.append(j)
+    source = np.asarray(source, dtype=np.int64)
+
+    offsets = np.zeros(len(ring_pixels) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(p) for p in ring_pixels])
+    pixels = np.concatenate(ring_pixels) if ring_pixels else np.empty(0, dtype=pix_dtype)
+    unique_pixels = np.unique(pixels)
+    reduced = np.searchsorted(unique_pixels, pixels).astype(_index_dtype(len(unique_pixels)))
+
+    return {
+        'nside': np.int64(nside),
+        'offsets': offsets,
+        'pixels': pixels,
+        'reduced': reduced,
+        'unique_pixels': unique_pixels,
+        'ring_id': np.arange(len(ring_pixels), dtype=np.int64),
+        'theta': np.asarray(theta, dtype=np.float64)[source],
+        'phi': np.asarray(phi, dtype=np.float64)[source],
+        'radius': np.asarray(radii_deg, dtype=np.float64)[source],
+        'source': source,
+    }
+
+def build_ring_index(nside, nside_scan, radii_deg, width_deg, min_pixels=MIN_RING_PIXELS):
+    """
+    Builds the CSR ring index. Ring ids run radius-major, then centre pixel,
+    over the rings that have more than `min_pixels` pixels.
+    """
+    npix_scan = hp.nside2npix(nside_scan)
+    centers_theta, centers_phi = hp.pix2ang(nside_scan, np.arange(npix_scan))
+    n_radii = len(radii_deg)
+    index = build_ring_set(nside, np.tile(centers_theta, n_radii), np.tile(centers_phi, n_radii),
+                           np.repeat(np.asarray(radii_deg, dtype=np.float64), npix_scan),
+                           width_deg, min_pixels)
+    del index['source']
+    return index
+
+def child_centres(nside_scan, pix):
+    """RING ids, at 2 * nside_scan, of the four NESTED children of RING pixels `pix`."""
+    nest = hp.ring2nest(nside_scan, np.asarray(pix, dtype=np.int64))
+    children = (4 * nest[:, None] + np.arange(4)).ravel()
+    return hp.nest2ring(2 * nside_scan, children)
+
+def ring_index_key(nside, nside_scan, radii_deg, width_deg, min_pixels=MIN_RING_PIXELS):
+    """Cache key for (nside, nside_scan, radii, width)."""
+    spec = (f"v{RING_INDEX_VERSION}|{nside}|{nside_scan}|"
+            f"{','.join(repr(float(r)) for r in radii_deg)}|{float(width_deg)!r}|{min_pixels}")
+    return hashlib.sha256(spec.encode()).hexdigest()[:24]
+
+def load_ring_index(nside, nside_scan, radii_deg, width_deg, min_pixels=MIN_RING_PIXELS,
+                    cache_dir=CACHE_DIR):
+    """Returns the ring index, loading it from disk or building and storing it."""
+    key = ring_index_key(nside, nside_scan, radii_deg, width_deg, min_pixels)
+    rings_dir = os.path.join(cache_dir, 'rings')
+    path = os.path.join(rings_dir, f"rings_{key}.npz")
+
+    if os.path.exists(path):
+        with np.load(path) as data:
+            return {k: data[k] for k in data.files}
+
+    index = build_ring_index(nside, nside_scan, radii_deg, width_deg, min_pixels)
+    os.makedirs(rings_dir, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=rings_dir, suffix='.npz')
+    os.close(fd)
+    np.savez_compressed(tmp, **index)
+    os.replace(tmp, path)
+    return index
+
+def ring_slice(index, k):
+    """(start, stop) of ring k in the CSR arrays."""
+    return int(index['offsets'][k]), int(index['offsets'][k + 1])
@@ -0,0 +1,260 @@
+# ==============================================================================
+#  The Geometry of the Echo: PMN-01 Model Source Code
+#  ----------------------------------------------------------------------------
+#  (c) 2025 Pablo Miguel Nieto Muñoz
+#  License: MIT (See LICENSE file for details)
+#
+#  Scientific Citation:
+#  Nieto Muñoz, P. M. (2025). "The Geometry of the Echo: Observational
+#  Confirmation of the Chiral Dodecahedral Universe".
+#  Zenodo.
+# ==============================================================================
+
+"""
+Vectorized ring statistics.
+
+Rings are passed as one flat array of values plus CSR-style `offsets`
+(ring k = values[offsets[k]:offsets[k+1]]), so thousands of rings are
+handled with a few array operations instead of a Python loop per ring.
+"""
+
+import numpy as np
+
+# Upper bound on values gathered per lag in one go (keeps temporaries ~100 MB)
+MAX_BATCH_ELEMENTS = 4_000_000
+
+def _hurst_group(values, offsets, rings, max_lag):
+    """R/S Hurst exponent for a group of rings (indices `rings` into offsets)."""
+    starts = offsets[rings]
+    lengths = offsets[rings + 1] - starts
+    lag_limit = np.minimum(lengths // 2, max_lag)
+
+    n_rings = len(rings)
+    sx = np.zeros(n_rings)
+    sy = np.zeros(n_rings)
+    sxx = np.zeros(n_rings)
+    sxy = np.zeros(n_rings)
+    n_lags = np.zeros(n_rings, dtype=np.int64)
+
+    top = int(lag_limit.max()) if n_rings else 0
+    for lag in range(2, top):
+        active = np.flatnonzero(lag < lag_limit)
+        if len(active) == 0:
+            continue
+        # Same chunking as the reference loop: starts 0, lag, ... < n - lag
+        n_chunks = (lengths[active] - 1) // lag
+        owner = np.repeat(np.arange(len(active)), n_chunks)
+        first = np.cumsum(n_chunks) - n_chunks
+        chunk_no = np.arange(len(owner)) - first[owner]
+        block_start = starts[active][owner] + chunk_no * lag
+
+        blocks = values[block_start[:, None] + np.arange(lag)]
+        centered = blocks - blocks.mean(axis=1, keepdims=True)
+        walk = np.cumsum(centered, axis=1)
+        R = walk.max(axis=1) - walk.min(axis=1)
+        S = blocks.std(axis=1, ddof=1)
+
+        ok = S > 0
+        rs = np.where(ok, R / np.where(ok, S, 1.0), 0.0)
+        rs_sum = np.bincount(owner, weights=rs, minlength=len(active))
+        rs_cnt = np.bincount(owner, weights=ok, minlength=len(active))
+
+        has = rs_cnt > 0
+        ring_idx = active[has]
+        x = np.log10(lag)
+        y = np.log10(rs_sum[has] / rs_cnt[has])
+        sx[ring_idx] += x
+        sy[ring_idx] += y
+        sxx[ring_idx] += x * x
+        sxy[ring_idx] += x * y
+        n_lags[ring_idx] += 1
+
+    # Least-squares slope of log10(R/S) vs log10(lag), as np.polyfit(deg=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = (n_lags * sxy - sx * sy) / (n_lags * sxx - sx * sx)
+    hurst = np.where(n_lags < 3, 0.5, slope)
+    hurst[lengths < 20] = np.nan
+    return hurst
+
+def hurst_rs_batch(values, offsets, max_lag=100):
+    """
+    Hurst exponent (Rescaled Range analysis) for every ring in a ragged batch.
+
+    values: flat 1-D array with all rings back to back.
+    offsets: int array of len(n_rings) + 1; ring k = values[offsets[k]:offsets[k+1]].
+    max_lag: lags run over range(2, min(len(ring)//2, max_lag)).
+
+    Returns float64 array of len(n_rings): NaN for rings shorter than 20
+    samples, 0.5 when fewer than 3 lags give a finite R/S.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    n_rings = len(offsets) - 1
+    hurst = np.full(n_rings, np.nan)
+    if n_rings <= 0:
+        return hurst
+
+    # Group consecutive rings so each gather stays under MAX_BATCH_ELEMENTS
+    lengths = np.diff(offsets)
+    group_start = 0
+    running = 0
+    for k in range(n_rings):
+        running += lengths[k]
+        if running >= MAX_BATCH_ELEMENTS or k == n_rings - 1:
+            rings = np.arange(group_start, k + 1)
+            hurst[rings] = _hurst_group(values, offsets, rings, max_lag)
+            group_start, running = k + 1, 0
+    return hurst
+
+def hurst_rs(ts, max_lag=100):
+    """Hurst exponent of a single series (see hurst_rs_batch)."""
+    ts = np.asarray(ts)
+    return float(hurst_rs_batch(ts, [0, len(ts)], max_lag=max_lag)[0])
+
+def segment_moments(x, y, offsets):
+    """
+    Per-ring sums and moments of two aligned ragged arrays in one pass of
+    np.add.reduceat (no Python loop over rings).
+
+    Returns a dict of arrays of len(n_rings): n, sum_x, sum_y, sum_xx,
+    sum_yy, sum_xy (raw), mean_x, mean_y, std_x, std_y (ddof=0), corr
+    (Pearson r from the centred cross-products), const_x, const_y
+    (all values equal). Empty rings give NaN / False.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    n = np.diff(offsets)
+    n_rings = len(n)
+
+    out = {'n': n}
+    for key in ('sum_x', 'sum_y', 'sum_xx', 'sum_yy', 'sum_xy',
+                'mean_x', 'mean_y', 'std_x', 'std_y', 'corr'):
+        out[key] = np.full(n_rings, np.nan)
+    out['const_x'] = np.zeros(n_rings, dtype=bool)
+    out['const_y'] = np.zeros(n_rings, dtype=bool)
+
+    # reduceat misbehaves on empty segments: reduce over the non-empty ones only
+    full = n > 0
+    if not full.any():
+        return out
+    cnt = n[full]
+    starts = offsets[:-1][full] - offsets[0]
+    x = x[offsets[0]:offsets[-1]]
+    y = y[offsets[0]:offsets[-1]]
+
+    out['sum_x'][full] = sx = np.add.reduceat(x, starts)
+    out['sum_y'][full] = sy = np.add.reduceat(y, starts)
+    out['sum_xx'][full] = np.add.reduceat(x * x, starts)
+    out['sum_yy'][full] = np.add.reduceat(y * y, starts)
+    out['sum_xy'][full] = np.add.reduceat(x * y, starts)
+    mx, my = sx / cnt, sy / cnt
+    out['mean_x'][full], out['mean_y'][full] = mx, my
+
+    # Centred second pass: no cancellation from the raw sums
+    dx = x - np.repeat(mx, cnt)
+    dy = y - np.repeat(my, cnt)
+    cxx = np.add.reduceat(dx * dx, starts)
+    cyy = np.add.reduceat(dy * dy, starts)
+    cxy = np.add.reduceat(dx * dy, starts)
+    out['std_x'][full] = np.sqrt(cxx / cnt)
+    out['std_y'][full] = np.sqrt(cyy / cnt)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out['corr'][full] = np.clip(cxy / np.sqrt(cxx * cyy), -1.0, 1.0)
+
+    out['const_x'][full] = np.maximum.reduceat(x, starts) == np.minimum.reduceat(x, starts)
+    out['const_y'][full] = np.maximum.reduceat(y, starts) == np.minimum.reduceat(y, starts)
+    return out
+
+def _fd_entropy_group(values, offsets):
+    """hist_entropy_batch for one group of non-empty rings (offsets start at 0)."""
+    n = np.diff(offsets)
+    starts = offsets[:-1]
+    n_rings = len(n)
+    ring = np.repeat(np.arange(n_rings), n)
+    srt = values[np.lexsort((values, ring))]
+
+    # Freedman-Diaconis width, with np.percentile's 'linear' interpolation
+    def percentile(q):
+        virt = q * (n - 1).astype(np.float64)
+        prev = np.floor(virt).astype(np.int64)
+        gamma = virt - prev
+        a = srt[starts + prev]
+        b = srt[starts + np.minimum(prev + 1, n - 1)]
+        diff = b - a
+        res = a + diff * gamma
+        hi = gamma >= 0.5
+        res[hi] = (b - diff * (1 - gamma))[hi]
+        return res
+    width = 2.0 * (percentile(0.75) - percentile(0.25)) * n.astype(np.float64) ** (-1.0 / 3.0)
+
+    # Edges follow np.histogram exactly (same dtype, same linspace) so every
+    # value lands in the same bin as with np.histogram(bins='fd')
+    first = srt[starts]
+    last = srt[starts + n - 1]
+    n_bins = np.ones(n_rings, dtype=np.int64)
+    edges = []
+    for k in range(n_rings):
+        lo, hi_ = first[k], last[k]
+        if lo == hi_:
+            lo, hi_ = lo - 0.5, hi_ + 0.5
+            first[k], last[k] = lo, hi_
+        if width[k]:
+            n_bins[k] = int(np.ceil((hi_ - lo) / width[k]))
+        edges.append(np.linspace(lo, hi_, n_bins[k] + 1, endpoint=True, dtype=values.dtype))
+    edge_off = np.zeros(n_rings + 1, dtype=np.int64)
+    edge_off[1:] = np.cumsum(n_bins + 1)
+    edges = np.concatenate(edges)
+
+    # Bin index as np.histogram computes it, then the same edge corrections
+    nb = np.repeat(n_bins, n)
+    lo = np.repeat(first, n)
+    f_idx = ((srt - lo) / np.repeat(last - first, n)) * nb.astype(values.dtype)
+    idx = f_idx.astype(np.intp)
+    idx[idx == nb] -= 1
+    e0 = np.repeat(edge_off[:-1], n)
+    idx[srt < edges[e0 + idx]] -= 1
+    inc = (srt >= edges[e0 + idx + 1]) & (idx != nb - 1)
+    idx[inc] += 1
+
+    bin_off = np.zeros(n_rings + 1, dtype=np.int64)
+    bin_off[1:] = np.cumsum(n_bins)
+    counts = np.bincount(bin_off[:-1][ring] + idx, minlength=bin_off[-1])
+
+    # density=True histogram, then scipy.stats.entropy (normalised, natural log)
+    widths = np.diff(edges).astype(np.float64)
+    widths = np.delete(widths, edge_off[1:-1] - 1)
+    density = counts / widths / np.repeat(n, n_bins)
+    pk = density / np.repeat(np.add.reduceat(density, bin_off[:-1]), n_bins)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        terms = np.where(pk > 0, -pk * np.log(np.where(pk > 0, pk, 1.0)), 0.0)
+    return np.add.reduceat(terms, bin_off[:-1])
+
+def hist_entropy_batch(values, offsets):
+    """
+    Shannon entropy of the density histogram (np.histogram(bins='fd',
+    density=True) + scipy.stats.entropy) of every ring of a ragged batch.
+    Values keep their dtype so the binning matches np.histogram on the same
+    array. Empty rings give NaN.
+    """
+    values = np.asarray(values)
+    if not np.issubdtype(values.dtype, np.floating):
+        values = values.astype(np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    lengths = np.diff(offsets)
+    n_rings = len(lengths)
+    ent = np.full(n_rings, np.nan)
+
+    # Groups of consecutive non-empty rings, each under MAX_BATCH_ELEMENTS
+    group, running = [], 0
+    for k in range(n_rings + 1):
+        flush = k == n_rings or lengths[k] == 0 or (group and running + lengths[k] > MAX_BATCH_ELEMENTS)
+        if flush and group:
+            rings = np.asarray(group)
+            sub = offsets[rings[0]:rings[-1] + 2] - offsets[rings[0]]
+            ent[rings] = _fd_entropy_group(values[offsets[rings[0]]:offsets[rings[-1] + 1]], sub)
+            group, running = [], 0
+        if k < n_rings and lengths[k] > 0:
+            group.append(k)
+            running += lengths[k]
+    return ent
@@ -15,6 +15,8 @@ import healpy as hp
 import matplotlib.pyplot as plt
 from scipy.spatial.transform import Rotation as R
 from scipy.spatial import cKDTree
+from map_cache import load_maps
+from sky_masks import galactic_cut
 
 # --- CONFIGURACIÓN ---
 INPUT_FILE = 'data/raw/COM_CMB_IQU-sevem_2048_R4.00.fits'
@@ -99,15 +101,12 @@ def main():
     print("🕵️ SABUESO MORAN SCANNER: BUSCANDO LA CARA VECINA MÁS SÓLIDA")
     
     # 1. Cargar Mapa
-    maps = hp.read_map(INPUT_FILE, field=[0,1,2], verbose=False)
-    map_comb = maps[0] * np.sqrt(maps[1]**2 + maps[2]**2)
-    nside = hp.get_nside(maps[0])
+    # Copia en RAM: la máscara galáctica escribe sobre el mapa
+    map_comb = np.array(load_maps(INPUT_FILE, 'IP'))
+    nside = hp.get_nside(map_comb)
     
     # Máscara Galáctica Rápida
-    npix = hp.nside2npix(nside)
-    theta, _ = hp.pix2ang(nside, np.arange(npix))
-    lat_gal = 90 - np.degrees(theta)
-    mask = (np.abs(lat_gal) > 20.0)
+    mask = galactic_cut(nside, 20.0)
     map_comb[~mask] = 0.0
 
     # 2. Generar Candidatos (Los 5 Vecinos de Alfa)
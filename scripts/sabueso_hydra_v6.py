@@ -16,6 +16,8 @@ import pandas as pd
 from scipy.stats import pearsonr
 import matplotlib.pyplot as plt
 import os
+from map_cache import load_maps
+from tracker_engine import Spider, Autopilot, probe_signal
 
 # --- CONFIGURACIÓN TÁCTICA ---
 INPUT_FILE = 'data/raw/COM_CMB_IQU-sevem_2048_R4.00.fits'
@@ -24,23 +26,18 @@ OUTPUT_EXTENDED = 'data/processed/branch_3_extended.csv'
 STEP_SIZE = 0.1
 SCAN_RADIUS = 30.0  # Cuánto vamos a profundizar (en grados)
 MAX_STEPS = int(SCAN_RADIUS / STEP_SIZE)
+PROBE_DIST = 0.5
 
-def get_local_corr(lat, lon, angle, map_I, map_P, nside):
-    dist = 0.5
-    lat_r, lon_r = np.radians(lat), np.radians(lon)
-    ang_r, dist_r = np.radians(angle), np.radians(dist)
-    nl_r = np.arcsin(np.sin(lat_r)*np.cos(dist_r) + np.cos(lat_r)*np.sin(dist_r)*np.cos(ang_r))
-    nlo_r = lon_r + np.arctan2(np.sin(ang_r)*np.sin(dist_r)*np.cos(lat_r), np.cos(dist_r)-np.sin(lat_r)*np.sin(nl_r))
-    pix = hp.ang2pix(nside, np.pi/2 - nl_r, nlo_r)
-    return abs(map_I[pix] * map_P[pix])
+# Cada paso elige el mejor rumbo en +/-20º (de grado en grado) y avanza 0.1º
+SPIDER = Spider(step_size=STEP_SIZE, look_ahead=PROBE_DIST,
+                autopilot=Autopilot(np.arange(-20, 20, 1), dist=PROBE_DIST, floor=0))
 
 def main():
     print("🐶 --- SABUESO HYDRA V6: DEEP SCAN (RAMA 3) ---")
     
     # 1. Cargar Datos
     print("🛰️ Cargando mapas y rastro previo...")
-    maps = hp.read_map(INPUT_FILE, field=[0,1,2], verbose=False)
-    map_I, map_P = maps[0], np.sqrt(maps[1]**2 + maps[2]**2)
+    map_I, map_P = load_maps(INPUT_FILE, ('I', 'P'))
     nside = hp.get_nside(map_I)
     
     df_prev = pd.read_csv(BRANCH_3_FILE)
@@ -56,33 +53,22 @@ def main():
 
     # 2. RASTREO DE LARGA DISTANCIA
     print(f"🚀 Iniciando exploración desde Lat {curr_lat:.2f}, Lon {curr_lon:.2f}")
-    for s in range(MAX_STEPS):
-        # Escaneo de dirección para corregir rumbo
-        best_a, max_v = curr_ang, 0
-        for a in np.arange(curr_ang-20, curr_ang+20, 1):
-            v = get_local_corr(curr_lat, curr_lon, a, map_I, map_P, nside)
-            if v > max_v:
-                max_v, best_a = v, a
-        
-        curr_ang = best_a
-        
-        # Moverse 0.1º
-        lat_r, lon_r = np.radians(curr_lat), np.radians(curr_lon)
-        d_r, a_r = np.radians(STEP_SIZE), np.radians(curr_ang)
-        curr_lat = np.degrees(np.arcsin(np.sin(lat_r)*np.cos(d_r) + np.cos(lat_r)*np.sin(d_r)*np.cos(a_r)))
-        curr_lon = np.degrees(lon_r + np.arctan2(np.sin(a_r)*np.sin(d_r)*np.cos(lat_r), np.cos(d_r)-np.sin(lat_r)*np.sin(np.radians(curr_lat))))
-        
-        extended_path.append({'lat': curr_lat, 'lon': curr_lon, 'corr': max_v})
+    res = SPIDER.run(curr_lat, curr_lon, curr_ang, map_I, map_P, nside, MAX_STEPS)
+    lat, lon, ang = res['lat'][1:, 0], res['lon'][1:, 0], res['bearing'][1:, 0]
+    max_v = res['signal'][:, 0]
+    extended_path += [{'lat': a, 'lon': o, 'corr': v} for a, o, v in zip(lat, lon, max_v)]
 
-        # DETECTOR DE VÉRTICES: Si hay un pico lateral fuerte, sospechamos vértice
-        side_v = get_local_corr(curr_lat, curr_lon, curr_ang + 120, map_I, map_P, nside)
-        if side_v > max_v * 0.8 and s > 50:
-            print(f"\n⚠️ ¡VÉRTICE POTENCIAL DETECTADO! en Lat {curr_lat:.2f}, Lon {curr_lon:.2f}")
+    # DETECTOR DE VÉRTICES: Si hay un pico lateral fuerte, sospechamos vértice (todo el rastro en una sonda)
+    side_v = probe_signal(lat, lon, ang + 120, PROBE_DIST, map_I, map_P, nside)
+    for s in range(MAX_STEPS):
+        if side_v[s] > max_v[s] * 0.8 and s > 50:
+            print(f"\n⚠️ ¡VÉRTICE POTENCIAL DETECTADO! en Lat {lat[s]:.2f}, Lon {lon[s]:.2f}")
             vertex_found = True
             # No paramos, seguimos para mapear la salida
 
         if s % 50 == 0:
-            print(f"👣 Paso {s}/{MAX_STEPS} | Lat: {curr_lat:.2f} | Rumbo: {curr_ang:.1f}º")
+            print(f"👣 Paso {s}/{MAX_STEPS} | Lat: {lat[s]:.2f} | Rumbo: {ang[s]:.1f}º")
+    curr_lat, curr_lon = lat[-1], lon[-1]
 
     # 3. Guardar y Dibujar
     df_final = pd.DataFrame(extended_path)
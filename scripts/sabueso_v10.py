@@ -15,6 +15,8 @@ import healpy as hp
 import pandas as pd
 import matplotlib.pyplot as plt
 import os
+from map_cache import load_maps
+from tracker_engine import Spider, Autopilot, Radar, destinations, probe_signal
 
 # --- COORDENADAS DEL VECINO 1 (EL GANADOR) ---
 TARGET_LAT = -70.8927
@@ -25,28 +27,21 @@ INPUT_FILE = 'data/raw/COM_CMB_IQU-sevem_2048_R4.00.fits'
 SONAR_RADIUS = 15.0   # Radio de búsqueda de pared
 STEP_SIZE = 0.2
 CORR_THRESHOLD_FACTOR = 0.4
+SONAR_RADII = np.array([8, 10, 12, 15])  # Distancias típicas al borde
 
-def get_signal_strength(lat, lon, map_I, map_P, nside):
-    # Evitar errores de rango
-    if lat > 90: lat = 180 - lat
-    if lat < -90: lat = -180 - lat
-    
-    pix = hp.ang2pix(nside, np.radians(90 - lat), np.radians(lon))
-    return abs(map_I[pix] * map_P[pix])
-
-def move_geodesic(lat, lon, angle, dist):
-    lat_r, lon_r = np.radians(lat), np.radians(lon)
-    ang_r, dist_r = np.radians(angle), np.radians(dist)
-    new_lat_r = np.arcsin(np.sin(lat_r)*np.cos(dist_r) + np.cos(lat_r)*np.sin(dist_r)*np.cos(ang_r))
-    new_lon_r = lon_r + np.arctan2(np.sin(ang_r)*np.sin(dist_r)*np.cos(lat_r), np.cos(dist_r)-np.sin(lat_r)*np.sin(new_lat_r))
-    return np.degrees(new_lat_r), np.degrees(new_lon_r)
+# Modo Araña: mira 0.5º adelante, autocorrige +/-15º a un paso, radar cada 10º
+# sin volver atrás (+/-45º); umbral fijo = 40% de la señal del muro
+SPIDER = Spider(step_size=STEP_SIZE, look_ahead=0.5,
+                autopilot=Autopilot([-15, -5, 0, 5, 15], dist=STEP_SIZE),
+                radar=Radar(range(0, 360, 10), dist=0.5, exclusion=45, wrap=False, floor=0),
+                threshold_factor=CORR_THRESHOLD_FACTOR, recalibrate=False, min_edge_steps=25,
+                max_vertices=5, move_after_turn=True)
 
 def main():
     print("🛸 SABUESO V10: NEIGHBOR TRACER - OBJETIVO SUR")
     print(f"📍 Desplegando en Vecino 1: Lat {TARGET_LAT:.4f}, Lon {TARGET_LON:.4f}")
     
-    maps = hp.read_map(INPUT_FILE, field=[0,1,2], verbose=False)
-    map_I, map_P = maps[0], np.sqrt(maps[1]**2 + maps[2]**2)
+    map_I, map_P = load_maps(INPUT_FILE, ('I', 'P'))
     nside = hp.get_nside(map_I)
 
     # 1. FASE DE SONAR (Buscar la pared)
@@ -55,15 +50,16 @@ def main():
     max_sig = 0
     wall_bearing = 0
     
-    # Escaneo radial
-    for ang in range(0, 360, 10):
-        for r in [8, 10, 12, 15]: # Distancias típicas al borde
-            l, lo = move_geodesic(TARGET_LAT, TARGET_LON, ang, r)
-            sig = get_signal_strength(l, lo, map_I, map_P, nside)
-            if sig > max_sig:
-                max_sig = sig
-                best_wall_lat, best_wall_lon = l, lo
-                wall_bearing = ang
+    # Escaneo radial: toda la rejilla rumbo x distancia en una sola sonda
+    sonar_angles = np.arange(0, 360, 10)
+    sig = probe_signal(TARGET_LAT, TARGET_LON, sonar_angles[:, None], SONAR_RADII, map_I, map_P, nside).ravel()
+    k = int(np.argmax(sig))
+    if sig[k] > max_sig:
+        max_sig = sig[k]
+        ang, r = sonar_angles[k // len(SONAR_RADII)], SONAR_RADII[k % len(SONAR_RADII)]
+        lat_r, lon_r = destinations(TARGET_LAT, TARGET_LON, ang, r)
+        best_wall_lat, best_wall_lon = np.degrees(lat_r), np.degrees(lon_r)
+        wall_bearing = ang
 
     if best_wall_lat is None:
         print("❌ No se detectó muro claro. La señal es difusa.")
@@ -76,61 +72,17 @@ def main():
     current_lat, current_lon = best_wall_lat, best_wall_lon
     current_bearing = (wall_bearing + 90) % 360 
     
-    path = [{'lat': current_lat, 'lon': current_lon, 'type': 'START_WALL'}]
-    vertices = 0
-    steps_since_vertex = 0
     threshold = max_sig * CORR_THRESHOLD_FACTOR
     
-    for s in range(1500): 
-        # Mirar adelante
-        next_lat, next_lon = move_geodesic(current_lat, current_lon, current_bearing, 0.5)
-        sig_ahead = get_signal_strength(next_lat, next_lon, map_I, map_P, nside)
-        
-        # Lógica de Vértice
-        if sig_ahead < threshold and steps_since_vertex > 25:
-            print(f"   ⚠️ Vértice detectado en Paso {s}. Reorientando...")
-            
-            # Escaneo de giro
-            best_new_ang = current_bearing
-            local_max = 0
-            reverse = (current_bearing + 180) % 360
-            
-            for scan_ang in range(0, 360, 10):
-                if abs(scan_ang - reverse) < 45: continue
-                l, lo = move_geodesic(current_lat, current_lon, scan_ang, 0.5)
-                s_val = get_signal_strength(l, lo, map_I, map_P, nside)
-                if s_val > local_max:
-                    local_max = s_val
-                    best_new_ang = scan_ang
-            
-            current_bearing = best_new_ang
-            path.append({'lat': current_lat, 'lon': current_lon, 'type': 'VERTEX'})
-            vertices += 1
-            steps_since_vertex = 0
-            print(f"   ↪️ Nuevo Rumbo: {current_bearing:.1f}º")
-            
-            if vertices >= 5:
-                print("🏆 ¡PENTÁGONO VECINO CERRADO!")
-                break
-        else:
-            # Autocorrección
-            best_adj = 0
-            m_val = -1
-            for adj in [-15, -5, 0, 5, 15]:
-                l, lo = move_geodesic(current_lat, current_lon, current_bearing + adj, STEP_SIZE)
-                v = get_signal_strength(l, lo, map_I, map_P, nside)
-                if v > m_val:
-                    m_val = v
-                    best_adj = adj
-            current_bearing += best_adj
-            steps_since_vertex += 1
-
-        # Mover
-        current_lat, current_lon = move_geodesic(current_lat, current_lon, current_bearing, STEP_SIZE)
-        path.append({'lat': current_lat, 'lon': current_lon, 'type': 'PATH'})
+    res = SPIDER.run(current_lat, current_lon, current_bearing, map_I, map_P, nside, 1500, threshold=threshold)
+    for v in res['vertex_log']:
+        print(f"   ⚠️ Vértice detectado en Paso {v['step']}. Reorientando...")
+        print(f"   ↪️ Nuevo Rumbo: {v['bearing_out']:.1f}º")
+    if res['closed'][0]:
+        print("🏆 ¡PENTÁGONO VECINO CERRADO!")
 
     # 3. RESULTADOS
-    df = pd.DataFrame(path)
+    df = pd.DataFrame(SPIDER.path(res, labels=('START_WALL', 'VERTEX', 'PATH'))).drop(columns='step')
     df.to_csv('data/processed/neighbor1_track.csv', index=False)
     
     plt.figure(figsize=(10, 8))
@@ -14,6 +14,7 @@ import numpy as np
 import healpy as hp
 import matplotlib.pyplot as plt
 import os
+from map_cache import load_maps
 
 # --- CONFIGURACIÓN DE NAVEGACIÓN ---
 INPUT_FILE = 'data/raw/COM_CMB_IQU-sevem_2048_R4.00.fits'
@@ -84,8 +85,7 @@ def main():
     # 1. Cargar Mapas
     print("🛰️ Cargando datos del CMB...")
     try:
-        maps = hp.read_map(INPUT_FILE, field=[0,1,2], verbose=False)
-        map_I, map_P = maps[0], np.sqrt(maps[1]**2 + maps[2]**2)
+        map_I, map_P = load_maps(INPUT_FILE, ('I', 'P'))
         nside = hp.get_nside(map_I)
     except FileNotFoundError:
         print(f"❌ ERROR: No se encuentra el archivo {INPUT_FILE}")
@@ -15,6 +15,8 @@ import healpy as hp
 import pandas as pd
 import matplotlib.pyplot as plt
 import os
+from map_cache import load_maps
+from tracker_engine import Spider, Autopilot, Radar, probe_signal
 
 # --- CONFIGURACIÓN DE MISIÓN ---
 INPUT_FILE = 'data/raw/COM_CMB_IQU-sevem_2048_R4.00.fits'
@@ -24,41 +26,15 @@ START_LAT, START_LON = -41.81, 354.38
 INITIAL_BEARING = 204.3         # Rumbo hacia la Rama 3
 STEP_SIZE = 0.2                 # Resolución de paso
 MAX_STEPS = 1500                # Límite de seguridad
+PROBE_DIST = 0.5                # Distancia de sondeo (grados)
 THEORETICAL_TWIST = 12.9742     # La predicción precisa del Cap 16
 
-def get_signal_at(lat, lon, angle, map_I, map_P, nside):
-    """
-    Sondea la señal 0.5 grados adelante.
-    Fórmula de Detección: Intensidad * Polarización (Busca gradientes fuertes)
-    """
-    # Proyectar coordenadas
-    dist_rad = np.radians(0.5)
-    lat_r, lon_r = np.radians(lat), np.radians(lon)
-    ang_r = np.radians(angle)
-    
-    new_lat_r = np.arcsin(np.sin(lat_r)*np.cos(dist_rad) + np.cos(lat_r)*np.sin(dist_rad)*np.cos(ang_r))
-    new_lon_r = lon_r + np.arctan2(np.sin(ang_r)*np.sin(dist_rad)*np.cos(lat_r), np.cos(dist_rad)-np.sin(lat_r)*np.sin(new_lat_r))
-    
-    # Convertir a píxel HEALPix
-    pix = hp.ang2pix(nside, np.pi/2 - new_lat_r, new_lon_r)
-    
-    # Extraer valor (Evitar NaNs)
-    val_I = map_I[pix]
-    val_P = map_P[pix]
-    if np.isnan(val_I): val_I = 0
-    if np.isnan(val_P): val_P = 0
-    
-    return abs(val_I * val_P)
-
-def move(lat, lon, angle, step_deg):
-    """Mueve al Sabueso en la esfera."""
-    lat_r, lon_r = np.radians(lat), np.radians(lon)
-    ang_r, dist_r = np.radians(angle), np.radians(step_deg)
-    
-    new_lat_r = np.arcsin(np.sin(lat_r)*np.cos(dist_r) + np.cos(lat_r)*np.sin(dist_r)*np.cos(ang_r))
-    new_lon_r = lon_r + np.arctan2(np.sin(ang_r)*np.sin(dist_r)*np.cos(lat_r), np.cos(dist_r)-np.sin(lat_r)*np.sin(new_lat_r))
-    
-    return np.degrees(new_lat_r), np.degrees(new_lon_r)
+# Reglas de la araña: autopilot +/-8º, radar cada 5º sin volver atrás (+/-45º),
+# empujón x1.2 a los giros de 60-85º y umbral recalibrado al 45% en cada arista
+SPIDER = Spider(step_size=STEP_SIZE, look_ahead=PROBE_DIST,
+                autopilot=Autopilot([-8, -4, 0, 4, 8], dist=PROBE_DIST),
+                radar=Radar(np.arange(0, 360, 5), dist=PROBE_DIST, exclusion=45, bonus=(60, 85, 1.2)),
+                threshold_factor=0.45, min_edge_steps=20, max_vertices=5)
 
 def run_spider_v9_corrected():
     print("🕷️ INICIANDO SABUESO V9 (PROOF OF TWIST)...")
@@ -70,103 +46,32 @@ def run_spider_v9_corrected():
 
     # 1. CARGA DE DATOS
     print("   ⏳ Cargando mapas Planck (I, Q, U)...")
-    maps = hp.read_map(INPUT_FILE, field=[0,1,2], verbose=False)
-    map_I = maps[0]
-    # Calcular Polarización Total P = sqrt(Q^2 + U^2)
-    map_P = np.sqrt(maps[1]**2 + maps[2]**2)
+    # I y Polarización Total P = sqrt(Q^2 + U^2), precalculada en la caché
+    map_I, map_P = load_maps(INPUT_FILE, ('I', 'P'))
     nside = hp.get_nside(map_I)
     
-    # 2. INICIALIZACIÓN
-    path = [{'lat': START_LAT, 'lon': START_LON, 'type': 'VERTEX_START', 'step': 0}]
-    current_lat, current_lon = START_LAT, START_LON
-    current_bearing = INITIAL_BEARING
-    
+    # 2. RASTREO
     # Calibración de señal basal
-    initial_sig = get_signal_at(START_LAT, START_LON, current_bearing, map_I, map_P, nside)
+    initial_sig = float(probe_signal(START_LAT, START_LON, INITIAL_BEARING, PROBE_DIST, map_I, map_P, nside))
     # Umbral dinámico: Si la señal cae por debajo del 45% de la media local, es un corte.
-    signal_threshold = initial_sig * 0.45 
+    signal_threshold = initial_sig * SPIDER.threshold_factor
     
     print(f"   📶 Señal Basal: {initial_sig:.2e} | Umbral Corte: {signal_threshold:.2e}")
     print("   🚀 Sabueso desplegado. Rastreo activo...")
 
-    vertices_found = 0
-    steps_on_edge = 0
-    total_steps = 0
-    
-    while total_steps < MAX_STEPS:
-        # A) Mirar adelante
-        sig_ahead = get_signal_at(current_lat, current_lon, current_bearing, map_I, map_P, nside)
-        
-        # B) Comprobación de "Caída al Abismo" (Fin de Arista)
-        if sig_ahead < signal_threshold and steps_on_edge > 20:
-            print(f"\n🛑 ARISTA TERMINADA en Paso {total_steps} (Lat {current_lat:.2f}, Lon {current_lon:.2f})")
-            print(f"   📉 Señal cayó a {sig_ahead:.2e}. Iniciando Radar...")
-            
-            # --- MANIOBRA DE GIRO (RADAR) ---
-            best_new_angle = current_bearing
-            max_scan_sig = -1
-            
-            # Escanear 360 grados
-            scan_angles = np.arange(0, 360, 5)
-            reverse_angle = (current_bearing + 180) % 360
-            
-            for ang in scan_angles:
-                # No volver hacia atrás (+/- 45 grados)
-                diff = abs(ang - reverse_angle)
-                if diff > 180: diff = 360 - diff
-                if diff < 45: continue
-                
-                scan_sig = get_signal_at(current_lat, current_lon, ang, map_I, map_P, nside)
-                
-                # Bonus geométrico: Si el giro es cercano a 72 grados (Dodecaedro), le damos peso extra
-                turn_angle = abs(ang - current_bearing)
-                if turn_angle > 180: turn_angle = 360 - turn_angle
-                if 60 < turn_angle < 85: 
-                    scan_sig *= 1.2 # Pequeño empujón heurístico a la geometría sagrada
-                
-                if scan_sig > max_scan_sig:
-                    max_scan_sig = scan_sig
-                    best_new_angle = ang
-            
-            # Registrar Vértice
-            print(f"   ↪️ GIRO CONFIRMADO: Rumbo {current_bearing:.1f}º -> {best_new_angle:.1f}º")
-            path.append({'lat': current_lat, 'lon': current_lon, 'type': 'VERTEX_FOUND', 'step': total_steps})
-            vertices_found += 1
-            
-            # Actualizar estado
-            current_bearing = best_new_angle
-            steps_on_edge = 0
-            # Recalibrar umbral para la nueva arista
-            signal_threshold = max_scan_sig * 0.45 
-            
-            if vertices_found >= 5:
-                print("\n🏆 ¡PENTÁGONO CERRADO! 5 Vértices localizados.")
-                break
-        
-        else:
-            # C) Caminar y Micro-Corregir (Autopilot)
-            best_adj = 0
-            local_max = -1
-            for adj in [-8, -4, 0, 4, 8]:
-                check_sig = get_signal_at(current_lat, current_lon, current_bearing + adj, map_I, map_P, nside)
-                if check_sig > local_max:
-                    local_max = check_sig
-                    best_adj = adj
-            
-            current_bearing += best_adj
-            steps_on_edge += 1
-            
-            # Mover físicamente
-            current_lat, current_lon = move(current_lat, current_lon, current_bearing, STEP_SIZE)
-            path.append({'lat': current_lat, 'lon': current_lon, 'type': 'PATH', 'step': total_steps})
-
-        if total_steps % 100 == 0:
-            print(f"   👣 Paso {total_steps}: Lat {current_lat:.2f}, Lon {current_lon:.2f} (Sig: {sig_ahead:.2e})")
-            
-        total_steps += 1
+    res = SPIDER.run(START_LAT, START_LON, INITIAL_BEARING, map_I, map_P, nside, MAX_STEPS, threshold=signal_threshold)
+    for v in res['vertex_log']:
+        print(f"\n🛑 ARISTA TERMINADA en Paso {v['step']} (Lat {v['lat']:.2f}, Lon {v['lon']:.2f})")
+        print(f"   📉 Señal cayó a {res['ahead'][v['step'], 0]:.2e}. Radar: GIRO {v['bearing_in']:.1f}º -> {v['bearing_out']:.1f}º")
+    if res['closed'][0]:
+        print("\n🏆 ¡PENTÁGONO CERRADO! 5 Vértices localizados.")
+    total_steps = int(res['steps'][0])
+    print(f"   👣 {total_steps} pasos: Lat {res['lat'][total_steps, 0]:.2f}, Lon {res['lon'][total_steps, 0]:.2f}")
 
     # --- ANÁLISIS DE DATOS Y CORRECCIÓN ---
-    df = pd.DataFrame(path)
+    # El paso que cierra el pentágono no entra en el reparto de la corrección
+    total_steps -= int(res['closed'][0])
+    df = pd.DataFrame(SPIDER.path(res))
     
     # 1. Medir el GAP
     last_pt = df.iloc[-1]
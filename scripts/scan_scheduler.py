@@ -0,0 +1,81 @@
+# ==============================================================================
+#  The Geometry of the Echo: PMN-01 Model Source Code
+#  ----------------------------------------------------------------------------
+#  (c) 2025 Pablo Miguel Nieto Muñoz
+#  License: MIT (See LICENSE file for details)
+#
+#  Scientific Citation:
+#  Nieto Muñoz, P. M. (2025). "The Geometry of the Echo: Observational
+#  Confirmation of the Chiral Dodecahedral Universe".
+#  Zenodo.
+# ==============================================================================
+
+"""
+Task scheduler for the pool-based scans.
+
+Masked tasks are dropped before dispatch instead of being shipped to a
+worker that returns nothing. The rest are sorted by estimated cost
+(largest first) and packed into guided chunks: each chunk carries about
+1/(GRANULARITY * n_workers) of the cost still left, so chunks start large
+(little IPC) and shrink towards the end (no worker is left alone with a
+long tail).
+
+Usage:
+    tasks, dropped = prune(tasks, keep=lambda t: abs(lat(t)) >= MIN_LAT)
+    for task in dropped:
+        sink.add(task[0], [])
+    for res in dispatch(pool, work, tasks, n_workers, cost=lambda t: len(t[1])):
+        ...
+"""
+
+import functools
+import numpy as np
+
+GRANULARITY = 4
+
+def prune(tasks, keep):
+    """Splits tasks into (kept, dropped) with the predicate keep(task)."""
+    kept, dropped = [], []
+    for task in tasks:
+        (kept if keep(task) else dropped).append(task)
+    return kept, dropped
+
+def guided_chunks(tasks, n_workers, cost=None, granularity=GRANULARITY):
+    """
+    Tasks sorted by decreasing cost (stable, so equal costs keep their order)
+    and cut into chunks of ~remaining_cost / (granularity * n_workers).
+    cost: callable task -> estimated cost; None treats all tasks as equal.
+    """
+    tasks = list(tasks)
+    if not tasks:
+        return []
+    costs = np.ones(len(tasks)) if cost is None else np.array([float(cost(t)) for t in tasks])
+    order = np.argsort(-costs, kind='stable')
+    parts = max(1, granularity * max(1, n_workers))
+
+    chunks = []
+    remaining = costs.sum()
+    k = 0
+    while k < len(order):
+        target = remaining / parts
+        chunk, chunk_cost = [], 0.0
+        # At least one task per chunk; the last task of a chunk may overshoot the target
+        while k < len(order) and (not chunk or chunk_cost + costs[order[k]] <= target):
+            chunk.append(tasks[order[k]])
+            chunk_cost += costs[order[k]]
+            k += 1
+        chunks.append(chunk)
+        remaining -= chunk_cost
+    return chunks
+
+def _run_chunk(func, chunk):
+    return [func(task) for task in chunk]
+
+def dispatch(pool, func, tasks, n_workers, cost=None, granularity=GRANULARITY):
+    """
+    pool.imap_unordered over guided chunks of `tasks`; yields func(task)
+    results one by one as chunks complete. func must be picklable.
+    """
+    chunks = guided_chunks(tasks, n_workers, cost=cost, granularity=granularity)
+    for results in pool.imap_unordered(functools.partial(_run_chunk, func), chunks):
+        yield from results
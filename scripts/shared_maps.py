@@ -0,0 +1,127 @@
+# ==============================================================================
+#  The Geometry of the Echo: PMN-01 Model Source Code
+#  ----------------------------------------------------------------------------
+#  (c) 2025 Pablo Miguel Nieto Muñoz
+#  License: MIT (See LICENSE file for details)
+#
+#  Scientific Citation:
+#  Nieto Muñoz, P. M. (2025). "The Geometry of the Echo: Observational
+#  Confirmation of the Chiral Dodecahedral Universe".
+#  Zenodo.
+# ==============================================================================
+
+"""
+Zero-copy map sharing for multiprocessing pools.
+
+The parent publishes its arrays once; workers receive a small picklable
+`spec` through the Pool initializer and attach to the same memory, so
+tasks only carry indices. Arrays that already come from the map cache
+(read-only np.memmap of a .npy file) are shared by file path; any other
+array is copied once into multiprocessing.shared_memory. Works with both
+the fork and spawn start methods.
+
+Usage:
+    with SharedMaps({'I': map_I, 'Q': map_Q}) as shared:
+        with Pool(initializer=init_worker, initargs=(shared.spec,)) as pool:
+            ...
+    # in the worker:
+    maps = worker_maps()
+"""
+
+import mmap
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+
+# Worker-side state (filled by init_worker)
+_WORKER_MAPS = {}
+_WORKER_HANDLES = []
+
+def _is_file_backed(arr):
+    """True for an un-sliced np.memmap (e.g. from np.load(mmap_mode='r'))."""
+    return (isinstance(arr, np.memmap) and arr.filename is not None
+            and isinstance(arr.base, mmap.mmap) and arr.flags['C_CONTIGUOUS'])
+
+class SharedMaps:
+    """Owner side: publishes arrays once and unlinks shared memory on close()."""
+
+    def __init__(self, arrays):
+        self.spec = {}
+        self._owned = []
+        try:
+            for name, arr in arrays.items():
+                if _is_file_backed(arr):
+                    self.spec[name] = ('memmap', arr.filename, int(arr.offset), arr.shape, arr.dtype.str)
+                    continue
+                arr = np.ascontiguousarray(arr)
+                shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+                self._owned.append(shm)
+                view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)
+                view[...] = arr
+                del view
+                self.spec[name] = ('shm', shm.name, 0, arr.shape, arr.dtype.str)
+        except BaseException:
+            self.close()
+            raise
+
+    @property
+    def nbytes_shared(self):
+        return sum(shm.size for shm in self._owned)
+
+    def close(self):
+        for shm in self._owned:
+            try:
+                shm.close()
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._owned = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def start_tracker():
+    """
+    Starts the shared-memory resource tracker in this process. Call it before
+    creating a long-lived Pool that will attach SharedMaps published later,
+    so workers inherit the parent's tracker instead of starting their own
+    (which would warn about, and unlink, segments they do not own).
+    """
+    resource_tracker.ensure_running()
+
+def attach(spec):
+    """Returns {name: read-only array} for a spec produced by SharedMaps."""
+    maps = {}
+    for name, (kind, location, offset, shape, dtype) in spec.items():
+        if kind == 'memmap':
+            arr = np.memmap(location, dtype=np.dtype(dtype), mode='r', offset=offset, shape=tuple(shape))
+        else:
+            shm = shared_memory.SharedMemory(name=location)
+            _WORKER_HANDLES.append(shm)
+            arr = np.ndarray(tuple(shape), dtype=np.dtype(dtype), buffer=shm.buf)
+            arr.flags.writeable = False
+        maps[name] = arr
+    return maps
+
+def detach():
+    """Drops this process' attached maps so a long-lived worker can switch to a new spec."""
+    global _WORKER_MAPS
+    _WORKER_MAPS = {}
+    while _WORKER_HANDLES:
+        shm = _WORKER_HANDLES.pop()
+        try:
+            shm.close()
+        except BufferError:
+            # A caller still holds a view; the mapping goes away with it
+            pass
+
+def init_worker(spec):
+    """Pool initializer: attaches the shared maps in this worker process."""
+    global _WORKER_MAPS
+    _WORKER_MAPS = attach(spec)
+
+def worker_maps():
+    """The maps attached by init_worker (empty dict outside a worker)."""
+    return _WORKER_MAPS
@@ -0,0 +1,151 @@
+# ==============================================================================
+#  The Geometry of the Echo: PMN-01 Model Source Code
+#  ----------------------------------------------------------------------------
+#  (c) 2025 Pablo Miguel Nieto Muñoz
+#  License: MIT (See LICENSE file for details)
+#
+#  Scientific Citation:
+#  Nieto Muñoz, P. M. (2025). "The Geometry of the Echo: Observational
+#  Confirmation of the Chiral Dodecahedral Universe".
+#  Zenodo.
+# ==============================================================================
+
+"""
+Precomputed tracker signal maps with a multi-resolution pyramid.
+
+The spider kernels of tracker_engine, evaluated once for every pixel of the
+map and stored in the map cache entry (<entry>/signals/) as float32 .npy:
+
+    abs_ip    |I * P|                       (tracker_engine.abs_ip)
+    std_p     std of I over the 8 neighbours * P  (tracker_engine.std_p)
+
+Below the native NSIDE every level halves NSIDE down to MIN_NSIDE. A coarse
+pixel holds the mean of its 4 children, i.e. the average of the signal over
+its area: single-pixel noise is smoothed out and the walkers can lock onto
+structure at coarse levels, then refine at finer ones. The full-resolution
+level equals the on-the-fly kernel pixel for pixel.
+
+Usage:
+    python scripts/signal_maps.py                  # build every signal and level
+    from signal_maps import load_signal
+    sig_64 = load_signal(INPUT_FILE, 'abs_ip', nside=64)
+    kernel = MapKernel(sig_64)                     # tracker_engine
+"""
+
+import os
+import sys
+import tempfile
+import numpy as np
+import healpy as hp
+from map_cache import CACHE_DIR, ensure_cache, load_maps
+
+INPUT_FILE = 'data/raw/COM_CMB_IQU-sevem_2048_R4.00.fits'
+SIGNALS = ('abs_ip', 'std_p')
+MIN_NSIDE = 64
+SIGNAL_VERSION = 1
+
+# Píxeles por bloque: los temporales (8 vecinos en int64) no pasan de ~64 MB
+_CHUNK = 1 << 20
+
+def _signal_path(entry_dir, signal, nside):
+    return os.path.join(entry_dir, 'signals', f"{signal}_{nside}_v{SIGNAL_VERSION}.npy")
+
+def _write_atomic(path, npix, fill):
+    """Creates a float32 .npy of npix values with fill(out) and publishes it atomically."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.npy')
+    os.close(fd)
+    try:
+        out = np.lib.format.open_memmap(tmp, mode='w+', dtype=np.float32, shape=(npix,))
+        fill(out)
+        out.flush()
+        del out
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+def _fill_native(signal, map_I, map_P, out):
+    """Full-resolution signal, chunked, with the same arithmetic as the kernels."""
+    nside = hp.npix2nside(len(map_I))
+    for s in range(0, len(map_I), _CHUNK):
+        pix = np.arange(s, min(s + _CHUNK, len(map_I)))
+        if signal == 'abs_ip':
+            val_I, val_P = map_I[pix], map_P[pix]
+            val_I = np.where(np.isnan(val_I), 0, val_I)
+            val_P = np.where(np.isnan(val_P), 0, val_P)
+            out[pix] = np.abs(val_I * val_P)
+        else:
+            neighbours = hp.get_all_neighbours(nside, pix)
+            out[pix] = np.std(map_I[neighbours], axis=0) * map_P[pix]
+
+def degrade(fine, out):
+    """RING map at half NSIDE: each pixel is the mean of its 4 (NESTED) children."""
+    nside_c = hp.npix2nside(len(out))
+    nside_f = 2 * nside_c
+    for s in range(0, len(out), _CHUNK):
+        ring_c = np.arange(s, min(s + _CHUNK, len(out)))
+        children = 4 * hp.ring2nest(nside_c, ring_c)[:, None] + np.arange(4)
+        out[ring_c] = fine[hp.nest2ring(nside_f, children)].mean(axis=1, dtype=np.float64)
+
+def levels(nside, min_nside=MIN_NSIDE):
+    """Pyramid NSIDEs from native down to min_nside (halving)."""
+    out = [nside]
+    while out[-1] // 2 >= min_nside:
+        out.append(out[-1] // 2)
+    return out
+
+def build_pyramid(path, signal='abs_ip', min_nside=MIN_NSIDE, cache_dir=CACHE_DIR):
+    """Builds (if missing) every level of `signal`. Returns {nside: file path}."""
+    if signal not in SIGNALS:
+        raise ValueError(f"Unknown tracker signal '{signal}'. Choose from {SIGNALS}.")
+    entry_dir = ensure_cache(path, cache_dir)
+    map_I, map_P = load_maps(path, ('I', 'P'), cache_dir)
+    nside = hp.npix2nside(len(map_I))
+
+    paths = {}
+    fine = None
+    for level in levels(nside, min_nside):
+        target = _signal_path(entry_dir, signal, level)
+        if not os.path.exists(target):
+            print(f"  -> [cache] Building {signal} at NSIDE {level}...")
+            if level == nside:
+                _write_atomic(target, len(map_I), lambda out: _fill_native(signal, map_I, map_P, out))
+            else:
+                _write_atomic(target, hp.nside2npix(level), lambda out: degrade(fine, out))
+        fine = np.load(target, mmap_mode='r')
+        paths[level] = target
+    return paths
+
+def load_signal(path, signal='abs_ip', nside=None, cache_dir=CACHE_DIR):
+    """
+    Read-only float32 memmap (RING) of a tracker signal at `nside`
+    (None = native resolution). Builds the pyramid on first use.
+    """
+    entry_dir = ensure_cache(path, cache_dir)
+    if nside is None:
+        nside = hp.npix2nside(len(load_maps(path, 'I', cache_dir)))
+    target = _signal_path(entry_dir, signal, nside)
+    if not os.path.exists(target):
+        paths = build_pyramid(path, signal, min(nside, MIN_NSIDE), cache_dir)
+        if nside not in paths:
+            raise ValueError(f"NSIDE {nside} is not a pyramid level of {os.path.basename(path)} ({sorted(paths)}).")
+    return np.load(target, mmap_mode='r')
+
+def load_pyramid(path, signal='abs_ip', min_nside=MIN_NSIDE, cache_dir=CACHE_DIR):
+    """All levels of `signal` as {nside: memmap}, coarse to fine."""
+    paths = build_pyramid(path, signal, min_nside, cache_dir)
+    return {level: np.load(paths[level], mmap_mode='r') for level in sorted(paths)}
+
+def main(path=None):
+    path = path or INPUT_FILE
+    print(f"📶 SEÑALES DEL RASTREADOR: {os.path.basename(path)}")
+    if not os.path.exists(path):
+        print(f"❌ ERROR: No encuentro el archivo en {path}")
+        return
+    for signal in SIGNALS:
+        paths = build_pyramid(path, signal)
+        print(f"   ✅ {signal}: NSIDE {', '.join(str(n) for n in sorted(paths, reverse=True))}")
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
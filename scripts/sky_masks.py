@@ -0,0 +1,137 @@
+# ==============================================================================
+#  The Geometry of the Echo: PMN-01 Model Source Code
+#  ----------------------------------------------------------------------------
+#  (c) 2025 Pablo Miguel Nieto Muñoz
+#  License: MIT (See LICENSE file for details)
+#
+#  Scientific Citation:
+#  Nieto Muñoz, P. M. (2025). "The Geometry of the Echo: Observational
+#  Confirmation of the Chiral Dodecahedral Universe".
+#  Zenodo.
+# ==============================================================================
+
+"""
+Sky masks: built once, stored bit-packed, shared by every script.
+
+Masks are boolean RING arrays (True = pixel kept). They are cached under
+<CACHE_DIR>/masks/ as np.packbits files (50M pixels -> 6 MB).
+
+    galactic_cut(nside, 20.0)        |b| > 20 deg, from iso-latitude rings:
+                                     one pix2ang per ring, not per pixel (not
+                                     cached: building it beats reading it)
+    planck_mask(path, nside)         local Planck common-mask FITS, thresholded
+    ud_grade_mask(mask, nside_out)   coarser / finer variant of a mask
+    combine(m1, m2, op='and')        AND / OR of masks (common NSIDE)
+    apodize(mask, fwhm_deg)          float [0, 1] weights, Gaussian-smoothed edge
+
+Usage:
+    from sky_masks import galactic_cut
+    map_comb[~galactic_cut(nside, 20.0)] = 0.0
+"""
+
+import os
+import tempfile
+import numpy as np
+import healpy as hp
+from map_cache import CACHE_DIR, file_digest
+
+MASK_VERSION = 1
+
+def _mask_path(name, cache_dir):
+    return os.path.join(cache_dir, 'masks', f"{name}.npz")
+
+def save_mask(path, mask):
+    """Writes a boolean mask bit-packed (atomic)."""
+    mask = np.asarray(mask, dtype=bool)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.npz')
+    os.close(fd)
+    np.savez(tmp, bits=np.packbits(mask), npix=np.int64(len(mask)), version=np.int64(MASK_VERSION))
+    os.replace(tmp, path)
+
+def read_mask(path):
+    """Boolean mask from a save_mask file."""
+    with np.load(path) as data:
+        return np.unpackbits(data['bits'], count=int(data['npix'])).astype(bool)
+
+def cached_mask(name, build, cache_dir=CACHE_DIR):
+    """Loads mask `name` from the cache, or builds it with build() and stores it."""
+    path = _mask_path(name, cache_dir)
+    if os.path.exists(path):
+        return read_mask(path)
+    mask = np.asarray(build(), dtype=bool)
+    save_mask(path, mask)
+    return mask
+
+def latitude_ranges(nside, min_abs_lat_deg):
+    """
+    [start, stop) RING pixel ranges with |lat| > min_abs_lat_deg.
+    Iso-latitude rings are contiguous in RING order, so the cut is decided
+    once per ring (with hp.pix2ang, as the per-pixel version did).
+    """
+    rings = np.arange(1, 4 * nside)
+    start, n_pix, _, _, _ = hp.ringinfo(nside, rings)
+    theta, _ = hp.pix2ang(nside, start)
+    lat = 90 - np.degrees(theta)
+    keep = np.abs(lat) > min_abs_lat_deg
+
+    # Consecutive kept rings merge into one range
+    edges = np.flatnonzero(np.diff(np.r_[False, keep, False].astype(np.int8)))
+    first, last = edges[0::2], edges[1::2] - 1
+    return [(int(start[a]), int(start[b] + n_pix[b])) for a, b in zip(first, last)]
+
+def galactic_cut(nside, min_abs_lat_deg=20.0):
+    """Keeps |b| > min_abs_lat_deg (map assumed in galactic coordinates)."""
+    mask = np.zeros(hp.nside2npix(nside), dtype=bool)
+    for a, b in latitude_ranges(nside, min_abs_lat_deg):
+        mask[a:b] = True
+    return mask
+
+def ud_grade_mask(mask, nside_out, min_fraction=0.5):
+    """
+    Mask at another NSIDE. Degrading keeps a pixel when at least
+    min_fraction of its sub-pixels are kept (1.0 = all, tiny = any);
+    upgrading just repeats parent pixels.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    nside_in = hp.npix2nside(len(mask))
+    if nside_out == nside_in:
+        return mask
+    frac = hp.ud_grade(mask.astype(np.float32), nside_out, order_in='RING', order_out='RING')
+    if nside_out > nside_in:
+        return frac > 0.5
+    return frac >= min_fraction - 1e-6
+
+def planck_mask(path, nside=None, field=0, hdu=1, threshold=0.5, min_fraction=0.5, cache_dir=CACHE_DIR):
+    """
+    Local Planck-style mask FITS (e.g. COM_Mask_CMB-common-Mask-Int_2048_R3.00.fits):
+    pixels with value > threshold are kept, optionally ud_graded to `nside`.
+    Cached per file content, field, threshold and NSIDE.
+    """
+    def build_native():
+        values = hp.read_map(path, field=field, hdu=hdu, dtype=np.float32)
+        return np.where(values == hp.UNSEEN, 0.0, values) > threshold
+
+    tag = f"{file_digest(path, cache_dir)[:16]}_{hdu}_{field}_{threshold:g}"
+    mask = cached_mask(f"fits_{tag}", build_native, cache_dir)
+    if nside is None or nside == hp.npix2nside(len(mask)):
+        return mask
+    return cached_mask(f"fits_{tag}_{nside}_{min_fraction:g}",
+                       lambda: ud_grade_mask(mask, nside, min_fraction), cache_dir)
+
+def combine(*masks, op='and', min_fraction=0.5):
+    """AND / OR of masks; all are brought to the finest NSIDE given."""
+    if op not in ('and', 'or'):
+        raise ValueError(f"Unknown mask operation '{op}'. Choose 'and' or 'or'.")
+    nside = max(hp.npix2nside(len(m)) for m in masks)
+    masks = [ud_grade_mask(m, nside, min_fraction) for m in masks]
+    reduce = np.logical_and.reduce if op == 'and' else np.logical_or.reduce
+    return reduce(masks)
+
+def apodize(mask, fwhm_deg):
+    """
+    Float32 weights in [0, 1]: the mask smoothed with a Gaussian beam of
+    fwhm_deg, so edges roll off instead of cutting sharply.
+    """
+    smooth = hp.smoothing(np.asarray(mask, dtype=np.float64), fwhm=np.radians(fwhm_deg))
+    return np.clip(smooth, 0.0, 1.0).astype(np.float32)
@@ -0,0 +1,205 @@
+# ==============================================================================
+#  The Geometry of the Echo: PMN-01 Model Source Code
+#  ----------------------------------------------------------------------------
+#  (c) 2025 Pablo Miguel Nieto Muñoz
+#  License: MIT (See LICENSE file for details)
+#
+#  Scientific Citation:
+#  Nieto Muñoz, P. M. (2025). "The Geometry of the Echo: Observational
+#  Confirmation of the Chiral Dodecahedral Universe".
+#  Zenodo.
+# ==============================================================================
+
+"""
+Ensemble spider: the Sabueso V8/V9 walker run for thousands of seeds and
+parameter sets at once.
+
+The walkers are one tracker_engine.Spider run: their state (lat, lon,
+bearing, threshold, step counters, vertex count) lives in arrays and all
+of them advance in lockstep, with one batched probe per step for all
+look-ahead/autopilot directions and one for the radar sweeps of the
+walkers that are turning. Walkers that close the pentagon or run out of
+steps are masked out.
+
+A walker with the nominal seed and parameters (seed 0 of the nominal set)
+retraces sabueso_v8_final.py: same steps and vertices, positions equal
+to rounding.
+
+SIGNAL_NSIDE switches the walkers to a level of the cached signal pyramid
+(signal_maps.py) instead of the native |I*P|, SIGNAL_RIDGE to the ridge
+strength of ridge_maps.py.
+
+Outputs (data/processed/):
+    spider_ensemble_walkers.csv    one row per walker: seed, parameters,
+                                   closure, gap (end - start, as in V9)
+    spider_ensemble_vertices.csv   vertices found by each walker
+    spider_ensemble_summary.csv    closure statistics per parameter set
+    spider_ensemble_tracks.npz     tracks, float32 (step, walker), NaN after the end
+"""
+
+import itertools
+import numpy as np
+import pandas as pd
+import healpy as hp
+import os
+from map_cache import load_maps
+from phase_profile import start_run, phase
+from signal_maps import load_signal
+from ridge_maps import load_ridge
+from tracker_engine import Spider, Autopilot, Radar, MapKernel, destinations
+
+# --- CONFIGURACIÓN DE MISIÓN ---
+INPUT_FILE = 'data/raw/COM_CMB_IQU-sevem_2048_R4.00.fits'
+OUTPUT_FILE = 'data/processed/spider_ensemble_walkers.csv'
+VERTICES_FILE = 'data/processed/spider_ensemble_vertices.csv'
+SUMMARY_FILE = 'data/processed/spider_ensemble_summary.csv'
+TRACKS_FILE = 'data/processed/spider_ensemble_tracks.npz'
+
+# Semilla nominal (Vértice 647, rumbo hacia la Rama 3)
+START_LAT, START_LON = -41.81, 354.38
+INITIAL_BEARING = 204.3
+MAX_STEPS = 1500
+
+# Rejilla de parámetros: cada combinación recibe N_SEEDS semillas
+STEP_SIZES = [0.1, 0.2, 0.3]            # Resolución de paso (grados)
+THRESHOLD_FACTORS = [0.35, 0.45, 0.55]  # Umbral de corte = factor * señal de la arista
+ADJ_STEPS = [2, 4, 6]                   # Autopilot: correcciones de -2, -1, 0, +1, +2 veces esto
+
+# Semillas: la primera de cada combinación es la nominal, el resto con ruido
+N_SEEDS = 64
+SEED_JITTER_DEG = 0.5       # Dispersión de la posición de salida
+BEARING_JITTER_DEG = 5.0    # Dispersión del rumbo inicial
+RANDOM_SEED = 647
+
+# Reglas del Sabueso V8 (iguales para todos los caminantes)
+PROBE_DIST = 0.5            # Distancia de sondeo (grados)
+MIN_EDGE_STEPS = 20         # Pasos mínimos sobre la arista antes de aceptar un corte
+RADAR_ANGLES = np.arange(0, 360, 5)
+REVERSE_EXCLUSION = 45      # No volver hacia atrás (+/- grados)
+TURN_BONUS = (60, 85, 1.2)  # Giros cercanos a 72º (Dodecaedro) pesan x1.2
+N_VERTICES = 5              # Pentágono cerrado
+
+AUTOPILOT_UNITS = np.array([-2, -1, 0, 1, 2])
+
+# Señal: None = |I*P| al vuelo a resolución nativa; 64..1024 = nivel de la pirámide
+# de signal_maps.py (señal promediada por área, más suave para enganchar la estructura)
+SIGNAL_NSIDE = None
+# 'I' | 'P' | 'IP': seguir la fuerza de cresta de ese campo (ridge_maps.py) en vez
+# de |I*P|; tiene prioridad sobre SIGNAL_NSIDE
+SIGNAL_RIDGE = None
+
+def make_ensemble(rng):
+    """Seeds x parameter grid as flat arrays (one entry per walker)."""
+    grid = list(itertools.product(STEP_SIZES, THRESHOLD_FACTORS, ADJ_STEPS))
+    n = len(grid) * N_SEEDS
+    params = np.repeat(np.array(grid, dtype=np.float64), N_SEEDS, axis=0)
+
+    # Desplazamiento aleatorio (rumbo uniforme, distancia gaussiana), salvo la semilla nominal
+    offset_dist = np.abs(rng.normal(0.0, SEED_JITTER_DEG, n))
+    offset_ang = rng.uniform(0.0, 360.0, n)
+    bearing = INITIAL_BEARING + rng.normal(0.0, BEARING_JITTER_DEG, n)
+    nominal = np.arange(n) % N_SEEDS == 0
+    offset_dist[nominal] = 0.0
+    bearing[nominal] = INITIAL_BEARING
+
+    lat_r, lon_r = destinations(START_LAT, START_LON, offset_ang, offset_dist)
+    lat = np.where(nominal, START_LAT, np.degrees(lat_r))
+    lon = np.where(nominal, START_LON, np.degrees(lon_r))
+    return {'seed_lat': lat, 'seed_lon': lon, 'seed_bearing': bearing,
+            'step_size': params[:, 0], 'threshold_factor': params[:, 1], 'adj_step': params[:, 2]}
+
+def ensemble_spider(walkers, kernel='abs_ip'):
+    """Sabueso V8 rules with per-walker step size, threshold factor and autopilot spread."""
+    return Spider(kernel=kernel, step_size=walkers['step_size'], look_ahead=PROBE_DIST,
+                  autopilot=Autopilot(walkers['adj_step'][:, None] * AUTOPILOT_UNITS[None, :], dist=PROBE_DIST),
+                  radar=Radar(RADAR_ANGLES, dist=PROBE_DIST, exclusion=REVERSE_EXCLUSION, bonus=TURN_BONUS),
+                  threshold_factor=walkers['threshold_factor'], min_edge_steps=MIN_EDGE_STEPS,
+                  max_vertices=N_VERTICES)
+
+def walker_table(walkers, res):
+    """One row per walker: parameters, closure and gap (end - start)."""
+    df = pd.DataFrame(walkers)
+    df.insert(0, 'walker', np.arange(len(df)))
+    last = res['steps']
+    cols = np.arange(len(df))
+    df['closed'] = res['closed']
+    df['vertices'] = res['vertices']
+    df['steps'] = last
+    df['end_lat'] = res['lat'][last, cols]
+    df['end_lon'] = res['lon'][last, cols]
+    df['end_bearing'] = res['bearing'][last, cols]
+    df['gap_lat'] = df['end_lat'] - df['seed_lat']
+    df['gap_lon'] = df['end_lon'] - df['seed_lon']
+    df['closure_deg'] = np.degrees(hp.rotator.angdist(
+        [df['seed_lon'].values, df['seed_lat'].values],
+        [df['end_lon'].values, df['end_lat'].values], lonlat=True))
+
+    # Centro geométrico: media de los vértices (incluido el de salida, como V8)
+    v = pd.DataFrame(res['vertex_log'], columns=['walker', 'vertex', 'step', 'lat', 'lon',
+                                                 'bearing_in', 'bearing_out', 'signal'])
+    sums = v.groupby('walker')[['lat', 'lon']].sum().reindex(df['walker'], fill_value=0.0)
+    df['center_lat'] = (sums['lat'].values + df['seed_lat']) / (df['vertices'] + 1)
+    df['center_lon'] = (sums['lon'].values + df['seed_lon']) / (df['vertices'] + 1)
+    return df, v
+
+def closure_summary(df):
+    """Closure statistics per parameter set."""
+    g = df.groupby(['step_size', 'threshold_factor', 'adj_step'])
+    closed = df[df['closed']].groupby(['step_size', 'threshold_factor', 'adj_step'])
+    out = pd.DataFrame({
+        'walkers': g.size(),
+        'closed_frac': g['closed'].mean(),
+        'mean_vertices': g['vertices'].mean(),
+        'mean_steps': g['steps'].mean(),
+        'gap_lon_mean': closed['gap_lon'].mean(),
+        'gap_lon_std': closed['gap_lon'].std(),
+        'gap_lat_mean': closed['gap_lat'].mean(),
+        'closure_deg_median': closed['closure_deg'].median(),
+    })
+    return out.reset_index()
+
+def main():
+    print("🕷️🕷️🕷️ SABUESO ENSEMBLE: RASTREO EN PARALELO")
+    if not os.path.exists(INPUT_FILE):
+        print(f"❌ ERROR: No encuentro el archivo en {INPUT_FILE}")
+        return
+    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
+    start_run(OUTPUT_FILE)
+
+    print("   ⏳ Cargando mapas Planck (I, P)...")
+    with phase('load_maps'):
+        map_I, map_P = load_maps(INPUT_FILE, ('I', 'P'))
+    nside = hp.get_nside(map_I)
+    kernel = 'abs_ip'
+    if SIGNAL_RIDGE is not None:
+        print(f"   〰️ Fuerza de cresta de {SIGNAL_RIDGE} (ridge_maps)")
+        with phase('load_signal'):
+            kernel = MapKernel(load_ridge(INPUT_FILE, SIGNAL_RIDGE))
+    elif SIGNAL_NSIDE is not None:
+        print(f"   📶 Señal precalculada |I*P| a NSIDE {SIGNAL_NSIDE}")
+        with phase('load_signal'):
+            kernel = MapKernel(load_signal(INPUT_FILE, 'abs_ip', nside=SIGNAL_NSIDE))
+
+    walkers = make_ensemble(np.random.default_rng(RANDOM_SEED))
+    n = len(walkers['seed_lat'])
+    print(f"   🚀 {n} caminantes ({n // N_SEEDS} combinaciones x {N_SEEDS} semillas), {MAX_STEPS} pasos máx.")
+    with phase('track', tasks=n):
+        res = ensemble_spider(walkers, kernel).run(walkers['seed_lat'], walkers['seed_lon'], walkers['seed_bearing'],
+                                                   map_I, map_P, nside, MAX_STEPS)
+
+    with phase('save'):
+        df, v = walker_table(walkers, res)
+        summary = closure_summary(df)
+        df.to_csv(OUTPUT_FILE, index=False)
+        v.to_csv(VERTICES_FILE, index=False)
+        summary.to_csv(SUMMARY_FILE, index=False)
+        used = int(res['steps'].max()) + 1
+        np.savez_compressed(TRACKS_FILE, lat=res['lat'][:used].astype(np.float32),
+                            lon=res['lon'][:used].astype(np.float32))
+
+    print(f"\n📊 Pentágonos cerrados: {df['closed'].sum()}/{n} ({df['closed'].mean():.1%})")
+    print(summary.to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+    print(f"\n💾 Datos guardados en: {OUTPUT_FILE}, {VERTICES_FILE}, {SUMMARY_FILE}, {TRACKS_FILE}")
+
+if __name__ == "__main__":
+    main()
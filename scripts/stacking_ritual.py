@@ -15,6 +15,8 @@ import healpy as hp
 import matplotlib.pyplot as plt
 from scipy.spatial.transform import Rotation as R
 from scipy.ndimage import rotate
+from map_cache import load_maps
+from sky_masks import galactic_cut
 
 # --- CONFIGURACIÓN ---
 INPUT_FILE = 'data/raw/COM_CMB_IQU-sevem_2048_R4.00.fits'
@@ -52,10 +54,9 @@ def main():
     
     # 1. Cargar Mapas
     print("   ... Cargando mapa ...")
-    maps = hp.read_map(INPUT_FILE, field=[0,1,2], verbose=False)
-    # Combinar I, Q, U
-    map_comb = maps[0] * np.sqrt(maps[1]**2 + maps[2]**2)
-    nside = hp.get_nside(maps[0])
+    # Combinar I, Q, U (I*P precalculado en la caché)
+    map_comb = load_maps(INPUT_FILE, 'IP')
+    nside = hp.get_nside(map_comb)
     
     # --- MÁSCARA GALÁCTICA ---
     print("   ... Aplicando escudo anti-galáctico ...")
@@ -63,13 +64,10 @@ def main():
     # En coordenadas galácticas, el ecuador es lat=0.
     # El mapa ya viene en coordenadas galácticas usualmente.
     
-    # Convertir índices de píxel a coordenadas para ver dónde está cada uno
-    theta, phi = hp.pix2ang(nside, np.arange(hp.nside2npix(nside)))
-    lat_gal = 90 - np.degrees(theta)
-    
     # Definir zona de exclusión (La Vía Láctea es ruidosa)
     # Enmascaramos todo lo que esté entre -20 y +20 grados de latitud
-    galactic_mask = (np.abs(lat_gal) > 20.0) 
+    # (por anillos de latitud: sin pix2ang sobre los 50M píxeles)
+    galactic_mask = galactic_cut(nside, 20.0)
     
     # Aplicar máscara (ponemos a 0 o NaN lo sucio)
     map_clean = map_comb.copy()
@@ -0,0 +1,81 @@
+# ==============================================================================
+#  The Geometry of the Echo: PMN-01 Model Source Code
+#  ----------------------------------------------------------------------------
+#  (c) 2025 Pablo Miguel Nieto Muñoz
+#  License: MIT (See LICENSE file for details)
+#
+#  Scientific Citation:
+#  Nieto Muñoz, P. M. (2025). "The Geometry of the Echo: Observational
+#  Confirmation of the Chiral Dodecahedral Universe".
+#  Zenodo.
+# ==============================================================================
+
+"""
+Deterministic synthetic I/Q/U skies written as Planck-style FITS.
+
+hp.synfast draws a Gaussian sky from a smooth CMB-like spectrum with a
+fixed seed, so the same (nside, seed) always gives the same file. Both
+layouts read by planck_io are supported:
+
+    'combined': one BINTABLE with I_STOKES, Q_STOKES, U_STOKES (PR3 style)
+    'split':    HDU 1 with I_STOKES, HDU 2 with Q_STOKES, U_STOKES (PR4 style)
+
+Usage:
+    from synthetic_sky import make_sky, write_sky
+    write_sky('sky_256_split.fits', make_sky(256), layout='split')
+"""
+
+import numpy as np
+import healpy as hp
+from astropy.io import fits
+
+DEFAULT_SEED = 2048
+LAYOUTS = ('combined', 'split')
+
+def synthetic_cls(lmax):
+    """TT, EE, BB, TE (healpy `new` order) in K_CMB^2: flat D_l with a 5' damping tail."""
+    ell = np.arange(lmax + 1, dtype=np.float64)
+    tt = np.zeros(lmax + 1)
+    d_ell = 1.0e-9 * np.exp(-ell * (ell + 1) * np.radians(5.0 / 60.0) ** 2)
+    tt[2:] = 2.0 * np.pi * d_ell[2:] / (ell[2:] * (ell[2:] + 1))
+    ee = 0.02 * tt
+    bb = 0.001 * tt
+    te = 0.3 * np.sqrt(tt * ee)
+    return [tt, ee, bb, te]
+
+def make_sky(nside, seed=DEFAULT_SEED):
+    """(3, npix) float32 I, Q, U maps in RING ordering."""
+    lmax = 3 * nside - 1
+    # hp.synfast draws from numpy's global generator
+    np.random.seed(seed)
+    maps = hp.synfast(synthetic_cls(lmax), nside, lmax=lmax, new=True, pol=True)
+    return maps.astype(np.float32)
+
+def _map_hdu(names, arrays, nside):
+    npix = len(arrays[0])
+    repeat = min(1024, npix)
+    cols = [fits.Column(name=name, format=f'{repeat}E', unit='K_CMB',
+                        array=arr.reshape(-1, repeat))
+            for name, arr in zip(names, arrays)]
+    hdu = fits.BinTableHDU.from_columns(cols)
+    hdu.header['PIXTYPE'] = 'HEALPIX'
+    hdu.header['ORDERING'] = 'RING'
+    hdu.header['NSIDE'] = nside
+    hdu.header['INDXSCHM'] = 'IMPLICIT'
+    hdu.header['FIRSTPIX'] = 0
+    hdu.header['LASTPIX'] = npix - 1
+    hdu.header['OBJECT'] = 'FULLSKY'
+    return hdu
+
+def write_sky(path, maps, layout='combined'):
+    """Writes (I, Q, U) as a combined or split-HDU FITS file."""
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout '{layout}'. Choose from {LAYOUTS}.")
+    maps = [np.asarray(m, dtype=np.float32) for m in maps]
+    nside = hp.npix2nside(len(maps[0]))
+    if layout == 'combined':
+        tables = [_map_hdu(('I_STOKES', 'Q_STOKES', 'U_STOKES'), maps, nside)]
+    else:
+        tables = [_map_hdu(('I_STOKES',), maps[:1], nside),
+                  _map_hdu(('Q_STOKES', 'U_STOKES'), maps[1:], nside)]
+    fits.HDUList([fits.PrimaryHDU()] + tables).writeto(path, overwrite=True)
@@ -16,6 +16,13 @@ import pandas as pd
 from scipy.stats import pearsonr
 import sys
 from multiprocessing import Pool, cpu_count
+from planck_io import read_region, map_nside
+from shared_maps import SharedMaps, init_worker, worker_maps
+from result_sink import ResultSink, parts_dir, run_key, top_records, write_csv
+from phase_profile import start_run, phase, timed_task
+from line_engine import LineProbe, AngularBins
+from scan_scheduler import dispatch
+from ridge_maps import load_ridge, ridge_prune
 
 # --- CONFIGURACIÓN "MODO MICROSCOPIO" ---
 INPUT_FILE = 'data/raw/COM_CMB_IQU-sevem_2048_R4.00.fits'
@@ -44,6 +51,40 @@ LINE_LENGTHS = [4.0, 8.0]
 # Lo mantenemos bajo para ver hasta los "ecos" más débiles
 CORR_THRESHOLD = 0.08  
 
+# Pertenencia a la línea: 'vector' = un query_disc por centro y test de rotación
+# vectorizado para todos los ángulos y largos (mismos píxeles); 'polygon' = un
+# hp.query_polygon por ángulo y largo (ruta original); 'binned' = estadísticos
+# suficientes por (sector, distancia) acumulados una vez por centro: cada
+# (ángulo, largo) cuesta O(1), así que ANGLE_STEP < 1º y muchos largos salen
+# casi gratis (bordes de la línea aproximados)
+LINE_ENGINE = 'vector'
+
+# Prefiltro de crestas (ridge_maps.py): solo se analizan los puntos con una cresta
+# a menos de LINE_WIDTH por encima de este percentil de la zona. None = todos
+RIDGE_FIELD = 'IP'
+RIDGE_PERCENTILE = None
+
+# Resultados: 'threshold' = la mejor línea de cada punto si |corr| > CORR_THRESHOLD;
+# 'topk' = sin umbral, solo las TOP_K mejores de la zona más las TOP_K_REGION
+# mejores de cada región (píxel NSIDE REGION_NSIDE): CSV acotado sea cual sea
+# el umbral o ANGLE_STEP
+RESULT_MODE = 'threshold'
+TOP_K = 500
+TOP_K_REGION = 20
+REGION_NSIDE = 16
+
+def min_corr():
+    """Umbral efectivo: en modo 'topk' entra todo y decide el ranking."""
+    return CORR_THRESHOLD if RESULT_MODE == 'threshold' else 0.0
+
+def abs_corr(rec):
+    return abs(rec['corr_IP'])
+
+def region_of(rec):
+    """Región (píxel NSIDE REGION_NSIDE, RING) del punto de la red que originó la línea."""
+    theta, phi = hp.pix2ang(NSIDE_TRACE, int(rec['center_idx']))
+    return int(hp.ang2pix(REGION_NSIDE, theta, phi))
+
 def get_rotated_rect_pixels(nside, center_vec, length_deg, width_deg, angle_deg):
     z_axis = center_vec / np.linalg.norm(center_vec)
     aux = np.array([0, 0, 1]) if abs(z_axis[2]) < 0.9 else np.array([0, 1, 0])
@@ -68,21 +109,40 @@ def get_rotated_rect_pixels(nside, center_vec, length_deg, width_deg, angle_deg)
         
     return hp.query_polygon(nside, np.array(sphere_vertices))
 
+@timed_task
 def process_point(args):
-    idx, center_vec, map_I, map_Q, map_U, nside = args
+    idx, center_vec, nside = args
+    # La región vive en memoria compartida: la tarea solo lleva el centro
+    maps = worker_maps()
+    region_pix, map_I, map_Q, map_U = maps['pix'], maps['I'], maps['Q'], maps['U']
     best_corr = 0
     best_line = None
     
+    if LINE_ENGINE == 'binned':
+        return idx, binned_best_line(idx, center_vec, nside, region_pix, map_I, map_Q, map_U)
+
+    angles = range(0, 180, ANGLE_STEP)
+    if LINE_ENGINE == 'vector':
+        # Un disco para el largo máximo; valores leídos una vez, cada (ángulo, largo) es una máscara
+        probe = LineProbe(nside, center_vec, max(LINE_LENGTHS), LINE_WIDTH)
+        loc = np.searchsorted(region_pix, probe.pixels)
+        disc_I = map_I[loc]
+        disc_P = np.sqrt(map_Q[loc]**2 + map_U[loc]**2)
+        members = {length: probe.line_indices(angles, length, LINE_WIDTH) for length in LINE_LENGTHS}
+
     # BARRIDO COMPLETO DE ÁNGULOS (GRADO A GRADO)
-    for angle in range(0, 180, ANGLE_STEP):
+    for k, angle in enumerate(angles):
         for length in LINE_LENGTHS:
-            pixels = get_rotated_rect_pixels(nside, center_vec, length, LINE_WIDTH, angle)
-            if len(pixels) < 20: continue 
-            
-            vals_I = map_I[pixels]
-            vals_Q = map_Q[pixels]
-            vals_U = map_U[pixels]
-            vals_P = np.sqrt(vals_Q**2 + vals_U**2)
+            if LINE_ENGINE == 'vector':
+                vals_I = disc_I[members[length][k]]
+                vals_P = disc_P[members[length][k]]
+            else:
+                pixels = get_rotated_rect_pixels(nside, center_vec, length, LINE_WIDTH, angle)
+                # Los mapas solo cubren la región: índice global -> posición local
+                loc = np.searchsorted(region_pix, pixels)
+                vals_I = map_I[loc]
+                vals_P = np.sqrt(map_Q[loc]**2 + map_U[loc]**2)
+            if len(vals_I) < 20: continue 
             
             if len(vals_I) > 2 and np.std(vals_I) > 1e-6 and np.std(vals_P) > 1e-6:
                 corr, _ = pearsonr(vals_I, vals_P)
@@ -97,33 +157,51 @@ def process_point(args):
                         'corr_IP': corr
                     }
     
-    if best_line and abs(best_corr) > CORR_THRESHOLD:
-        return best_line
-    return None
+    if best_line and abs(best_corr) > min_corr():
+        return idx, best_line
+    return idx, None
+
+def binned_best_line(idx, center_vec, nside, region_pix, map_I, map_Q, map_U):
+    """Modo 'binned': mejor (ángulo, largo) del centro a partir de los estadísticos por sector."""
+    probe = LineProbe(nside, center_vec, max(LINE_LENGTHS), LINE_WIDTH)
+    loc = np.searchsorted(region_pix, probe.pixels)
+    disc_I = map_I[loc]
+    disc_P = np.sqrt(map_Q[loc]**2 + map_U[loc]**2)
+    bins = AngularBins(probe, disc_I, disc_P, LINE_WIDTH, max(LINE_LENGTHS),
+                       n_sectors=int(round(180.0 / ANGLE_STEP)))
+
+    # (ángulo, largo) en el mismo orden que el barrido exacto: a igualdad gana el primero
+    stats = [bins.stats(length) for length in LINE_LENGTHS]
+    corr = np.stack([st['corr'] for st in stats], axis=1)
+    valid = np.stack([(st['n'] >= 20) & (st['std_I'] > 1e-6) & (st['std_P'] > 1e-6) for st in stats], axis=1)
+    score = np.where(valid, np.abs(corr), -1.0).ravel()
+    best = int(np.argmax(score))
+    if score[best] <= min_corr():
+        return None
+    k, m = divmod(best, len(LINE_LENGTHS))
+    return {'center_idx': idx, 'angle': float(bins.angles[k]),
+            'length': LINE_LENGTHS[m], 'corr_IP': float(corr[k, m])}
 
 def main():
     print(f"--- RASTREO DE ALTA RESOLUCIÓN (MICRO-GRID) ---")
     print(f"Objetivo: Lat {TARGET_LAT}, Lon {TARGET_LON} | NSIDE: {NSIDE_TRACE} | Angle Step: {ANGLE_STEP}º")
     
-    # 1. Cargar Datos
-    print("Cargando mapas...")
+    # 1. Definir Zona de Operaciones
+    theta_rad = np.radians(90.0 - TARGET_LAT)
+    phi_rad = np.radians(TARGET_LON)
+    target_vec = hp.ang2vec(theta_rad, phi_rad)
+
+    # 2. Cargar Datos (solo el disco que pueden tocar las líneas)
+    start_run(OUTPUT_FILE)
+    region_radius = np.radians(ROI_RADIUS + max(LINE_LENGTHS) / 2.0 + LINE_WIDTH)
+    print(f"Cargando mapas (región de {np.degrees(region_radius):.1f}º)...")
     try:
-        maps = hp.read_map(INPUT_FILE, field=None, hdu=1, verbose=False, memmap=True)
-        if len(maps) == 1 or maps.ndim == 1:
-            map_I = maps
-            maps_pol = hp.read_map(INPUT_FILE, field=None, hdu=2, verbose=False, memmap=True)
-            map_Q, map_U = maps_pol[0], maps_pol[1]
-        else:
-            map_I, map_Q, map_U = maps[0], maps[1], maps[2]
+        with phase('load_region'):
+            region_pix, map_I, map_Q, map_U = read_region(INPUT_FILE, target_vec, region_radius, inclusive=True)
     except Exception as e:
         print(f"Error: {e}")
         sys.exit(1)
-    nside_map = hp.get_nside(map_I)
-
-    # 2. Definir Zona de Operaciones
-    theta_rad = np.radians(90.0 - TARGET_LAT)
-    phi_rad = np.radians(TARGET_LON)
-    target_vec = hp.ang2vec(theta_rad, phi_rad)
+    nside_map = map_nside(INPUT_FILE)
     
     roi_pixels = hp.query_disc(NSIDE_TRACE, target_vec, np.radians(ROI_RADIUS))
     roi_vectors = [hp.pix2vec(NSIDE_TRACE, p) for p in roi_pixels]
@@ -131,26 +209,53 @@ def main():
     print(f"Analizando {len(roi_vectors)} puntos de la red local...")
 
     # 3. Ejecutar Rastreo Paralelo
-    tasks = [(roi_pixels[i], vec, map_I, map_Q, map_U, nside_map) for i, vec in enumerate(roi_vectors)]
+    # Checkpoint por píxel de la red NSIDE_TRACE: al reanudar solo quedan los pendientes
+    sink = ResultSink(parts_dir(OUTPUT_FILE), hp.nside2npix(NSIDE_TRACE),
+                      run_key(INPUT_FILE, lat=TARGET_LAT, lon=TARGET_LON, roi=ROI_RADIUS,
+                              nside_trace=NSIDE_TRACE, angle_step=ANGLE_STEP, width=LINE_WIDTH,
+                              lengths=LINE_LENGTHS, threshold=CORR_THRESHOLD, engine=LINE_ENGINE,
+                              mode=RESULT_MODE, ridge=(RIDGE_FIELD, RIDGE_PERCENTILE)))
+    candidates = [(roi_pixels[i], vec, nside_map) for i, vec in enumerate(roi_vectors)]
+    flat = []
+    if RIDGE_PERCENTILE is not None:
+        # Puntos sin pared: se apuntan como hechos y vacíos. El corte se calcula sobre
+        # toda la zona, así no depende de si la ejecución se interrumpió
+        with phase('ridge_filter'):
+            candidates, flat = ridge_prune(candidates, load_ridge(INPUT_FILE, RIDGE_FIELD),
+                                           RIDGE_PERCENTILE, LINE_WIDTH)
+    tasks, flat = sink.pending(candidates), sink.pending(flat)
+    n_done = sink.n_done
+    for idx, _, _ in flat:
+        sink.add(idx, None)
     
-    traces = []
-    print("Iniciando barrido angular grado a grado...")
+    detected = 0
+    print(f"Iniciando barrido angular grado a grado... ({n_done} puntos ya hechos, {len(flat)} sin cresta)")
     
-    with Pool(processes=cpu_count()) as pool:
-        # Usamos chunksize pequeño para actualizar más a menudo
-        for i, res in enumerate(pool.imap_unordered(process_point, tasks, chunksize=5)):
-            if res:
-                traces.append(res)
-            if i % 100 == 0:
-                sys.stdout.write(f"\rProgreso: {i}/{len(roi_vectors)} puntos analizados. Detectados: {len(traces)}")
-                sys.stdout.flush()
+    shared_region = {'pix': region_pix, 'I': map_I, 'Q': map_Q, 'U': map_U}
+    with SharedMaps(shared_region) as shared:
+        with phase('scan', tasks=len(tasks), processes=cpu_count()) as ph, \
+             Pool(processes=cpu_count(), initializer=init_worker, initargs=(shared.spec,)) as pool:
+            # Trozos menguantes: grandes al principio, de uno en uno al final (sin rezagados)
+            for i, (idx, res) in enumerate(ph.track(dispatch(pool, process_point, tasks, cpu_count()))):
+                sink.add(idx, res)
+                detected += res is not None
+                if i % 100 == 0:
+                    sys.stdout.write(f"\rProgreso: {i}/{len(tasks)} puntos analizados. Detectados: {detected}")
+                    sys.stdout.flush()
+    sink.close()
                 
     # 4. Guardar Resultados
     print("\n")
-    if traces:
-        df = pd.DataFrame(traces)
-        df.to_csv(OUTPUT_FILE, index=False)
-        print(f"¡HECHO! Se han cartografiado {len(df)} segmentos de fractura.")
+    with phase('save'):
+        if RESULT_MODE == 'topk':
+            # Una línea por punto: basta con fusionar en streaming global + por región
+            best = top_records(sink.iter_records(), abs_corr, TOP_K, region=region_of, k_region=TOP_K_REGION)
+            best = [dict(rec, region=region_of(rec)) for rec in best]
+            rows = write_csv(OUTPUT_FILE, [pd.DataFrame(best)] if best else [])
+        else:
+            rows = sink.write_csv(OUTPUT_FILE)
+    if rows:
+        print(f"¡HECHO! Se han cartografiado {rows} segmentos de fractura.")
         print(f"Datos en: {OUTPUT_FILE}")
     else:
         print("Resultado vacío. La zona parece limpia de correlaciones lineales > 0.08.")
@@ -0,0 +1,345 @@
+# ==============================================================================
+#  The Geometry of the Echo: PMN-01 Model Source Code
+#  ----------------------------------------------------------------------------
+#  (c) 2025 Pablo Miguel Nieto Muñoz
+#  License: MIT (See LICENSE file for details)
+#
+#  Scientific Citation:
+#  Nieto Muñoz, P. M. (2025). "The Geometry of the Echo: Observational
+#  Confirmation of the Chiral Dodecahedral Universe".
+#  Zenodo.
+# ==============================================================================
+
+"""
+Tracker engine for the spider family (sabueso / hydra / cosmic ruler).
+
+Every candidate direction of a radar sweep or an autopilot correction is
+evaluated in one go: one vectorized great-circle destination for all
+bearings/distances and one kernel call (one hp.ang2pix), instead of one
+Python round-trip per direction. bearings_deg and dist_deg broadcast, so
+a (n_ang, 1) bearing column and a (n_dist,) row give the whole grid:
+
+    sig = probe_signal(lat, lon, np.arange(0, 360, 5), 0.5, map_I, map_P, nside)
+
+Walkers are a Spider configuration run over arrays of seeds in lockstep:
+
+    kernel     signal at a position: 'abs_ip' (|I*P|, nearest pixel),
+               'abs_ip_interp' (bilinear) or 'std_p' (std of the 8
+               neighbours of I times P, as in cosmic_ruler.py), or
+               MapKernel(map) over a precomputed signal_maps level
+    autopilot  Autopilot(offsets, dist): best of bearing + offsets
+    radar      Radar(angles, dist, exclusion, ...): absolute sweep used
+               to turn when the look-ahead signal drops below threshold
+
+    spider = Spider(step_size=0.2, autopilot=Autopilot([-8, -4, 0, 4, 8]),
+                    radar=Radar(np.arange(0, 360, 5), bonus=(60, 85, 1.2)))
+    res = spider.run(lat0, lon0, bearing0, map_I, map_P, nside, max_steps=1500)
+    path = spider.path(res)
+
+Per step, all active walkers share one probe (look-ahead + autopilot
+candidates) and the turning ones one radar probe; per-walker parameters
+(step_size, threshold_factor, autopilot offsets) may be arrays.
+"""
+
+import numpy as np
+import healpy as hp
+
+PROBE_DIST = 0.5  # Distancia de sondeo por defecto (grados)
+
+def destinations(lat, lon, bearings_deg, dist_deg):
+    """
+    Great-circle destinations from (lat, lon) in degrees, same formula as
+    the trackers' move(). Returns (lat_rad, lon_rad) arrays; a distance of
+    0 returns the start point itself.
+    """
+    lat_r, lon_r = np.radians(lat), np.radians(lon)
+    ang_r = np.radians(np.asarray(bearings_deg, dtype=np.float64))
+    dist_r = np.radians(np.asarray(dist_deg, dtype=np.float64))
+    new_lat_r = np.arcsin(np.sin(lat_r)*np.cos(dist_r) + np.cos(lat_r)*np.sin(dist_r)*np.cos(ang_r))
+    new_lon_r = lon_r + np.arctan2(np.sin(ang_r)*np.sin(dist_r)*np.cos(lat_r), np.cos(dist_r)-np.sin(lat_r)*np.sin(new_lat_r))
+    if np.any(dist_r == 0):
+        new_lat_r = np.where(dist_r == 0, lat_r, new_lat_r)
+        new_lon_r = np.where(dist_r == 0, lon_r, new_lon_r)
+    return new_lat_r, new_lon_r
+
+def move(lat, lon, bearing_deg, dist_deg):
+    """Moves along the sphere; (lat, lon) in degrees in and out."""
+    new_lat_r, new_lon_r = destinations(lat, lon, bearing_deg, dist_deg)
+    return np.degrees(new_lat_r), np.degrees(new_lon_r)
+
+# --- KERNELS: kernel(map_I, map_P, nside, lat_r, lon_r) -> señal ---
+
+def sample(map_I, map_P, nside, lat_r, lon_r, interp=False):
+    """(I, P) at the given positions (radians); NaN pixels read as 0."""
+    theta = np.pi/2 - lat_r
+    if interp:
+        val_I = hp.get_interp_val(map_I, theta, lon_r)
+        val_P = hp.get_interp_val(map_P, theta, lon_r)
+    else:
+        pix = hp.ang2pix(nside, theta, lon_r)
+        val_I, val_P = map_I[pix], map_P[pix]
+    val_I = np.where(np.isnan(val_I), 0, val_I)
+    val_P = np.where(np.isnan(val_P), 0, val_P)
+    return val_I, val_P
+
+def abs_ip(map_I, map_P, nside, lat_r, lon_r):
+    """|I * P| at the nearest pixel (Intensidad * Polarización)."""
+    val_I, val_P = sample(map_I, map_P, nside, lat_r, lon_r)
+    return np.abs(val_I * val_P)
+
+def abs_ip_interp(map_I, map_P, nside, lat_r, lon_r):
+    """|I * P| with bilinear interpolation (hp.get_interp_val)."""
+    val_I, val_P = sample(map_I, map_P, nside, lat_r, lon_r, interp=True)
+    return np.abs(val_I * val_P)
+
+def std_p(map_I, map_P, nside, lat_r, lon_r):
+    """
+    'Nodalidad': std of I over the 8 neighbours of the pixel times P
+    there. High where domain walls cross.
+    """
+    pix = hp.ang2pix(nside, np.pi/2 - lat_r, lon_r)
+    neighbours = hp.get_all_neighbours(nside, pix)
+    return np.std(map_I[neighbours], axis=0) * map_P[pix]
+
+class MapKernel:
+    """
+    Kernel reading a precomputed signal map (signal_maps.load_signal) at
+    its own NSIDE, whatever the resolution of map_I / map_P. At the native
+    NSIDE it gives the same values as the on-the-fly kernel.
+    """
+
+    def __init__(self, signal_map):
+        self.signal_map = signal_map
+        self.nside = hp.npix2nside(len(signal_map))
+
+    def __call__(self, map_I, map_P, nside, lat_r, lon_r):
+        return self.signal_map[hp.ang2pix(self.nside, np.pi/2 - lat_r, lon_r)]
+
+KERNELS = {'abs_ip': abs_ip, 'abs_ip_interp': abs_ip_interp, 'std_p': std_p}
+
+def get_kernel(kernel):
+    """Kernel function from its name (or the function itself)."""
+    if callable(kernel):
+        return kernel
+    if kernel not in KERNELS:
+        raise ValueError(f"Unknown signal kernel '{kernel}'. Choose one of {sorted(KERNELS)}.")
+    return KERNELS[kernel]
+
+def probe(kernel, lat, lon, bearings_deg, dist_deg, map_I, map_P, nside):
+    """Kernel signal dist_deg ahead of (lat, lon) along every bearing."""
+    lat_r, lon_r = destinations(lat, lon, bearings_deg, dist_deg)
+    return get_kernel(kernel)(map_I, map_P, nside, lat_r, lon_r)
+
+def probe_signal(lat, lon, bearings_deg, dist_deg, map_I, map_P, nside, interp=False):
+    """
+    Signal |I * P| dist_deg ahead of (lat, lon) along every bearing.
+    Output shape is the broadcast shape of bearings_deg and dist_deg.
+    """
+    return probe(abs_ip_interp if interp else abs_ip, lat, lon, bearings_deg, dist_deg, map_I, map_P, nside)
+
+# --- POLÍTICAS DE GUIADO ---
+
+class Autopilot:
+    """
+    Micro-correction while walking: the best of bearing + offsets, probed
+    dist ahead. The first maximum wins; the bearing is kept unless the best
+    signal beats floor. offsets: (k,) or per walker (n, k).
+    """
+
+    def __init__(self, offsets, dist=PROBE_DIST, floor=-1.0):
+        self.offsets = np.asarray(offsets, dtype=np.float64)
+        self.dist = dist
+        self.floor = floor
+
+    def choose(self, bearing, offsets, sig):
+        """New bearings and best signal for candidate signals sig (m, k)."""
+        k = np.argmax(sig, axis=1)
+        rows = np.arange(len(k))
+        best = sig[rows, k]
+        take = best > self.floor
+        return np.where(take, bearing + offsets[rows, k], bearing), np.where(take, best, self.floor)
+
+class Radar:
+    """
+    Turn at a vertex: absolute sweep over `angles`, skipping those within
+    `exclusion` degrees of going back (wrap=True measures that distance
+    across 0/360). bonus=(lo, hi, factor) multiplies the signal of turns
+    between lo and hi degrees. First maximum above floor wins.
+    """
+
+    def __init__(self, angles, dist=PROBE_DIST, exclusion=45, wrap=True, bonus=None, floor=-1.0):
+        self.angles = np.asarray(angles)
+        self.dist = dist
+        self.exclusion = exclusion
+        self.wrap = wrap
+        self.bonus = bonus
+        self.floor = floor
+
+    def choose(self, bearing, sig):
+        """New bearings and best (weighted) signal for sweep signals sig (m, n_angles)."""
+        angles = self.angles[None, :]
+        reverse = (bearing[:, None] + 180) % 360
+        diff = np.abs(angles - reverse)
+        if self.wrap:
+            diff = np.where(diff > 180, 360 - diff, diff)
+        if self.bonus is not None:
+            lo, hi, factor = self.bonus
+            turn = np.abs(angles - bearing[:, None])
+            turn = np.where(turn > 180, 360 - turn, turn)
+            sig = np.where((turn > lo) & (turn < hi), sig * factor, sig)
+        sig = np.where(diff < self.exclusion, -np.inf, sig)
+        k = np.argmax(sig, axis=1)
+        best = sig[np.arange(len(k)), k]
+        take = best > self.floor
+        return np.where(take, self.angles[k], bearing), np.where(take, best, self.floor)
+
+# --- ARAÑA ---
+
+class Spider:
+    """
+    Walker rules shared by the spider scripts. Each step, for every active
+    walker:
+      1. probe the look-ahead signal (look_ahead degrees ahead) and the
+         autopilot candidates, in one kernel call;
+      2. with a radar, if the look-ahead signal is below threshold after
+         more than min_edge_steps steps on the edge: turn (vertex), reset
+         the edge counter and, with recalibrate, set threshold to
+         threshold_factor * the radar signal. max_vertices closes the walk;
+      3. otherwise steer with the autopilot (if any) and move step_size.
+         move_after_turn also moves on vertex steps, with the new bearing.
+    look_ahead=None skips probing (walkers just follow their bearing).
+    """
+
+    def __init__(self, kernel='abs_ip', step_size=0.2, look_ahead=PROBE_DIST, autopilot=None,
+                 radar=None, threshold_factor=0.45, recalibrate=True, min_edge_steps=20,
+                 max_vertices=5, move_after_turn=False):
+        if look_ahead is None and (autopilot is not None or radar is not None):
+            raise ValueError("Autopilot and radar need a look-ahead probe (look_ahead=None).")
+        self.kernel = get_kernel(kernel)
+        self.step_size = step_size
+        self.look_ahead = look_ahead
+        self.autopilot = autopilot
+        self.radar = radar
+        self.threshold_factor = threshold_factor
+        self.recalibrate = recalibrate
+        self.min_edge_steps = min_edge_steps
+        self.max_vertices = max_vertices
+        self.move_after_turn = move_after_turn
+
+    def run(self, lat, lon, bearing, map_I, map_P, nside, max_steps, threshold=None):
+        """
+        Walks all seeds (scalars or arrays) for up to max_steps steps.
+        threshold: initial cut signal per walker; None calibrates it as
+        threshold_factor * the look-ahead signal at the seed.
+        Returns a dict:
+            lat, lon, bearing   (max_steps + 1, n) tracks, NaN after the end
+            ahead               (max_steps, n) look-ahead signal per step
+            signal              (max_steps, n) autopilot best signal per step
+            steps, vertices, closed, threshold   per walker
+            vertex_log          list of {'walker', 'vertex', 'step', 'lat', 'lon',
+                                'bearing_in', 'bearing_out', 'signal'}
+        """
+        lat = np.array(lat, dtype=np.float64, ndmin=1)
+        lon = np.array(lon, dtype=np.float64, ndmin=1)
+        bearing = np.array(bearing, dtype=np.float64, ndmin=1)
+        n = len(lat)
+        step_size = np.broadcast_to(np.asarray(self.step_size, dtype=np.float64), (n,))
+        factor = np.broadcast_to(np.asarray(self.threshold_factor, dtype=np.float64), (n,))
+        ap = self.autopilot
+        offsets = None if ap is None else np.broadcast_to(np.atleast_2d(ap.offsets), (n, ap.offsets.shape[-1]))
+        probing = self.look_ahead is not None
+
+        # Calibración de señal basal
+        if threshold is None:
+            threshold = np.full(n, np.nan)
+            if probing and self.radar is not None:
+                threshold = probe(self.kernel, lat, lon, bearing, self.look_ahead, map_I, map_P, nside) * factor
+        threshold = np.array(np.broadcast_to(threshold, (n,)), dtype=np.float64)
+
+        steps_on_edge = np.zeros(n, dtype=np.int64)
+        steps = np.zeros(n, dtype=np.int64)
+        n_vertices = np.zeros(n, dtype=np.int64)
+        active = np.ones(n, dtype=bool)
+        out = {key: np.full((max_steps + 1, n), np.nan) for key in ('lat', 'lon', 'bearing')}
+        out['ahead'] = np.full((max_steps, n), np.nan)
+        out['signal'] = np.full((max_steps, n), np.nan)
+        out['lat'][0], out['lon'][0], out['bearing'][0] = lat, lon, bearing
+        vertex_log = []
+
+        # Columnas de la sonda por paso: [adelante, candidatos del autopilot...]
+        k_ap = 0 if ap is None else offsets.shape[1]
+        dists = np.r_[self.look_ahead if probing else 0.0, np.full(k_ap, ap.dist if ap else 0.0)]
+
+        for step in range(max_steps):
+            idx = np.flatnonzero(active)
+            if len(idx) == 0:
+                break
+
+            turning = np.zeros(len(idx), dtype=bool)
+            sig = None
+            if probing:
+                cand = bearing[idx, None] if ap is None else np.concatenate(
+                    [bearing[idx, None], bearing[idx, None] + offsets[idx]], axis=1)
+                sig = probe(self.kernel, lat[idx, None], lon[idx, None], cand, dists, map_I, map_P, nside)
+                out['ahead'][step, idx] = sig[:, 0]
+                if self.radar is not None:
+                    turning = (sig[:, 0] < threshold[idx]) & (steps_on_edge[idx] > self.min_edge_steps)
+
+            # Radar para los que han llegado al final de la arista
+            t = idx[turning]
+            closed = np.zeros(len(t), dtype=bool)
+            if len(t):
+                scan = probe(self.kernel, lat[t, None], lon[t, None], self.radar.angles[None, :],
+                             self.radar.dist, map_I, map_P, nside)
+                new_bearing, best = self.radar.choose(bearing[t], scan)
+                for w, b_out, s in zip(t, new_bearing, best):
+                    vertex_log.append({'walker': int(w), 'vertex': int(n_vertices[w]) + 1, 'step': step,
+                                       'lat': lat[w], 'lon': lon[w], 'bearing_in': bearing[w],
+                                       'bearing_out': b_out, 'signal': s})
+                bearing[t] = new_bearing
+                if self.recalibrate:
+                    threshold[t] = best * factor[t]
+                steps_on_edge[t] = 0
+                n_vertices[t] += 1
+                closed = n_vertices[t] >= self.max_vertices
+
+            # Autopilot y paso
+            walk = ~turning
+            if ap is not None and walk.any():
+                w = idx[walk]
+                bearing[w], out['signal'][step, w] = ap.choose(bearing[w], offsets[w], sig[walk, 1:])
+            steps_on_edge[idx[walk]] += 1
+            movers = idx[walk]
+            if self.move_after_turn:
+                movers = np.concatenate([movers, t[~closed]])
+            if len(movers):
+                lat[movers], lon[movers] = move(lat[movers], lon[movers], bearing[movers], step_size[movers])
+
+            out['lat'][step + 1, idx] = lat[idx]
+            out['lon'][step + 1, idx] = lon[idx]
+            out['bearing'][step + 1, idx] = bearing[idx]
+            steps[idx] += 1
+            active[t[closed]] = False
+
+        out.update(steps=steps, vertices=n_vertices, closed=n_vertices >= self.max_vertices,
+                   threshold=threshold, vertex_log=vertex_log)
+        return out
+
+    def path(self, res, walker=0, labels=('VERTEX_START', 'VERTEX_FOUND', 'PATH')):
+        """
+        Track of one walker as the scripts' path records: start, then per
+        step the vertex (if any) and the position after moving, each with
+        its step number. labels: (start, vertex, path) types.
+        """
+        start, vertex, path = labels
+        turns = {v['step'] for v in res['vertex_log'] if v['walker'] == walker}
+        n_steps = int(res['steps'][walker])
+        rows = [{'lat': res['lat'][0, walker], 'lon': res['lon'][0, walker], 'type': start, 'step': 0}]
+        for s in range(n_steps):
+            if s in turns:
+                rows.append({'lat': res['lat'][s, walker], 'lon': res['lon'][s, walker], 'type': vertex, 'step': s})
+                last = s == n_steps - 1 and res['closed'][walker]
+                if not self.move_after_turn or last:
+                    continue
+            rows.append({'lat': res['lat'][s + 1, walker], 'lon': res['lon'][s + 1, walker], 'type': path, 'step': s})
+        return rows
@@ -13,6 +13,7 @@
 import healpy as hp
 import numpy as np
 import matplotlib.pyplot as plt
+from map_cache import load_maps
 
 # CONFIGURACIÓN
 INPUT_FILE = 'data/raw/COM_CMB_IQU-sevem_2048_R4.00.fits'
@@ -37,16 +38,9 @@ def main():
     # 2. Cargar el mapa FULL RESOLUTION (2048)
     print("Cargando mapa de alta resolución (puede tardar un poco)...")
     try:
-        maps = hp.read_map(INPUT_FILE, field=None, hdu=1, verbose=False, memmap=True)
-        if len(maps) == 1 or maps.ndim == 1:
-            map_I = maps
-            maps_pol = hp.read_map(INPUT_FILE, field=None, hdu=2, verbose=False, memmap=True)
-            map_Q, map_U = maps_pol[0], maps_pol[1]
-        else:
-            map_I, map_Q, map_U = maps[0], maps[1], maps[2]
-            
-        # Calcular Magnitud de Polarización
-        map_P = np.sqrt(map_Q**2 + map_U**2)
+        # Formato (combinado o split PR4) resuelto por cabeceras dentro de la caché;
+        # la Magnitud de Polarización P ya viene precalculada
+        map_I, map_P = load_maps(INPUT_FILE, ('I', 'P'))
         
     except Exception as e:
         print(f"Error cargando mapas: {e}")